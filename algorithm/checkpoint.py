@@ -0,0 +1,86 @@
+import json
+import logging
+import os
+import random
+import threading
+from typing import Any, Dict, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def rng_state(rngs: Tuple[random.Random, np.random.Generator]) -> Dict[str, Any]:
+    """حالة مولدي Python و NumPy بصيغة قابلة للتسلسل JSON"""
+    py_rng, np_rng = rngs
+    version, internal, gauss = py_rng.getstate()
+    return {"python": [version, list(internal), gauss], "numpy": np_rng.bit_generator.state}
+
+
+def restore_rngs(state: Dict[str, Any]) -> Tuple[random.Random, np.random.Generator]:
+    """إعادة بناء مولدي Python و NumPy من حالتهما المحفوظة"""
+    py_rng = random.Random()
+    version, internal, gauss = state["python"]
+    py_rng.setstate((version, tuple(internal), gauss))
+    np_rng = np.random.default_rng()
+    np_rng.bit_generator.state = state["numpy"]
+    return py_rng, np_rng
+
+
+def load_checkpoint(path: str) -> Tuple[Dict[str, np.ndarray], Dict[str, Any]]:
+    """قراءة نقطة حفظ: المصفوفات (الجزر، أفضل جينوم...) والبيانات الوصفية JSON"""
+    with np.load(path, allow_pickle=False) as data:
+        meta = json.loads(str(data["meta"]))
+        arrays = {key: data[key] for key in data.files if key != "meta"}
+    return arrays, meta
+
+
+class CheckpointWriter:
+    """
+    كتابة نقاط الحفظ (np.savez_compressed مع البيانات الوصفية JSON داخل الملف نفسه) في خيط خلفي:
+    الكتابة إلى ملف مؤقت ثم os.replace حتى لا يبقى على القرص ملف نصف مكتوب.
+    إذا كانت كتابة سابقة ما زالت جارية تُتخطى النقطة الجديدة بدل إيقاف حلقة الأجيال.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._thread = None
+        self.writes = 0
+        self.skipped = 0
+
+    @property
+    def busy(self) -> bool:
+        """هل توجد كتابة جارية في الخلفية"""
+        return self._thread is not None and self._thread.is_alive()
+
+    def save(self, arrays: Dict[str, np.ndarray], meta: Dict[str, Any], block: bool = False) -> bool:
+        """بدء كتابة نقطة حفظ؛ تُرجع False إذا تم تخطيها"""
+        if self.busy:
+            if not block:
+                self.skipped += 1
+                logger.debug("⏭️ تخطي نقطة الحفظ: الكتابة السابقة لم تنته بعد")
+                return False
+            self._thread.join()
+        self._thread = threading.Thread(target=self._write, args=(arrays, meta), daemon=True)
+        self._thread.start()
+        if block:
+            self._thread.join()
+        return True
+
+    def wait(self):
+        """انتظار انتهاء الكتابة الجارية (إن وجدت)"""
+        if self._thread is not None:
+            self._thread.join()
+
+    def _write(self, arrays: Dict[str, np.ndarray], meta: Dict[str, Any]):
+        tmp_path = f"{self.path}.tmp"
+        try:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            with open(tmp_path, "wb") as f:
+                np.savez_compressed(f, meta=np.array(json.dumps(meta)), **arrays)
+            os.replace(tmp_path, self.path)
+            self.writes += 1
+            logger.debug(f"💾 نقطة حفظ في الجيل {meta.get('generation')}: {self.path}")
+        except Exception as e:
+            logger.error(f"❌ فشل حفظ نقطة الحفظ {self.path}: {e}")
@@ -1,11 +1,19 @@
 import copy
 import logging
+import os
+import random
+import time as systime
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from ortools.sat.python import cp_model
-from typing import Dict, List, Any
+from typing import Callable, Dict, List, Any, Optional, Tuple
 from datetime import time
 
-from model import Schedule, TimeSlot, Config, Course, Room, Group, Instructor, DayOfWeek
+from model import (
+    Schedule, TimeSlot, Config, Course, Room, Group, Instructor, DayOfWeek,
+    InfeasibilityConflict, InfeasibilityReport
+)
+from algorithm.soft_constraints_validator import SoftConstraintsValidator
 
 # Configure logger
 logger = logging.getLogger(__name__)
@@ -16,6 +24,58 @@ handler.setFormatter(formatter)
 logger.addHandler(handler)
 
 
+class _SolutionCollector(cp_model.CpSolverSolutionCallback):
+    """جامع حلول متنوعة أثناء البحث مع مرشح تنوع على الوقت والقاعة"""
+
+    def __init__(self, variables: Dict[str, Dict[str, Any]], limit: int, min_diversity: float):
+        super().__init__()
+        self._variables = variables
+        self._limit = limit
+        self._min_diversity = min_diversity
+        self.solutions: List[Dict[str, Tuple[int, int, int]]] = []
+        self.seen = 0
+
+    def on_solution_callback(self):
+        self.seen += 1
+        solution = {
+            cid: (self.Value(v['start']), self.Value(v['room_class']), self.Value(v['instr']))
+            for cid, v in self._variables.items()
+        }
+        if all(self._distance(solution, kept) >= self._min_diversity for kept in self.solutions):
+            self.solutions.append(solution)
+            if len(self.solutions) >= self._limit:
+                self.StopSearch()
+
+    @staticmethod
+    def _distance(a: Dict[str, Tuple[int, int, int]], b: Dict[str, Tuple[int, int, int]]) -> float:
+        """نسبة المواد التي يختلف وقت بدئها أو فئة قاعتها بين حلين"""
+        if not a:
+            return 0.0
+        differing = sum(1 for cid, (start, room, _) in a.items() if b[cid][:2] != (start, room))
+        return differing / len(a)
+
+
+class _ProgressCallback(cp_model.CpSolverSolutionCallback):
+    """بث تقدم البحث (الهدف، الحد، الزمن، عدد الحلول) إلى دالة خارجية مثل واجهة Streamlit"""
+
+    def __init__(self, on_progress: Callable[[Dict[str, Any]], None]):
+        super().__init__()
+        self._on_progress = on_progress
+        self.solution_count = 0
+
+    def on_solution_callback(self):
+        self.solution_count += 1
+        try:
+            self._on_progress({
+                "objective": self.ObjectiveValue(),
+                "bound": self.BestObjectiveBound(),
+                "wall_time": self.WallTime(),
+                "solutions": self.solution_count
+            })
+        except Exception as e:
+            logger.warning(f"⚠️ خطأ في دالة عرض التقدم: {e}")
+
+
 class CPSatScheduler:
     """محرك الجدولة باستخدام CP-SAT مع تصميم معياري وحقن تبعيات"""
     
@@ -27,47 +87,160 @@ class CPSatScheduler:
         self.rooms: List[Room] = []
         self.groups: Dict[str, Group] = {}  # تخزين المجموعات في قاموس للوصول السريع
         self.instructors: List[Instructor] = []
+        # فئات القاعات المتكافئة (النوع، السعة، التجهيزات) وفهرس فئة كل قاعة
+        self.room_classes: List[List[int]] = []
+        self.room_class_of: Dict[int, int] = {}
+        # القاعات المفضلة عند توزيع القاعات الفعلية (من جدول سابق)
+        self._preferred_rooms: Dict[str, int] = {}
         self.split_course_map: Dict[str, List[Course]] = defaultdict(list)
         self.rotation_groups: Dict[str, List[Course]] = defaultdict(list)
+        # متغيرات الافتراض التي تحرس عائلات القيود (وضع التشخيص فقط)
+        self._use_guards = False
+        self._guards: Dict[Tuple[str, str], Any] = {}
+        self._guard_conflicts: Dict[int, InfeasibilityConflict] = {}
+        self.last_infeasibility: Optional[InfeasibilityReport] = None
+        # مقاييس آخر عملية جدولة (زمن بناء النموذج منفصل عن زمن الحل)
+        self.stats: Dict[str, Any] = {}
 
     def generate_schedule(
         self,
         courses: List[Course],
         rooms: List[Room],
         groups: List[Group],
-        instructors: List[Instructor]
+        instructors: List[Instructor],
+        previous_schedule: Optional[List[Schedule]] = None,
+        fix_unchanged: bool = False,
+        progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None
     ) -> List[Schedule]:
+        """
+        توليد الجدول باستخدام CP-SAT.
+
+        Args:
+            previous_schedule: جدول سابق (مثلاً قبل تعديل البيانات) يُستخدم كتلميحات بدء دافئ
+            fix_unchanged: تثبيت تعيينات المواد التي لم تتغير بياناتها منذ الجدول السابق
+            progress_callback: دالة تستقبل قاموس التقدم (objective, bound, wall_time, solutions)
+                عند كل حل جديد، أو عند اكتمال كل مكون في الحل المتوازي
+        """
         logger.info("🚀 بدء جدولة CP-SAT...")
+        self.last_infeasibility = None
+        self.stats = {"build_time": 0.0, "solve_time": 0.0, "num_variables": 0, "num_constraints": 0}
         try:
-            self.rooms = copy.deepcopy(rooms)
-            self.groups = {g.id: g for g in copy.deepcopy(groups)}
-            self.instructors = copy.deepcopy(instructors)
-            
-            # معالجة مسبقة للمواد وإنشاء المجموعات الفرعية
-            processed_courses = self._preprocess_courses(courses)
-            logger.info(f"📚 عدد المواد بعد المعالجة: {len(processed_courses)}")
-            
-            # إنشاء متغيرات القرار
-            self._create_decision_variables(processed_courses)
-            
-            # إضافة القيود
-            self._add_room_constraints(processed_courses)
-            self._add_instructor_constraints(processed_courses)
-            self._add_group_constraints(processed_courses)
-            self._add_time_constraints(processed_courses)
-            self._add_rotation_constraints(processed_courses)
+            self.rooms = rooms
+            components = [courses]
+            if self.config.cp_params.get("decompose_components", True):
+                components = self._find_components(courses)
+            if len(components) > 1:
+                logger.info(f"🧩 تم تقسيم النموذج إلى {len(components)} مكونات مستقلة")
+                schedule = self._solve_components(
+                    courses, components, rooms, groups, instructors, previous_schedule, fix_unchanged,
+                    progress_callback
+                )
+            else:
+                schedule = self._solve(
+                    courses, rooms, groups, instructors, previous_schedule, fix_unchanged,
+                    progress_callback=progress_callback
+                )
+            if schedule and self.config.cp_params.get("mode", "feasibility") == "optimize":
+                self._report_soft_penalties(schedule)
+            return schedule
+        except Exception as e:
+            logger.error(f"❌ خطأ أثناء توليد الجدول: {e}", exc_info=True)
+            return []
+
+    def _report_soft_penalties(self, schedule: List[Schedule]):
+        """عقوبات المحقق على الجدول الناتج، لأن هدف CP-SAT لا يرمز كل القيود المرنة (انظر _add_soft_objective)"""
+        penalties = SoftConstraintsValidator(self.config).penalty(schedule)
+        self.stats["soft_penalties"] = dict(penalties)
+        logger.info("📏 عقوبات المحقق على الجدول: " + "، ".join(f"{k}={v:g}" for k, v in penalties.items()))
+
+    def _reset_model(self):
+        """إعادة تهيئة النموذج والمحلّل قبل كل عملية بناء"""
+        self.model = cp_model.CpModel()
+        self.solver = cp_model.CpSolver()
+        self.variables = {}
+        self.room_classes = []
+        self.room_class_of = {}
+        self._preferred_rooms = {}
+        self.split_course_map = defaultdict(list)
+        self.rotation_groups = defaultdict(list)
+        self._guards = {}
+        self._guard_conflicts = {}
+
+    def _num_workers(self) -> int:
+        """عدد عمال البحث من ملف المحلّل (0 = كل الأنوية المتاحة)"""
+        return self.config.cp_params.get("num_workers", 8) or os.cpu_count() or 1
+
+    def _configure_solver(self, num_workers: Optional[int] = None):
+        """تطبيق ملف إعدادات المحلّل (cp_params) على self.solver"""
+        params = self.config.cp_params
+        self.solver.parameters.max_time_in_seconds = float(params.get("time_limit", 60.0))
+        self.solver.parameters.num_search_workers = num_workers or self._num_workers()
+        self.solver.parameters.relative_gap_limit = float(params.get("relative_gap", 0.0))
+        self.solver.parameters.random_seed = int(params.get("random_seed", 0))
+        self.solver.parameters.stop_after_first_solution = bool(params.get("stop_after_first_solution", False))
+        self.solver.parameters.log_search_progress = bool(params.get("log_search_progress", True))
+
+    def _solve(
+        self,
+        courses: List[Course],
+        rooms: List[Room],
+        groups: List[Group],
+        instructors: List[Instructor],
+        previous_schedule: Optional[List[Schedule]] = None,
+        fix_unchanged: bool = False,
+        num_workers: Optional[int] = None,
+        progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None
+    ) -> List[Schedule]:
+        """بناء نموذج CP-SAT واحد لمجموعة المواد وحله"""
+        try:
+            build_start = systime.time()
+            processed_courses = self._build_model(courses, rooms, groups, instructors)
+            proto = self.model.Proto()
+            self.stats["build_time"] = systime.time() - build_start
+            self.stats["num_variables"] = len(proto.variables)
+            self.stats["num_constraints"] = len(proto.constraints)
+            logger.info(
+                f"🏗️ زمن بناء النموذج: {self.stats['build_time']:.2f} ث "
+                f"({self.stats['num_variables']} متغير، {self.stats['num_constraints']} قيد)"
+            )
+
+            # وضع التحسين: القيود المرنة كدالة هدف خطية مرجحة
+            optimize = self.config.cp_params.get("mode", "feasibility") == "optimize"
+            if optimize:
+                self._add_soft_objective(processed_courses)
+
+            # البدء الدافئ من جدول سابق
+            pins = []
+            if previous_schedule:
+                pins = self._apply_warm_start(previous_schedule, fix_unchanged)
+                if pins:
+                    self.model.AddAssumptions(pins)
             
-            # حل النموذج مع معلمات متقدمة
-            self.solver.parameters.max_time_in_seconds = 60.0  # زيادة وقت البحث
-            self.solver.parameters.num_search_workers = 8       # استخدام كل الأنوية
-            self.solver.parameters.log_search_progress = True   # تسجيل تقدم البحث
+            # حل النموذج حسب ملف إعدادات المحلّل
+            self._configure_solver(num_workers)
+            callback = _ProgressCallback(progress_callback) if progress_callback else None
             
-            status = self.solver.Solve(self.model)
+            status = self.solver.Solve(self.model, callback)
+            self.stats["solve_time"] = self.solver.WallTime()
             logger.info(f"📊 حالة المحلّل: {self.solver.StatusName(status)}")
+
+            if pins and status == cp_model.INFEASIBLE:
+                logger.warning("⚠️ تثبيت التعيينات السابقة يمنع الحل - إعادة الحل باستخدام التلميحات فقط")
+                self.model.ClearAssumptions()
+                status = self.solver.Solve(self.model, callback)
+                self.stats["solve_time"] += self.solver.WallTime()
+                logger.info(f"📊 حالة المحلّل: {self.solver.StatusName(status)}")
             
+            if status == cp_model.INFEASIBLE:
+                self.last_infeasibility = self.diagnose_infeasibility(courses, rooms, groups, instructors)
+                return []
             if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
                 self._analyze_infeasibility(processed_courses)
                 return []
+            if optimize:
+                self.stats["objective"] = self.solver.ObjectiveValue()
+                self.stats["best_bound"] = self.solver.BestObjectiveBound()
+                logger.info(f"🎯 قيمة الهدف: {self.stats['objective']:.0f} (الحد: {self.stats['best_bound']:.0f})")
             
             # استخراج الجدول
             return self._extract_schedule(status, processed_courses)
@@ -75,20 +248,328 @@ class CPSatScheduler:
             logger.error(f"❌ خطأ أثناء توليد الجدول: {e}", exc_info=True)
             return []
 
+    def _build_model(
+        self,
+        courses: List[Course],
+        rooms: List[Room],
+        groups: List[Group],
+        instructors: List[Instructor]
+    ) -> List[Course]:
+        """بناء متغيرات وقيود النموذج وإرجاع المواد بعد المعالجة المسبقة"""
+        self._reset_model()
+        # المدخلات لا تُعدَّل أثناء البناء، فتكفي قوائم وفهارس تشير إلى نفس الكائنات
+        self.rooms = list(rooms)
+        self.groups = {g.id: g for g in groups}
+        self.instructors = list(instructors)
+        
+        # معالجة مسبقة للمواد وإنشاء المجموعات الفرعية
+        processed_courses = self._preprocess_courses(courses)
+        logger.info(f"📚 عدد المواد بعد المعالجة: {len(processed_courses)}")
+        self._build_room_classes()
+        
+        # إنشاء متغيرات القرار
+        self._create_decision_variables(processed_courses)
+        
+        # إضافة القيود
+        self._add_room_constraints(processed_courses)
+        self._add_instructor_constraints(processed_courses)
+        self._add_group_constraints(processed_courses)
+        self._add_time_constraints(processed_courses)
+        self._add_rotation_constraints(processed_courses)
+        return processed_courses
+
+    def generate_population(
+        self,
+        courses: List[Course],
+        rooms: List[Room],
+        groups: List[Group],
+        instructors: List[Instructor],
+        size: int,
+        min_diversity: Optional[float] = None
+    ) -> List[List[Schedule]]:
+        """
+        توليد عدة جداول صالحة ومتنوعة من نموذج CP-SAT واحد لتهيئة سكان الخوارزمية الجينية.
+
+        Args:
+            size: عدد الجداول المطلوبة
+            min_diversity: أقل نسبة من المواد يجب أن يختلف وقتها أو قاعتها عن كل حل محفوظ
+        """
+        logger.info(f"🧬 توليد {size} حلول متنوعة من CP-SAT...")
+        try:
+            if min_diversity is None:
+                min_diversity = self.config.cp_params.get("population_min_diversity", 0.05)
+            processed_courses = self._build_model(courses, rooms, groups, instructors)
+            collector = _SolutionCollector(self.variables, size, min_diversity)
+            rng = random.Random(self.config.cp_params.get("random_seed", 0))
+            deadline = systime.time() + self.config.cp_params.get("population_time_limit", 30.0)
+
+            # جولات بحث عشوائية البذرة على نفس النموذج: التعداد الكامل (enumerate_all_solutions)
+            # يعطل الحل المسبق ويحصر البحث في عامل واحد فيعجز عن إيجاد حلول في النماذج الكبيرة
+            status = cp_model.UNKNOWN
+            while len(collector.solutions) < size and systime.time() < deadline:
+                self.solver = cp_model.CpSolver()
+                self.solver.parameters.max_time_in_seconds = max(0.1, deadline - systime.time())
+                self.solver.parameters.num_search_workers = self._num_workers()
+                self.solver.parameters.random_seed = rng.randint(0, 1 << 30)
+                self.solver.parameters.randomize_search = True
+                status = self.solver.Solve(self.model, collector)
+                if status in (cp_model.INFEASIBLE, cp_model.MODEL_INVALID):
+                    break
+
+            logger.info(
+                f"📊 حالة المحلّل: {self.solver.StatusName(status)} - "
+                f"{len(collector.solutions)} حل متنوع من أصل {collector.seen}"
+            )
+            if not collector.solutions:
+                self._analyze_infeasibility(processed_courses)
+                return []
+            return [self._extract_schedule(status, processed_courses, values) for values in collector.solutions]
+        except Exception as e:
+            logger.error(f"❌ خطأ أثناء توليد السكان الأوليين: {e}", exc_info=True)
+            return []
+
+    def diagnose_infeasibility(
+        self,
+        courses: List[Course],
+        rooms: List[Room],
+        groups: List[Group],
+        instructors: List[Instructor]
+    ) -> InfeasibilityReport:
+        """
+        استخراج مجموعة قيود متعارضة (نواة عدم الإمكانية) بدلاً من التخمين.
+
+        كل عائلة قيود (عدم تداخل القاعات والمدرسين والمجموعات، نوافذ الوقت، التدوير،
+        أسبقية النظري على العملي) تُحرس بمتغير افتراض، ثم تُرجع
+        SufficientAssumptionsForInfeasibility الافتراضات المسببة للتعارض.
+        """
+        logger.info("🔍 استخراج نواة عدم الإمكانية...")
+        started = systime.time()
+        deadline = started + self.config.cp_params.get("diagnosis_time_limit", 20.0)
+        self._use_guards = True
+        try:
+            self._build_model(courses, rooms, groups, instructors)
+        finally:
+            self._use_guards = False
+
+        guards = list(self._guards.values())
+        status, core = self._solve_with_assumptions(guards, deadline)
+        report = InfeasibilityReport(status=self.solver.StatusName(status))
+        if status != cp_model.INFEASIBLE:
+            logger.warning(f"⚠️ تعذر إثبات عدم الإمكانية أثناء التشخيص: {report.status}")
+            report.solve_time = systime.time() - started
+            return report
+
+        minimal = False
+        if self.config.cp_params.get("diagnosis_minimize", True):
+            core, minimal = self._minimize_core(core, deadline)
+        # قيود الموارد أولاً ثم التدوير والأسبقية، ونوافذ الوقت في النهاية
+        family_order = {"room": 0, "instructor": 1, "group": 2, "rotation": 3, "precedence": 4, "time": 5}
+        report.conflicts = sorted(
+            (self._guard_conflicts[lit.Index()] for lit in core),
+            key=lambda conflict: family_order.get(conflict.family, len(family_order))
+        )
+        report.minimal = minimal
+        report.solve_time = systime.time() - started
+
+        logger.error(f"❌ النموذج غير قابل للحل بسبب {len(report.conflicts)} قيود متعارضة:")
+        for conflict in report.conflicts:
+            logger.error(f" - [{conflict.family}] {conflict.description}")
+        return report
+
+    def _solve_with_assumptions(self, assumptions: List[Any], deadline: float) -> Tuple[int, List[Any]]:
+        """حل النموذج تحت مجموعة افتراضات وإرجاع الحالة والافتراضات المسببة لعدم الإمكانية"""
+        self.model.ClearAssumptions()
+        self.model.AddAssumptions(assumptions)
+        self.solver = cp_model.CpSolver()
+        self.solver.parameters.max_time_in_seconds = max(0.1, deadline - systime.time())
+        self.solver.parameters.num_search_workers = self._num_workers()
+        status = self.solver.Solve(self.model)
+        if status != cp_model.INFEASIBLE:
+            return status, []
+        core_idx = set(self.solver.SufficientAssumptionsForInfeasibility())
+        return status, [lit for lit in assumptions if lit.Index() in core_idx]
+
+    def _minimize_core(self, core: List[Any], deadline: float) -> Tuple[List[Any], bool]:
+        """تصغير النواة بالحذف: يُزال كل افتراض يبقى النموذج بدونه غير قابل للحل"""
+        i = 0
+        while i < len(core):
+            if systime.time() >= deadline:
+                return core, False
+            trial = core[:i] + core[i + 1:]
+            status, smaller = self._solve_with_assumptions(trial, deadline)
+            if status == cp_model.INFEASIBLE:
+                core = smaller or trial
+            elif status == cp_model.UNKNOWN:
+                return core, False
+            else:
+                i += 1
+        return core, True
+
+    def _guard(
+        self,
+        family: str,
+        key: str,
+        description: str,
+        course_ids: List[str] = (),
+        room_ids: List[str] = (),
+        instructor_ids: List[str] = (),
+        group_ids: List[str] = ()
+    ) -> List[Any]:
+        """
+        متغير افتراض يحرس قيود عائلة ومورد معين (قائمة فارغة خارج وضع التشخيص)،
+        يُمرر مباشرة إلى OnlyEnforceIf.
+        """
+        if not self._use_guards:
+            return []
+        lit = self._guards.get((family, key))
+        if lit is None:
+            lit = self.model.NewBoolVar(f'guard_{family}_{key}')
+            self._guards[(family, key)] = lit
+            self._guard_conflicts[lit.Index()] = InfeasibilityConflict(family=family, description=description)
+        conflict = self._guard_conflicts[lit.Index()]
+        for target, ids in ((conflict.course_ids, course_ids), (conflict.room_ids, room_ids),
+                            (conflict.instructor_ids, instructor_ids), (conflict.group_ids, group_ids)):
+            target.extend(i for i in ids if i not in target)
+        return [lit]
+
+    def _time_guard(self, course: Course) -> List[Any]:
+        return self._guard(
+            "time", course.id, f"نافذة أوقات العمل للمادة {course.name} ({course.duration} دقيقة)",
+            course_ids=[course.id], group_ids=[course.group_id]
+        )
+
+    def _find_components(self, courses: List[Course]) -> List[List[Course]]:
+        """
+        تقسيم المواد إلى مكونات مترابطة في مخطط التفاعل: تترابط مادتان إذا اشتركتا
+        في المجموعة الأصلية أو المدرس أو قاعة مناسبة أو مجموعة تدوير.
+        """
+        parent: Dict[str, str] = {}
+
+        def find(key: str) -> str:
+            parent.setdefault(key, key)
+            while parent[key] != key:
+                parent[key] = parent[parent[key]]
+                key = parent[key]
+            return key
+
+        def union(a: str, b: str):
+            ra, rb = find(a), find(b)
+            if ra != rb:
+                parent[rb] = ra
+
+        course_keys = []
+        for c in courses:
+            keys = [f"group:{c.group_id.split('_sub')[0]}", f"instr:{c.instructor_id}"]
+            keys.extend(f"room:{r.id}" for r in self._get_suitable_rooms(c))
+            rotation_group = getattr(c, "rotation_group", None)
+            if rotation_group:
+                keys.append(f"rotation:{rotation_group}")
+            for key in keys[1:]:
+                union(keys[0], key)
+            course_keys.append(keys[0])
+
+        components: Dict[str, List[Course]] = defaultdict(list)
+        for c, key in zip(courses, course_keys):
+            components[find(key)].append(c)
+        return list(components.values())
+
+    def _solve_components(
+        self,
+        courses: List[Course],
+        components: List[List[Course]],
+        rooms: List[Room],
+        groups: List[Group],
+        instructors: List[Instructor],
+        previous_schedule: Optional[List[Schedule]],
+        fix_unchanged: bool,
+        progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None
+    ) -> List[Schedule]:
+        """حل كل مكون كنموذج CP-SAT مستقل في مجمّع عمليات ودمج الجداول الناتجة"""
+        # ميزانية عمال البحث من ملف المحلّل تُوزع على المكونات
+        cpu_count = self._num_workers()
+        max_parallel = (self.config.cp_params.get("max_parallel_components", 0)
+                        or min(cpu_count, os.cpu_count() or 1))
+        total_courses = sum(len(comp) for comp in components)
+        # المكونات الكبيرة أولاً، وتحصل على حصة من الأنوية تتناسب مع حجمها
+        components = sorted(components, key=len, reverse=True)
+
+        tasks = []
+        for comp in components:
+            course_ids = {c.id for c in comp}
+            group_ids = {c.group_id for c in comp}
+            instructor_ids = {c.instructor_id for c in comp}
+            room_ids = {r.id for c in comp for r in self._get_suitable_rooms(c)}
+            comp_rooms = [r for r in rooms if r.id in room_ids] or rooms
+            comp_instructors = [i for i in instructors if i.id in instructor_ids] or instructors
+            comp_groups = [g for g in groups if g.id in group_ids]
+            comp_previous = None
+            if previous_schedule:
+                comp_previous = [
+                    s for s in previous_schedule if s.course_id.split('_sub')[0] in course_ids
+                ]
+            workers = max(1, round(cpu_count * len(comp) / total_courses))
+            tasks.append((self.config, comp, comp_rooms, comp_groups, comp_instructors,
+                          comp_previous, fix_unchanged, workers))
+
+        results = []
+        if max_parallel > 1:
+            started = systime.time()
+            try:
+                with ProcessPoolExecutor(max_workers=min(max_parallel, len(tasks))) as pool:
+                    futures = {pool.submit(_solve_component, *task): idx for idx, task in enumerate(tasks)}
+                    by_index = {}
+                    # العمليات المنفصلة لا تبث حلولها، فيُبلَّغ عن اكتمال كل مكون
+                    for done, future in enumerate(as_completed(futures), start=1):
+                        by_index[futures[future]] = future.result()
+                        if progress_callback:
+                            progress_callback({
+                                "objective": None, "bound": None,
+                                "wall_time": systime.time() - started,
+                                "solutions": done, "components": len(tasks)
+                            })
+                    results = [by_index[idx] for idx in range(len(tasks))]
+            except Exception as e:
+                logger.warning(f"⚠️ تعذر الحل المتوازي للمكونات ({e}) - سيتم الحل بالتتابع")
+        if not results:
+            results = [_solve_component(*task, progress_callback) for task in tasks]
+
+        merged = []
+        failed = False
+        for comp, (result, report, stats) in zip(components, results):
+            for key, value in stats.items():
+                self.stats[key] = self.stats.get(key, 0) + value
+            if not result:
+                logger.error(f"❌ تعذر جدولة المكون الذي يضم المواد: {[c.id for c in comp]}")
+                failed = True
+                if report is not None:
+                    # دمج تقارير المكونات الفاشلة في تقرير واحد
+                    if self.last_infeasibility is None:
+                        self.last_infeasibility = report
+                    else:
+                        self.last_infeasibility.conflicts.extend(report.conflicts)
+                        self.last_infeasibility.minimal = self.last_infeasibility.minimal and report.minimal
+                        self.last_infeasibility.solve_time += report.solve_time
+            merged.extend(result)
+        if failed:
+            return []
+        # نفس ترتيب المواد المدخلة (كما في الحل الموحد) ليتطابق فهرس الجلسات بين الجداول
+        order = {c.id: idx for idx, c in enumerate(courses)}
+        merged.sort(key=lambda s: order.get(s.course_id.split('_sub')[0], len(order)))
+        return merged
 
     def _preprocess_courses(self, courses: List[Course]) -> List[Course]:
         """
         معالجة المواد: تقسيم المواد حسب الحاجة، وتحديث المجموعات الفرعية.
         """
         expanded = []
-        groups_copy = {k: copy.deepcopy(v) for k, v in self.groups.items()}
+        # المجموعات الفرعية الجديدة تُضاف إلى الفهرس فقط؛ المجموعات الأصلية لا تُنسخ ولا تُعدَّل
         for c in courses:
             try:
                 logger.debug(f"🔍 معالجة المادة: {c.id} ({c.name})")
                 suitable_rooms = self._get_suitable_rooms(c)
-                group = groups_copy[c.group_id]
+                group = self.groups[c.group_id]
                 if self._needs_splitting(c, suitable_rooms, group):
-                    subgroups = self._split_course(c, group, suitable_rooms, groups_copy)
+                    subgroups = self._split_course(c, group, suitable_rooms, self.groups)
                     expanded.extend(subgroups)
                     self.split_course_map[c.id] = subgroups
                     logger.info(f"📦 تم تقسيم {c.name} إلى {len(subgroups)} أقسام")
@@ -99,7 +580,6 @@ class CPSatScheduler:
                     logger.debug(f"✅ المادة {c.name} لا تحتاج لتقسيم")
             except Exception as e:
                 logger.error(f"❌ خطأ في معالجة المادة {c.id}: {e}", exc_info=True)
-        self.groups.update(groups_copy)
         return expanded
 
     def _get_suitable_rooms(self, course: Course) -> List[Room]:
@@ -164,6 +644,7 @@ class CPSatScheduler:
     def _split_course(self, course: Course, group: Group, suitable_rooms: List[Room], groups: Dict[str, Group]) -> List[Course]:
         """
         تقسيم المادة إلى أقسام فرعية حسب سعة القاعات وتوزيع الطلاب.
+        الأقسام سجلات مشتقة (نسخ سطحية) تشارك القوائم مع المادة والمجموعة الأصليتين.
         """
         try:
             max_cap = max(r.capacity for r in suitable_rooms) if suitable_rooms else group.student_count
@@ -175,14 +656,14 @@ class CPSatScheduler:
                 part_size = min(max_cap, remaining)
                 subgroup_id = f"{group.id}_sub{i+1}"
                 if subgroup_id not in groups:
-                    sub_group = copy.deepcopy(group)
+                    sub_group = copy.copy(group)
                     sub_group.id = subgroup_id
                     sub_group.student_count = part_size
                     groups[subgroup_id] = sub_group
                 else:
                     sub_group = groups[subgroup_id]
                 remaining -= part_size
-                sub = copy.deepcopy(course)
+                sub = copy.copy(course)  # يحافظ على السمات الديناميكية مثل rotation_group
                 sub.id = f"{course.id}_sub{i+1}"
                 sub.name = f"{course.name} (قسم {i+1})"
                 sub.group_id = subgroup_id
@@ -192,19 +673,64 @@ class CPSatScheduler:
             logger.error(f"❌ خطأ في تقسيم المادة {course.id}: {e}")
             return [course]
    
+    def _working_days_ints(self) -> List[int]:
+        """أيام العمل كأرقام صحيحة (0=السبت، ...)"""
+        return [d.value if hasattr(d, 'value') else int(d) for d in self.config.working_days]
+
+    def _build_start_domain(self, duration: int) -> cp_model.Domain:
+        """
+        بناء نطاق وقت البدء (بدقائق الأسبوع) مباشرة على نوافذ أيام وساعات العمل
+        مع محاذاة البدايات على شبكة زمنية بدقة time_grid_minutes.
+        """
+        daily_start = self._time_to_minutes(self.config.daily_start_time)
+        daily_end = self._time_to_minutes(self.config.daily_end_time)
+        granularity = max(1, int(getattr(self.config, 'time_grid_minutes', 1) or 1))
+        latest_start = daily_end - duration
+
+        intervals = []
+        for day in sorted(set(self._working_days_ints())):
+            offset = day * 24 * 60
+            if latest_start < daily_start:
+                continue
+            if granularity == 1:
+                intervals.append([offset + daily_start, offset + latest_start])
+            else:
+                for minute in range(daily_start, latest_start + 1, granularity):
+                    intervals.append([offset + minute, offset + minute])
+        return cp_model.Domain.FromIntervals(intervals)
+
     def _create_decision_variables(self, courses: List[Course]):
+        use_grid = getattr(self.config, 'use_time_grid', False)
+        domains: Dict[int, cp_model.Domain] = {}
         for c in courses:
             try:
                 cid = c.id
                 duration = c.duration
-                
+
                 # نطاق وقت الجدولة (بالدقائق)
                 max_time = 7 * 24 * 60 - 1
-                
+
                 # متغيرات القرار
-                start = self.model.NewIntVar(0, max_time, f'start_{cid}')
+                if use_grid:
+                    # النطاق يحتوي فقط على البدايات القانونية، فلا حاجة لقيود القسمة والباقي
+                    if duration not in domains:
+                        domains[duration] = self._build_start_domain(duration)
+                    domain = domains[duration]
+                    if self._use_guards:
+                        # وضع التشخيص: النطاق يُفرض كقيد محروس ليظهر في نواة عدم الإمكانية
+                        start = self.model.NewIntVar(0, max_time, f'start_{cid}')
+                        self.model.AddLinearExpressionInDomain(start, domain).OnlyEnforceIf(self._time_guard(c))
+                    elif domain.is_empty():
+                        logger.warning(f"⚠️ مدة المادة {c.name} ({duration} دقيقة) أطول من يوم العمل")
+                        start = self.model.NewIntVar(0, max_time, f'start_{cid}')
+                        self.model.Add(start < 0)  # لا توجد بداية قانونية: النموذج غير قابل للحل
+                    else:
+                        start = self.model.NewIntVarFromDomain(domain, f'start_{cid}')
+                else:
+                    start = self.model.NewIntVar(0, max_time, f'start_{cid}')
                 end = self.model.NewIntVar(0, max_time + duration, f'end_{cid}')
-                room = self.model.NewIntVar(0, len(self.rooms) - 1, f'room_{cid}')
+                # فئة القاعة (القاعة الفعلية تُعيَّن بعد الحل)
+                room_class = self.model.NewIntVar(0, len(self.room_classes) - 1, f'room_class_{cid}')
                 instr = self.model.NewIntVar(0, len(self.instructors) - 1, f'instr_{cid}')
                 interval = self.model.NewIntervalVar(start, duration, end, f'iv_{cid}')
                 
@@ -212,7 +738,7 @@ class CPSatScheduler:
                 self.variables[cid] = {
                     'start': start,
                     'end': end,
-                    'room': room,
+                    'room_class': room_class,
                     'instr': instr,
                     'interval': interval,
                     'course': c
@@ -222,8 +748,19 @@ class CPSatScheduler:
             except Exception as e:
                 logger.error(f"❌ خطأ في إنشاء متغيرات القرار للمادة {c.id}: {e}")
 
+    def _build_room_classes(self):
+        """تجميع القاعات المتطابقة (النوع، السعة، التجهيزات) في فئات متكافئة"""
+        classes: Dict[Tuple[Any, ...], List[int]] = {}
+        for idx, r in enumerate(self.rooms):
+            key = (r.type, r.capacity, tuple(sorted(r.facilities or [])))
+            classes.setdefault(key, []).append(idx)
+        self.room_classes = list(classes.values())
+        self.room_class_of = {idx: k for k, members in enumerate(self.room_classes) for idx in members}
+        logger.info(f"🏫 {len(self.rooms)} قاعة في {len(self.room_classes)} فئة متكافئة")
+
     def _add_room_constraints(self, courses: List[Course]):
-        room_intervals = defaultdict(list)
+        class_intervals = defaultdict(list)
+        class_courses = defaultdict(list)
         
         for c in courses:
             cid = c.id
@@ -245,28 +782,91 @@ class CPSatScheduler:
             if not suitable_idxs:
                 logger.error(f"❌ لا توجد قاعة مناسبة للمادة {c.name}")
                 continue
+            # قاعات الفئة الواحدة متطابقة، فإما أن تناسب كلها المادة أو لا يناسب أي منها
+            suitable_classes = sorted({self.room_class_of[i] for i in suitable_idxs})
                 
-            # إضافة قيود تعيين القاعة
-            self.model.AddAllowedAssignments([v['room']], [(i,) for i in suitable_idxs])
+            # إضافة قيود تعيين فئة القاعة
+            self.model.AddAllowedAssignments([v['room_class']], [(k,) for k in suitable_classes])
             
-            # إضافة قيود عدم التداخل
-            for ridx in suitable_idxs:
-                b = self.model.NewBoolVar(f'room_assign_{cid}_{ridx}')
-                self.model.Add(v['room'] == ridx).OnlyEnforceIf(b)
-                self.model.Add(v['room'] != ridx).OnlyEnforceIf(b.Not())
+            # فترة اختيارية لكل فئة مناسبة
+            v['room_choices'] = {}
+            for k in suitable_classes:
+                b = self.model.NewBoolVar(f'room_assign_{cid}_{k}')
+                self.model.Add(v['room_class'] == k).OnlyEnforceIf(b)
+                self.model.Add(v['room_class'] != k).OnlyEnforceIf(b.Not())
+                v['room_choices'][k] = b
                 
                 iv = self.model.NewOptionalIntervalVar(
-                    v['start'], c.duration, v['end'], b, f'opt_iv_{cid}_{ridx}')
-                room_intervals[ridx].append(iv)
+                    v['start'], c.duration, v['end'], b, f'opt_iv_{cid}_{k}')
+                class_intervals[k].append(iv)
+                class_courses[k].append(cid)
         
-        # قيد عدم التداخل لكل قاعة
-        for idx, ivs in room_intervals.items():
-            if ivs:
-                self.model.AddNoOverlap(ivs)
-                logger.debug(f"🚫 تم إضافة قيد عدم التداخل للقاعة: {self.rooms[idx].name}")
+        # لكل فئة: عدد المحاضرات المتزامنة لا يتجاوز عدد قاعاتها
+        for k, ivs in class_intervals.items():
+            if not ivs:
+                continue
+            members = self.room_classes[k]
+            names = "، ".join(self.rooms[i].name for i in members)
+            guard = self._guard(
+                "room", f"class{k}", f"عدم تجاوز سعة القاعات ({names})",
+                course_ids=class_courses[k], room_ids=[self.rooms[i].id for i in members]
+            )
+            if len(members) == 1:
+                self.model.AddNoOverlap(ivs).OnlyEnforceIf(guard)
+            else:
+                self.model.AddCumulative(ivs, [1] * len(ivs), len(members)).OnlyEnforceIf(guard)
+            logger.debug(f"🚫 تم إضافة قيد السعة لفئة القاعات: {names}")
+
+    def _assign_rooms(self, courses: List[Course], assignment: Dict[str, Tuple[int, int, int]]) -> Dict[str, int]:
+        """
+        تعيين قاعة فعلية لكل مادة داخل فئتها بتلوين مخطط الفترات: المواد مرتبة حسب البداية
+        وتأخذ كل منها قاعة شاغرة (المفضلة إن كانت شاغرة). قيد Cumulative يضمن وجود قاعة شاغرة دائمًا.
+        """
+        by_class = defaultdict(list)
+        for c in courses:
+            if c.id in assignment:
+                start, k, _ = assignment[c.id]
+                by_class[k].append((start, start + c.duration, c.id))
+
+        rooms_of: Dict[str, int] = {}
+        for k, items in by_class.items():
+            members = self.room_classes[k]
+            items.sort()
+            # فترات المواد التي تفضل كل قاعة، لتجنب أخذ قاعة مفضلة لمادة أخرى متداخلة
+            claims = defaultdict(list)
+            for start, end, cid in items:
+                preferred = self._preferred_rooms.get(cid)
+                if preferred in members:
+                    claims[preferred].append((start, end, cid))
+            busy_until = {ridx: -1 for ridx in members}
+            used = {ridx: 0 for ridx in members}
+            for start, end, cid in items:
+                free = [ridx for ridx in members if busy_until[ridx] <= start]
+                if not free:
+                    logger.warning(f"⚠️ لا توجد قاعة شاغرة للمادة {cid} ضمن فئتها")
+                    free = [min(members, key=busy_until.get)]
+                preferred = self._preferred_rooms.get(cid)
+                if preferred in free:
+                    ridx = preferred
+                else:
+                    unclaimed = [
+                        r for r in free
+                        if not any(s < end and start < e and other != cid for s, e, other in claims[r])
+                    ]
+                    # القاعة الأقل استخدامًا حتى الآن لتوازن الاستخدام داخل الفئة
+                    ridx = min(unclaimed or free, key=lambda r: used[r])
+                busy_until[ridx] = end
+                used[ridx] += end - start
+                rooms_of[cid] = ridx
+        return rooms_of
 
     def _add_instructor_constraints(self, courses: List[Course]):
         instr_intervals = defaultdict(list)
+        instr_courses = defaultdict(list)
+        # فهرس المعرف -> موضع المدرس (أول ظهور) بدلاً من البحث الخطي لكل مادة
+        instructor_index: Dict[str, int] = {}
+        for i, inst in enumerate(self.instructors):
+            instructor_index.setdefault(inst.id, i)
         
         for c in courses:
             cid = c.id
@@ -277,8 +877,8 @@ class CPSatScheduler:
             
             try:
                 # البحث عن المدرس المناسب
-                instructor = next(inst for inst in self.instructors if inst.id == c.instructor_id)
-                idx = self.instructors.index(instructor)
+                idx = instructor_index[c.instructor_id]
+                instructor = self.instructors[idx]
                 
                 # التحقق من تخصص المدرس
                 if c.course_type not in instructor.expertise:
@@ -290,7 +890,8 @@ class CPSatScheduler:
                 
                 # تسجيل الفترة الزمنية للمدرس
                 instr_intervals[idx].append(v['interval'])
-            except StopIteration:
+                instr_courses[idx].append(cid)
+            except KeyError:
                 logger.error(f"❌ مدرس غير موجود: {c.instructor_id}")
             except Exception as e:
                 logger.error(f"❌ خطأ في إضافة قيود المدرس للمادة {c.id}: {e}")
@@ -298,7 +899,11 @@ class CPSatScheduler:
         # قيد عدم التداخل لكل مدرس
         for idx, ivs in instr_intervals.items():
             if ivs:
-                self.model.AddNoOverlap(ivs)
+                instructor = self.instructors[idx]
+                self.model.AddNoOverlap(ivs).OnlyEnforceIf(self._guard(
+                    "instructor", instructor.id, f"عدم تداخل محاضرات المدرس {instructor.name}",
+                    course_ids=instr_courses[idx], instructor_ids=[instructor.id]
+                ))
                 logger.debug(f"👨‍🏫 تم إضافة قيود عدم التداخل للمدرس: {self.instructors[idx].name}")
 
     def _add_group_constraints(self, courses: List[Course]):
@@ -308,6 +913,10 @@ class CPSatScheduler:
         subgroup_intervals = defaultdict(list)
         # ربط الأبناء مع الأب
         parent_to_subgroups = defaultdict(list)
+        # معرفات المواد لكل قيد (لتقرير عدم الإمكانية)
+        base_grp_courses = defaultdict(list)
+        subgroup_courses = defaultdict(list)
+        parent_to_sub_courses = defaultdict(list)
 
         # فصل المواد النظرية والعملية
         theory_courses = []
@@ -324,8 +933,9 @@ class CPSatScheduler:
             if c.id not in self.variables:
                 continue
             v = self.variables[c.id]
-            base_group_id = c.group_id.split('_')[0] if '_sub' in c.group_id else c.group_id
+            base_group_id = self._base_group_id(c.group_id)
             base_grp_intervals[base_group_id].append(v['interval'])
+            base_grp_courses[base_group_id].append(c.id)
 
         for c in lab_courses:
             if c.id not in self.variables:
@@ -335,17 +945,25 @@ class CPSatScheduler:
             parent_group_id = c.group_id.split('_sub')[0] if '_sub' in c.group_id else c.group_id
             subgroup_intervals[c.group_id].append(v['interval'])
             parent_to_subgroups[parent_group_id].append(v['interval'])
+            subgroup_courses[c.group_id].append(c.id)
+            parent_to_sub_courses[parent_group_id].append(c.id)
 
         # قيود عدم التداخل للمواد النظرية (للمجموعة كاملة)
         for grp_id, ivs in base_grp_intervals.items():
             if ivs:
-                self.model.AddNoOverlap(ivs)
+                self.model.AddNoOverlap(ivs).OnlyEnforceIf(self._guard(
+                    "group", grp_id, f"عدم تداخل محاضرات المجموعة {grp_id}",
+                    course_ids=base_grp_courses[grp_id], group_ids=[grp_id]
+                ))
                 logger.debug(f"👥 تم إضافة قيود عدم التداخل للمجموعة الأصلية: {grp_id}")
 
         # قيود الأقسام الفرعية (لكل قسم على حدة)
         for grp_id, ivs in subgroup_intervals.items():
             if ivs:
-                self.model.AddNoOverlap(ivs)
+                self.model.AddNoOverlap(ivs).OnlyEnforceIf(self._guard(
+                    "group", grp_id, f"عدم تداخل محاضرات القسم الفرعي {grp_id}",
+                    course_ids=subgroup_courses[grp_id], group_ids=[grp_id]
+                ))
                 logger.debug(f"👥 تم إضافة قيود عدم التداخل للقسم الفرعي: {grp_id}")
 
         # إضافة قيد عدم التداخل بين الأب وجميع الأبناء
@@ -353,78 +971,294 @@ class CPSatScheduler:
             parent_intervals = base_grp_intervals[parent_id]
             sub_intervals = parent_to_subgroups.get(parent_id, [])
             if parent_intervals and sub_intervals:
-                self.model.AddNoOverlap(parent_intervals + sub_intervals)
+                self.model.AddNoOverlap(parent_intervals + sub_intervals).OnlyEnforceIf(self._guard(
+                    "group", f"{parent_id}+sub", f"عدم تداخل محاضرات المجموعة {parent_id} مع أقسامها الفرعية",
+                    course_ids=base_grp_courses[parent_id] + parent_to_sub_courses[parent_id],
+                    group_ids=[parent_id]
+                ))
                 logger.debug(f"� تم إضافة قيد عدم التداخل بين الأب ({parent_id}) وجميع الأبناء")
 
     def _add_time_constraints(self, courses: List[Course]):
+        if getattr(self.config, 'use_time_grid', False):
+            # نطاقات البدء مبنية مسبقًا على نوافذ العمل القانونية فقط
+            logger.debug("⏰ وضع شبكة الزمن مفعّل: القيود الزمنية مضمّنة في نطاقات البدء")
+            return
         daily_start = self._time_to_minutes(self.config.daily_start_time)
         daily_end = self._time_to_minutes(self.config.daily_end_time)
         # days as int (0=Saturday, ...)
-        working_days = [d.value if hasattr(d, 'value') else int(d) for d in self.config.working_days]
+        working_days = self._working_days_ints()
         for c in courses:
             cid = c.id
             if cid not in self.variables:
                 continue
             v = self.variables[cid]
-            # حساب الوقت ضمن اليوم
-            mod = self.model.NewIntVar(daily_start, daily_end-1, f'mod_{cid}')
+            guard = self._time_guard(c)
+            # حساب الوقت ضمن اليوم (في وضع التشخيص لا تُقيَّد النطاقات إلا بالقيود المحروسة)
+            if guard:
+                mod = self.model.NewIntVar(0, 24*60 - 1, f'mod_{cid}')
+            else:
+                mod = self.model.NewIntVar(daily_start, daily_end-1, f'mod_{cid}')
             self.model.AddModuloEquality(mod, v['start'], 24*60)
             # القيود اليومية
-            self.model.Add(mod >= daily_start)
-            self.model.Add(mod + c.duration <= daily_end)
+            self.model.Add(mod >= daily_start).OnlyEnforceIf(guard)
+            self.model.Add(mod + c.duration <= daily_end).OnlyEnforceIf(guard)
             # أيام العمل
-            day = self.model.NewIntVarFromDomain(cp_model.Domain.FromValues(working_days), f'day_{cid}')
+            if guard:
+                day = self.model.NewIntVar(0, 6, f'day_{cid}')
+            else:
+                day = self.model.NewIntVarFromDomain(cp_model.Domain.FromValues(working_days), f'day_{cid}')
             self.model.AddDivisionEquality(day, v['start'], 24*60)
             # قيد صارم: لا يُسمح إلا بالأيام المسموحة فقط
-            self.model.AddAllowedAssignments([day], [(d,) for d in working_days])
+            if guard:
+                self.model.AddLinearExpressionInDomain(
+                    day, cp_model.Domain.FromValues(working_days)).OnlyEnforceIf(guard)
+            else:
+                self.model.AddAllowedAssignments([day], [(d,) for d in working_days])
             logger.debug(f"⏰ تم إضافة قيود زمنية للمادة: {c.name}")
 
     def _time_to_minutes(self, t: time) -> int:
         return t.hour * 60 + t.minute
 
+    def _schedule_start_minutes(self, entry: Schedule) -> int:
+        """وقت بدء مدخل جدول بدقائق الأسبوع (نفس ترميز متغير start)"""
+        day = entry.time_slot.day
+        day_int = day.value if hasattr(day, 'value') else int(day)
+        return day_int * 24 * 60 + entry.time_slot.start_minutes
+
+    def _is_unchanged(self, course: Course, entry: Schedule, room_idx: Optional[int]) -> bool:
+        """هل بيانات المادة والقاعة المعيّنة لها كما كانت عند توليد الجدول السابق؟"""
+        prev = entry.assigned_course
+        if prev is None or room_idx is None:
+            return False
+        if self.room_class_of.get(room_idx) not in self.variables[course.id].get('room_choices', {}):
+            return False
+        return (
+            prev.duration == course.duration
+            and prev.course_type == course.course_type
+            and prev.group_id == course.group_id
+            and prev.instructor_id == course.instructor_id == entry.instructor_id
+            and list(prev.required_facilities or []) == list(course.required_facilities or [])
+        )
+
+    def _apply_warm_start(self, previous_schedule: List[Schedule], fix_unchanged: bool) -> List[Any]:
+        """
+        إضافة تلميحات (AddHint) من جدول سابق لكل مادة (بما فيها الأقسام _subN)،
+        وإرجاع متغيرات التثبيت للمواد غير المتغيرة لاستخدامها كافتراضات.
+        """
+        room_index = {r.id: i for i, r in enumerate(self.rooms)}
+        instr_index = {inst.id: i for i, inst in enumerate(self.instructors)}
+        previous = {s.course_id: s for s in previous_schedule}
+        pins = []
+        hinted = 0
+        for cid, v in self.variables.items():
+            entry = previous.get(cid)
+            if entry is None:
+                continue
+            start = self._schedule_start_minutes(entry)
+            room_idx = room_index.get(entry.room_id)
+            instr_idx = instr_index.get(entry.instructor_id)
+
+            self.model.AddHint(v['start'], start)
+            self.model.AddHint(v['end'], start + v['course'].duration)
+            if room_idx is not None:
+                room_class = self.room_class_of[room_idx]
+                self.model.AddHint(v['room_class'], room_class)
+                for k, b in v.get('room_choices', {}).items():
+                    self.model.AddHint(b, k == room_class)
+                self._preferred_rooms[cid] = room_idx
+            if instr_idx is not None:
+                self.model.AddHint(v['instr'], instr_idx)
+            hinted += 1
+
+            if fix_unchanged and self._is_unchanged(v['course'], entry, room_idx):
+                pin = self.model.NewBoolVar(f'pin_{cid}')
+                self.model.Add(v['start'] == start).OnlyEnforceIf(pin)
+                self.model.Add(v['room_class'] == self.room_class_of[room_idx]).OnlyEnforceIf(pin)
+                pins.append(pin)
+        logger.info(f"♻️ بدء دافئ: {hinted} تلميح، {len(pins)} تعيين مثبت")
+        return pins
+
+    def _base_group_id(self, group_id: str) -> str:
+        """معرف المجموعة الأصلية لقسم فرعي (G1_sub2 -> G1)"""
+        return group_id.split('_')[0] if '_sub' in group_id else group_id
+
+    def _index_by_base_group(self, courses: List[Course]) -> Dict[str, Dict[str, List[Course]]]:
+        """فهرس المجموعة الأصلية -> المواد النظرية والعملية (مرور واحد على المواد)"""
+        index: Dict[str, Dict[str, List[Course]]] = defaultdict(lambda: {"theory": [], "lab": []})
+        for c in courses:
+            if c.id not in self.variables:
+                continue
+            if c.course_type == "نظرية" and '_sub' not in c.id:
+                index[self._base_group_id(c.group_id)]["theory"].append(c)
+            elif c.course_type == "عملي":
+                index[self._base_group_id(c.group_id)]["lab"].append(c)
+        return index
+
     def _add_rotation_constraints(self, courses: List[Course]):
         """إضافة قيود التناوب للمواد العملية"""
-        # 1. قيود التناوب المباشرة بين الأقسام
+        # 1. قيود التناوب: أقسام مجموعة التدوير تبدأ معًا إذا ضمت مادتين مختلفتين على الأقل.
+        # المساواة متعدية، فتكفي سلسلة من n-1 قيد بدلاً من كل الأزواج
         for rotation_group, lab_courses in self.rotation_groups.items():
-            if len(lab_courses) < 2:
+            chain = [c for c in lab_courses if c.id in self.variables]
+            if len({c.id.split('_')[0] for c in chain}) < 2:
                 continue
-                
-            # إنشاء أزواج التناوب (نظام التبادل)
-            for i in range(len(lab_courses)):
-                for j in range(i+1, len(lab_courses)):
-                    c1 = lab_courses[i]
-                    c2 = lab_courses[j]
-                    
-                    # فقط إذا كانت من نفس مجموعة التدوير ولكن مواد مختلفة
-                    if c1.rotation_group == c2.rotation_group and c1.id.split('_')[0] != c2.id.split('_')[0]:
-                        v1 = self.variables[c1.id]
-                        v2 = self.variables[c2.id]
-                        
-                        # قيد التناوب: يجب أن تكون المواد في نفس الوقت
-                        self.model.Add(v1['start'] == v2['start'])
-                        logger.debug(f"🔄 تم إضافة قيد تدوير بين {c1.name} و {c2.name}")
-        
-        # 2. قيود ترتيب المواد: نظرية أولاً ثم عملية
-        theory_courses = [c for c in courses if '_sub' not in c.id and c.course_type == "نظرية"]
-        lab_courses = [c for c in courses if c.course_type == "عملي"]
+            guard = self._guard(
+                "rotation", rotation_group, f"تزامن أقسام مجموعة التدوير {rotation_group}",
+                course_ids=[c.id for c in chain], group_ids=[c.group_id for c in chain]
+            )
+            for c1, c2 in zip(chain, chain[1:]):
+                self.model.Add(self.variables[c1.id]['start'] == self.variables[c2.id]['start']).OnlyEnforceIf(guard)
+            logger.debug(f"🔄 تم إضافة قيد تدوير بين {len(chain)} أقسام في {rotation_group}")
         
-        for theory_c in theory_courses:
-            if theory_c.id not in self.variables:
+        # 2. قيود ترتيب المواد: نظرية أولاً ثم عملية، عبر نهاية آخر مادة نظرية في كل مجموعة
+        for base_group_id, by_type in self._index_by_base_group(courses).items():
+            theory_courses, lab_courses = by_type["theory"], by_type["lab"]
+            if not theory_courses or not lab_courses:
                 continue
-                
-            v_theory = self.variables[theory_c.id]
-            base_group_id = theory_c.group_id.split('_')[0] if '_sub' in theory_c.group_id else theory_c.group_id
-            
+            theory_ends = [self.variables[c.id]['end'] for c in theory_courses]
+            if len(theory_ends) == 1:
+                last_theory_end = theory_ends[0]
+            else:
+                last_theory_end = self.model.NewIntVar(0, 7 * 24 * 60 * 2, f'theory_end_{base_group_id}')
+                self.model.AddMaxEquality(last_theory_end, theory_ends)
             for lab_c in lab_courses:
-                if lab_c.id not in self.variables:
-                    continue
-                    
-                # فقط إذا كانت لنفس المجموعة الأصلية
-                lab_base_group = lab_c.group_id.split('_')[0] if '_sub' in lab_c.group_id else lab_c.group_id
-                if lab_base_group == base_group_id:
-                    v_lab = self.variables[lab_c.id]
-                    self.model.Add(v_lab['start'] >= v_theory['end'])
-                    logger.debug(f"⏱ تم إضافة قيد ترتيب: {theory_c.name} قبل {lab_c.name}")
+                self.model.Add(self.variables[lab_c.id]['start'] >= last_theory_end).OnlyEnforceIf(self._guard(
+                    "precedence", lab_c.id,
+                    f"المادة العملية {lab_c.name} بعد كل المواد النظرية للمجموعة {base_group_id}",
+                    course_ids=[c.id for c in theory_courses] + [lab_c.id], group_ids=[base_group_id]
+                ))
+            logger.debug(f"⏱ تم إضافة قيود ترتيب المجموعة {base_group_id}: "
+                         f"{len(theory_courses)} نظرية قبل {len(lab_courses)} عملية")
+
+    def _day_literals(self, courses: List[Course]) -> Dict[str, Dict[int, Any]]:
+        """متغير منطقي لكل (مادة، يوم عمل) يساوي 1 إذا بدأت المادة في ذلك اليوم"""
+        day_lits: Dict[str, Dict[int, Any]] = {}
+        for c in courses:
+            v = self.variables.get(c.id)
+            if v is None:
+                continue
+            lits = {}
+            for d in self._working_days_ints():
+                x = self.model.NewBoolVar(f'day_{c.id}_{d}')
+                self.model.AddLinearExpressionInDomain(
+                    v['start'], cp_model.Domain(d * 24 * 60, d * 24 * 60 + 24 * 60 - 1)).OnlyEnforceIf(x)
+                lits[d] = x
+            self.model.AddExactlyOne(lits.values())
+            day_lits[c.id] = lits
+        return day_lits
+
+    def _add_soft_objective(self, courses: List[Course]):
+        """
+        ترميز القيود المرنة (SoftConstraintsValidator) كهدف خطي مرجح بـ Config.penalty_weights.
+        مطابقة للمحقق: البدايات في أوقات غير مفضلة، الأيام والفترات غير المفضلة للمدرس، وكل فجوة
+        بين محاضرتين متتاليتين للمجموعة في اليوم تتجاوز الساعة.
+        تقريبية: توازن القاعات يُقاس على فئات القاعات داخل نوعها (التوازن داخل الفئة متروك لـ _assign_rooms).
+        غير مرمزة: مكافأة الدمج. لذلك OPTIMAL تعني أفضل حل لهذا الهدف لا لعقوبة المحقق كاملة.
+        الأوزان مضروبة في 300 (مضاعف 30 و100) لتبقى أوزان الدقائق أعدادًا صحيحة.
+        """
+        weights = self.config.penalty_weights
+        scale = 300
+        day_minutes = 24 * 60
+        working_days = self._working_days_ints()
+        day_lits = self._day_literals(courses)
+        instructors = {inst.id: inst for inst in self.instructors}
+        terms = []
+
+        # 1. أوقات غير مفضلة: البدء في أول الصباح (<= 08:00) أو آخر اليوم (>= 16:00)
+        w_time = max(1, round(scale * weights.get("time_preference", 30)))
+        unfavorable = cp_model.Domain.FromIntervals(
+            [[d * day_minutes, d * day_minutes + 8 * 60] for d in working_days]
+            + [[d * day_minutes + 16 * 60, d * day_minutes + day_minutes - 1] for d in working_days]
+        )
+        for c in courses:
+            v = self.variables.get(c.id)
+            if v is None:
+                continue
+            b = self.model.NewBoolVar(f'unfavorable_{c.id}')
+            self.model.AddLinearExpressionInDomain(v['start'], unfavorable).OnlyEnforceIf(b)
+            self.model.AddLinearExpressionInDomain(v['start'], unfavorable.complement()).OnlyEnforceIf(b.Not())
+            terms.append(w_time * b)
+
+        # 2. تفضيلات المدرس (نفس وزن instructor_preference في المحقق والخوارزمية الجينية):
+        #    يوم غير مفضل، وبداية خارج كل فتراته المفضلة
+        w_pref = max(1, round(scale * weights.get("instructor_preference", 5)))
+        for c in courses:
+            instructor = instructors.get(c.instructor_id)
+            if c.id not in day_lits or instructor is None:
+                continue
+            if instructor.preferred_days:
+                preferred = {d.value if hasattr(d, 'value') else int(d) for d in instructor.preferred_days}
+                terms.extend(w_pref * x for d, x in day_lits[c.id].items() if d not in preferred)
+            if instructor.preferred_slots:
+                # المحقق يقبل البداية إذا وقعت بين بداية الفترة ونهايتها في نفس اليوم
+                in_slot = cp_model.Domain.FromIntervals([
+                    [day * day_minutes + self._time_to_minutes(p.start_time),
+                     day * day_minutes + self._time_to_minutes(p.end_time)]
+                    for p in instructor.preferred_slots
+                    for day in [p.day.value if hasattr(p.day, 'value') else int(p.day)]
+                ])
+                b = self.model.NewBoolVar(f'off_slot_{c.id}')
+                start = self.variables[c.id]['start']
+                self.model.AddLinearExpressionInDomain(start, in_slot.complement()).OnlyEnforceIf(b)
+                self.model.AddLinearExpressionInDomain(start, in_slot).OnlyEnforceIf(b.Not())
+                terms.append(w_pref * b)
+
+        # 3. فجوات المجموعات: كل فجوة بين محاضرتين متتاليتين في نفس اليوم بعد سماحية ساعة
+        w_gap = max(1, round(scale * weights.get("minimize_gaps", 10) / 30))  # لكل دقيقة
+        by_group = defaultdict(list)
+        for c in courses:
+            if c.id in day_lits:
+                by_group[c.group_id].append(c)
+        for group_id, group_courses in by_group.items():
+            if len(group_courses) < 2:
+                continue
+            # ترتيب محاضرات المجموعة في الأسبوع كدائرة: العقدة 0 طرفا الأسبوع، والقوس i->j يعني أن j تلي i مباشرة
+            # (الترتيب حسب البداية ثم ترتيب المواد، كالفرز المستقر في المحقق)
+            arcs = []
+            for i, ci in enumerate(group_courses, 1):
+                vi = self.variables[ci.id]
+                arcs.append((0, i, self.model.NewBoolVar(f'first_{group_id}_{ci.id}')))
+                arcs.append((i, 0, self.model.NewBoolVar(f'last_{group_id}_{ci.id}')))
+                for j, cj in enumerate(group_courses, 1):
+                    if i == j:
+                        continue
+                    vj = self.variables[cj.id]
+                    follows = self.model.NewBoolVar(f'next_{ci.id}_{cj.id}')
+                    arcs.append((i, j, follows))
+                    self.model.Add(vj['start'] >= vi['start'] + (1 if j < i else 0)).OnlyEnforceIf(follows)
+                    gap = self.model.NewIntVar(0, day_minutes, f'gap_{ci.id}_{cj.id}')
+                    for d in working_days:
+                        self.model.Add(gap >= vj['start'] - vi['end'] - 60).OnlyEnforceIf(
+                            [follows, day_lits[ci.id][d], day_lits[cj.id][d]])
+                    terms.append(w_gap * gap)
+            self.model.AddCircuit(arcs)
+
+        # 4. توازن استخدام القاعات (تقريبي): انحراف استخدام كل فئة عن نصيبها من متوسط نوعها.
+        #    النوع ذو الفئة الواحدة لا خيار فيه، وتوزيع المواد على قاعات الفئة يتم في _assign_rooms
+        w_room = max(1, round(scale * weights.get("balance_room_usage", 5) / 100))  # لكل دقيقة
+        usage = defaultdict(list)
+        for c in courses:
+            v = self.variables.get(c.id)
+            for k, b in (v or {}).get('room_choices', {}).items():
+                usage[k].append(c.duration * b)
+        by_type = defaultdict(list)
+        for k in usage:
+            by_type[self.rooms[self.room_classes[k][0]].type].append(k)
+        for room_type, class_idxs in by_type.items():
+            if len(class_idxs) < 2:
+                continue
+            total = sum(c.duration for c in courses
+                        if set(self.variables.get(c.id, {}).get('room_choices', {})) & set(class_idxs))
+            type_rooms = sum(len(self.room_classes[k]) for k in class_idxs)
+            for k in class_idxs:
+                target = round(total * len(self.room_classes[k]) / type_rooms)
+                dev = self.model.NewIntVar(0, max(total, target), f'room_dev_{k}')
+                self.model.Add(dev >= sum(usage[k]) - target)
+                self.model.Add(dev >= target - sum(usage[k]))
+                terms.append(w_room * dev)
+
+        self.model.Minimize(sum(terms))
+        logger.info(f"🎯 وضع التحسين: {len(terms)} حدًا في دالة الهدف")
 
     def _analyze_infeasibility(self, courses: List[Course]):
         """تحليل متقدم لأسباب عدم إمكانية الجدولة"""
@@ -481,10 +1315,21 @@ class CPSatScheduler:
             logger.error("   - تعارض في أوقات الجدولة")
             logger.error("   - قيود غير منطقية في البيانات")
 
-    def _extract_schedule(self, status: int, courses: List[Course]) -> List[Schedule]:
+    def _extract_schedule(
+        self,
+        status: int,
+        courses: List[Course],
+        values: Optional[Dict[str, Tuple[int, int, int]]] = None
+    ) -> List[Schedule]:
         """
-        استخراج الجدول النهائي من النموذج
+        استخراج الجدول النهائي من النموذج (أو من قيم حل محفوظ: start, room_class, instr)
         """
+        if values is None:
+            values = {
+                cid: (self.solver.Value(v['start']), self.solver.Value(v['room_class']), self.solver.Value(v['instr']))
+                for cid, v in self.variables.items()
+            }
+        rooms_of = self._assign_rooms(courses, values)
         result = []
         for c in courses:
             try:
@@ -492,19 +1337,18 @@ class CPSatScheduler:
                     logger.warning(f"⚠️ لا يوجد جدول للمادة: {c.id}")
                     continue
                     
-                sched = self._create_schedule_entry(c)
+                st_minutes, _, instr_idx = values[c.id]
+                sched = self._create_schedule_entry(c, (st_minutes, rooms_of[c.id], instr_idx))
                 result.append(sched)
             except Exception as e:
                 logger.error(f"❌ خطأ في استخراج الجدول للمادة {c.id}: {e}")
         return result
 
-    def _create_schedule_entry(self, course: Course) -> Schedule:
+    def _create_schedule_entry(self, course: Course, values: Tuple[int, int, int]) -> Schedule:
 
         try:
-            vals = self.variables[course.id]
-            st_minutes = self.solver.Value(vals['start'])
-            room_idx = self.solver.Value(vals['room'])
-            instr_idx = self.solver.Value(vals['instr'])
+            # (start, room, instr) بعد توزيع القاعات الفعلية
+            st_minutes, room_idx, instr_idx = values
             
             room = self.rooms[room_idx]
             instructor = self.instructors[instr_idx]
@@ -617,4 +1461,23 @@ def analyze_feasibility(courses, rooms, groups, instructors, working_days, daily
         if group_minutes[g.id] > total_days * day_minutes:
             logger(f"  ❌ المجموعة {g.id} تحتاج زيادة الأيام أو تقليل المواد.")
     logger("\n===== نهاية التقرير =====\n")
-    return
\ No newline at end of file
+    return
+
+
+def _solve_component(
+    config: Config,
+    courses: List[Course],
+    rooms: List[Room],
+    groups: List[Group],
+    instructors: List[Instructor],
+    previous_schedule: Optional[List[Schedule]],
+    fix_unchanged: bool,
+    num_workers: int,
+    progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None
+) -> Tuple[List[Schedule], Optional[InfeasibilityReport], Dict[str, Any]]:
+    """حل مكون مستقل في عملية منفصلة (دالة على مستوى الوحدة لتكون قابلة للتسلسل)"""
+    scheduler = CPSatScheduler(config)
+    schedule = scheduler._solve(
+        courses, rooms, groups, instructors, previous_schedule, fix_unchanged, num_workers, progress_callback
+    )
+    return schedule, scheduler.last_infeasibility, scheduler.stats
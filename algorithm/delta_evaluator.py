@@ -0,0 +1,212 @@
+import logging
+from bisect import bisect_left
+from typing import Dict, List
+
+import numpy as np
+
+from algorithm.genome import GenomeEvaluator, PENALTY_KEYS, MINUTES_PER_DAY, START, ROOM, INSTRUCTOR
+from algorithm.moves import Move
+
+logger = logging.getLogger(__name__)
+
+
+class DeltaEvaluator:
+    """
+    تقييم تزايدي لجينوم واحد: قوائم مرتبة (البداية، الجلسة) لكل قاعة ومدرس ومجموعة
+    ومجاميع جزئية لكل قيد، بحيث تُقيَّم الحركة بإعادة حساب الجيران المتأثرين فقط
+    بدل إعادة تقييم الجدول كاملاً. موضع الجلسة يُحدَّد ببحث ثنائي O(log k) في قائمة المورد، أما الإدراج
+    والحذف فـ O(k) لإزاحة عناصر القائمة، وk (جلسات المورد الواحد في الأسبوع) صغير.
+    """
+
+    def __init__(self, evaluator: GenomeEvaluator, genome: np.ndarray, weights: Dict[str, float]):
+        self.evaluator = evaluator
+        self.codec = evaluator.codec
+        self.genome = np.array(genome, dtype=np.int32)
+        self.weights = [float(weights.get(k, 1.0)) for k in PENALTY_KEYS]
+
+        codec = self.codec
+        self.durations = [int(d) for d in codec.durations]
+        self.group_of = [int(g) for g in codec.group_idx]
+        self.is_sub = [bool(x) for x in codec.is_sub]
+        self.pattern_of = [int(p) for p in evaluator.pattern_idx]
+        self.merge_set = set(evaluator.merge_sessions)
+        self.starts = [int(v) for v in self.genome[:, START]]
+        self.rooms = [int(v) for v in self.genome[:, ROOM]]
+        self.instructors = [int(v) for v in self.genome[:, INSTRUCTOR]]
+
+        # القوائم المرتبة لكل مورد
+        self.room_index: List[list] = [[] for _ in codec.rooms]
+        self.instructor_index: List[list] = [[] for _ in codec.instructors]
+        self.group_index: List[list] = [[] for _ in codec.group_ids]
+
+        # المجاميع الجزئية
+        self.room_pairs = 0
+        self.instructor_pairs = 0
+        self.group_pairs = 0
+        self.gap_excess = 0  # مجموع (الفجوة - 60) بالدقائق
+        self.facility = 0
+        self.time_preference = 0
+        self.instructor_preference = 0
+        self.room_usage = np.zeros(len(codec.rooms))
+        self.room_sessions = np.zeros(len(codec.rooms), dtype=np.int64)
+        self._imbalance_value = None
+        self.merge = -float(evaluator._merge_bonus(self.genome[None, :, START].astype(np.int64))[0])
+
+        for idx in range(codec.n_sessions):
+            self._insert(idx)
+
+    # ------------------------------------------------------------------
+    # واجهة الاستخدام
+    # ------------------------------------------------------------------
+    def _imbalance(self) -> float:
+        """انحراف استخدام القاعات المستعملة عن المتوسط / 100"""
+        # لا يتغير إلا عند نقل جلسة بين قاعتين، فيُحفظ بين الحركات الزمنية
+        if self._imbalance_value is None:
+            used = self.room_sessions > 0
+            if used.any():
+                usage = self.room_usage[used]
+                self._imbalance_value = float(np.abs(usage - usage.mean()).sum() / 100)
+            else:
+                self._imbalance_value = 0.0
+        return self._imbalance_value
+
+    def breakdown(self) -> np.ndarray:
+        """متجه العقوبات بترتيب PENALTY_KEYS (نفس قيم GenomeEvaluator)"""
+        return np.array(self._terms())
+
+    def _terms(self) -> list:
+        return [
+            self.room_pairs * 100.0,
+            self.instructor_pairs * 200.0,
+            self.group_pairs * 150.0,
+            self.facility,
+            self.time_preference,
+            self.gap_excess / 30,
+            self._imbalance(),
+            self.instructor_preference,
+            self.merge
+        ]
+
+    def penalty(self) -> Dict[str, float]:
+        """تفصيل العقوبات الحالي بنفس مفاتيح SoftConstraintsValidator.penalty"""
+        return dict(zip(PENALTY_KEYS, (float(v) for v in self.breakdown())))
+
+    def cost(self) -> float:
+        """العقوبة المرجحة الحالية"""
+        return sum(w * v for w, v in zip(self.weights, self._terms()))
+
+    def apply(self, move: Move) -> Move:
+        """تطبيق الحركة في مكانها وتحديث المجاميع الجزئية، وإرجاع حركة التراجع"""
+        undo = []
+        touches_merge = False
+        for idx, start, room, instructor in move:
+            undo.append((idx, self.starts[idx], self.rooms[idx], self.instructors[idx]))
+            if room != self.rooms[idx]:
+                self._imbalance_value = None
+            self._remove(idx)
+            self.starts[idx], self.rooms[idx], self.instructors[idx] = start, room, instructor
+            self.genome[idx] = (start, room, instructor)
+            self._insert(idx)
+            touches_merge = touches_merge or idx in self.merge_set
+        if touches_merge:
+            self.merge = -float(self.evaluator._merge_bonus(self.genome[None, :, START].astype(np.int64))[0])
+        return undo[::-1]
+
+    def delta(self, move: Move) -> float:
+        """تغير العقوبة المرجحة لو طُبقت الحركة (دون تطبيقها فعليًا)"""
+        before = self.cost()
+        undo = self.apply(move)
+        after = self.cost()
+        self.apply(undo)
+        return after - before
+
+    # ------------------------------------------------------------------
+    # تحديث الهياكل
+    # ------------------------------------------------------------------
+    def _end(self, idx: int) -> int:
+        return self.starts[idx] + self.durations[idx]
+
+    def _overlap(self, a: int, b: int) -> int:
+        """تداخل جلستين متتاليتين في الترتيب (a تبدأ قبل b)"""
+        return 1 if self.starts[b] < self._end(a) else 0
+
+    def _group_terms(self, a: int, b: int):
+        """(تعارض المجموعة، زيادة الفجوة عن ساعة) لجلستين متتاليتين لنفس المجموعة"""
+        conflict = self._overlap(a, b) and not (self.is_sub[a] and self.is_sub[b])
+        gap_excess = 0
+        if self.starts[a] // MINUTES_PER_DAY == self.starts[b] // MINUTES_PER_DAY:
+            gap = self.starts[b] - self._end(a)
+            if gap > 60:
+                gap_excess = gap - 60
+        return (1 if conflict else 0), gap_excess
+
+    def _neighbours(self, entries: list, pos: int, present: bool):
+        """الجلستان السابقة واللاحقة حول الموضع pos في قائمة مورد"""
+        prev_idx = entries[pos - 1][1] if pos > 0 else None
+        next_pos = pos + 1 if present else pos
+        next_idx = entries[next_pos][1] if next_pos < len(entries) else None
+        return prev_idx, next_idx
+
+    def _link(self, entries: list, idx: int, pos: int, present: bool, sign: int, kind: str):
+        """إضافة (sign=+1) أو إزالة (sign=-1) مساهمة الجلسة بين جارتيها في قائمة مورد"""
+        prev_idx, next_idx = self._neighbours(entries, pos, present)
+        if kind == "group":
+            terms = [0, 0]
+            for a, b, s in ((prev_idx, idx, 1), (idx, next_idx, 1), (prev_idx, next_idx, -1)):
+                if a is not None and b is not None:
+                    conflict, gap = self._group_terms(a, b)
+                    terms[0] += s * conflict
+                    terms[1] += s * gap
+            self.group_pairs += sign * terms[0]
+            self.gap_excess += sign * terms[1]
+            return
+        pairs = 0
+        for a, b, s in ((prev_idx, idx, 1), (idx, next_idx, 1), (prev_idx, next_idx, -1)):
+            if a is not None and b is not None:
+                pairs += s * self._overlap(a, b)
+        if kind == "room":
+            self.room_pairs += sign * pairs
+        else:
+            self.instructor_pairs += sign * pairs
+
+    def _insert(self, idx: int):
+        """إدراج الجلسة في قوائم مواردها وإضافة مساهماتها"""
+        key = (self.starts[idx], idx)
+        for entries, kind in ((self.room_index[self.rooms[idx]], "room"),
+                              (self.instructor_index[self.instructors[idx]], "instructor"),
+                              (self.group_index[self.group_of[idx]], "group")):
+            pos = bisect_left(entries, key)
+            self._link(entries, idx, pos, False, +1, kind)
+            entries.insert(pos, key)
+        self._session_terms(idx, +1)
+
+    def _remove(self, idx: int):
+        """حذف الجلسة من قوائم مواردها وطرح مساهماتها"""
+        key = (self.starts[idx], idx)
+        for entries, kind in ((self.room_index[self.rooms[idx]], "room"),
+                              (self.instructor_index[self.instructors[idx]], "instructor"),
+                              (self.group_index[self.group_of[idx]], "group")):
+            pos = bisect_left(entries, key)
+            self._link(entries, idx, pos, True, -1, kind)
+            del entries[pos]
+        self._session_terms(idx, -1)
+
+    def _session_terms(self, idx: int, sign: int):
+        """المساهمات الخاصة بالجلسة وحدها (المرافق، الوقت، تفضيلات المدرس، استخدام القاعة)"""
+        ev = self.evaluator
+        start, room, instructor = self.starts[idx], self.rooms[idx], self.instructors[idx]
+        self.facility += sign * int(ev.missing_facilities[self.pattern_of[idx], room])
+        minute = start % MINUTES_PER_DAY
+        if minute <= 8 * 60 or minute >= 16 * 60:
+            self.time_preference += sign
+        day = min(max(start // MINUTES_PER_DAY, 0), 6)
+        misses = 0
+        if ev.has_pref_days[instructor] and not ev.pref_day_mask[instructor, day]:
+            misses += 1
+        if ev.pref_slot_mask is not None and ev.has_pref_slots[instructor]:
+            slot = min(max(start, 0), ev.pref_slot_mask.shape[1] - 1)
+            if not ev.pref_slot_mask[instructor, slot]:
+                misses += 1
+        self.instructor_preference += sign * misses
+        self.room_usage[room] += sign * self.durations[idx]
+        self.room_sessions[room] += sign
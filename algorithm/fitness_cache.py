@@ -0,0 +1,67 @@
+import hashlib
+from collections import OrderedDict
+from typing import Dict, Optional
+
+import numpy as np
+
+
+class FitnessCache:
+    """
+    ذاكرة تخزين مؤقت محدودة (LRU) لقيم اللياقة، مفهرسة بملخص blake2b بطول 16 بايت
+    لبايتات الجينوم كاملة (البداية والقاعة والمدرس لكل جلسة).
+    """
+
+    def __init__(self, max_entries: int = 50000):
+        self.max_entries = max(1, int(max_entries))
+        self._entries: "OrderedDict[bytes, float]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key(genome: np.ndarray) -> bytes:
+        """ملخص سريع لبايتات الجينوم"""
+        return hashlib.blake2b(np.ascontiguousarray(genome).data, digest_size=16).digest()
+
+    def get(self, key: bytes) -> Optional[float]:
+        """إرجاع اللياقة المخزنة (وتحديثها كأحدث استخدام) أو None"""
+        value = self._entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: bytes, value: float):
+        """تخزين قيمة مع إزالة الأقدم استخدامًا عند تجاوز الحد"""
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, float]:
+        """عدادات الإصابة والإخفاق والإزالة"""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self._entries),
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+
+    @staticmethod
+    def merge_stats(stats_list) -> Dict[str, float]:
+        """جمع إحصائيات عدة ذاكرات (مثلاً ذاكرة كل عملية جزيرة)"""
+        merged = {"hits": 0, "misses": 0, "evictions": 0, "size": 0}
+        for stats in stats_list:
+            for key in merged:
+                merged[key] += stats.get(key, 0)
+        lookups = merged["hits"] + merged["misses"]
+        merged["hit_rate"] = merged["hits"] / lookups if lookups else 0.0
+        return merged
@@ -1,14 +1,23 @@
+import hashlib
 import logging
+import multiprocessing
 import random
-from copy import deepcopy
 import time as systime
-from typing import List, Dict, Tuple, Any
-from collections import defaultdict
+from typing import List, Dict, Tuple, Any, Iterator, Optional
 import statistics
-from datetime import time
 
-from model import Schedule, TimeSlot, Config, Course, Room, Group, Instructor, DayOfWeek
+import numpy as np
+
+from model import Schedule, Config
 from algorithm.soft_constraints_validator import SoftConstraintsValidator
+from algorithm.genome import GenomeCodec, GenomeEvaluator, PENALTY_KEYS, MINUTES_PER_DAY
+from algorithm.delta_evaluator import DeltaEvaluator
+from algorithm.fitness_cache import FitnessCache
+from algorithm.occupancy import OccupancyIndex
+from algorithm.repair import RepairEngine
+from algorithm.checkpoint import CheckpointWriter, load_checkpoint, rng_state, restore_rngs
+from algorithm import moves
+from algorithm.moves import apply_move
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
@@ -27,11 +36,18 @@ class EnhancedGeneticOptimizer:
         Args:
             initial_schedules: قائمة من الجداول الأولية (حلول أولية)
             config: إعدادات التطبيق (تحتوي على أوزان القيود المرنة)
+        
+        كل فرد يُمثَّل داخليًا كجينوم NumPy بحجم (عدد الجلسات × 3): (بداية الأسبوع بالدقائق، فهرس القاعة، فهرس المدرس)،
+        ولا تُبنى كائنات Schedule إلا للنتيجة النهائية.
         """
         self.config = config
-        self.population = initial_schedules
         self.validator = SoftConstraintsValidator(config)
-        self.fitness_cache = {}
+        self.codec = GenomeCodec(initial_schedules[0], config)
+        self.evaluator = GenomeEvaluator(self.codec)
+        self.repairer = RepairEngine(self.codec)
+        self.population = [self.codec.encode(schedule) for schedule in initial_schedules]
+        self.fitness_cache = FitnessCache(config.ga_params.get("fitness_cache_size", 50000))
+        self.worker_cache_stats = []
         self.diversity_history = []
         self.best_fitness_history = []
         self.best_schedule = None
@@ -42,8 +58,19 @@ class EnhancedGeneticOptimizer:
         self.crossover_rate = config.ga_params.get("crossover_rate", 0.85)
         self.mutation_rate = config.ga_params.get("mutation_rate", 0.15)
         self.elitism_count = config.ga_params.get("elitism_count", 5)
-        self.island_count = config.ga_params.get("island_count", 4)
+        # لا جزر فارغة: عدد الجزر لا يتجاوز عدد الجداول الأولية (قد يعيد CP-SAT عددًا قليلاً منها)
+        self.island_count = max(1, min(config.ga_params.get("island_count", 4), len(self.population)))
         self.migration_rate = config.ga_params.get("migration_rate", 0.1)
+        self.migration_interval = max(1, config.ga_params.get("migration_interval", 5))
+        self.parallel_islands = config.ga_params.get("parallel_islands", False)
+        self.conflict_bias = config.ga_params.get("conflict_bias", 0.8)
+        
+        # مولدات عشوائية حتمية لكل جزيرة (نفس النتائج في الوضع التسلسلي والمتوازي)
+        seed_sequence = np.random.SeedSequence(config.ga_params.get("random_seed"))
+        main_seed, *island_seeds = seed_sequence.spawn(self.island_count + 1)
+        self.main_rngs = self._make_rngs(main_seed)
+        self.island_rngs = [self._make_rngs(seq) for seq in island_seeds]
+        self.rng, self.np_rng = self.main_rngs
         
         # أوزان القيود المرنة (من config أو افتراضية)
         self.weights = config.ga_params.get("penalty_weights", {
@@ -56,257 +83,149 @@ class EnhancedGeneticOptimizer:
             "balance_room_usage": 5,
             "merge_bonus": -50  # مكافأة (تطرح من العقوبة)
         })
+        self.weight_vector = np.array([self.weights.get(k, 1.0) for k in PENALTY_KEYS])
         
         # استراتيجيات الطفرة وأوزانها
         self.mutation_strategies = [
             self._mutate_time_shift,
             self._mutate_room_swap,
             self._mutate_instructor_swap,
-            self._mutate_day_rotation
+            self._mutate_day_rotation,
+            self._mutate_kempe_chain
         ]
-        self.mutation_weights = [0.3, 0.3, 0.2, 0.2]  # أوزان نسبية
+        self.mutation_weights = [0.25, 0.25, 0.15, 0.15, 0.2]  # أوزان نسبية
         
         # إنشاء نموذج الجزر
         self.islands = self._create_islands()
         
-    def _create_islands(self) -> List[List[List[Schedule]]]:
+    @staticmethod
+    def _make_rngs(seed_sequence: np.random.SeedSequence) -> Tuple[random.Random, np.random.Generator]:
+        """مولد Python ومولد NumPy من بذرة واحدة"""
+        return random.Random(int(seed_sequence.generate_state(1)[0])), np.random.default_rng(seed_sequence)
+
+    def _create_islands(self) -> List[List[np.ndarray]]:
         """تقسيم السكان إلى جزر معزولة"""
         islands = [[] for _ in range(self.island_count)]
-        for i, schedule in enumerate(self.population):
-            islands[i % self.island_count].append(schedule)
+        for i, genome in enumerate(self.population):
+            islands[i % self.island_count].append(genome)
         return islands
 
-    def _fitness(self, schedule: List[Schedule]) -> float:
+    def _fitness(self, genome: np.ndarray) -> float:
         """حساب اللياقة للجدول (كلما ارتفعت كلما كان أفضل)"""
-        # استخدام ذاكرة التخزين المؤقت إذا كان الجدول قد تم تقييمه مسبقًا
-        schedule_hash = hash(tuple((s.course_id, s.time_slot.start_minutes, s.room_id) for s in schedule))
-        if schedule_hash in self.fitness_cache:
-            return self.fitness_cache[schedule_hash]
-        
-        # حساب العقوبة الإجمالية
-        total_penalty = self.validator.penalty(schedule)
+        return self._evaluate_population([genome])[0]
+
+    def _evaluate_population(self, genomes: List[np.ndarray]) -> List[float]:
+        """لياقة كل الأفراد: من الذاكرة المؤقتة، وغير المخزنين في استدعاء واحد للمقيِّم الدفعي"""
+        keys = [FitnessCache.key(genome) for genome in genomes]
+        values = [self.fitness_cache.get(key) for key in keys]
+        pending = {}
+        for key, genome, value in zip(keys, genomes, values):
+            if value is None:
+                pending.setdefault(key, genome)
+        if not pending:
+            return values
         
-        # تطبيق الأوزان المخصصة
-        weighted_penalty = 0
-        for constraint, penalty_value in total_penalty.items():
-            weight = self.weights.get(constraint, 1.0)
-            weighted_penalty += weight * penalty_value
+        # مصفوفة العقوبات (الأفراد × القيود) ثم تطبيق الأوزان المخصصة
+        matrix = self.evaluator.penalty_matrix(np.stack(list(pending.values())))
+        weighted_penalties = matrix @ self.weight_vector
         
         # اللياقة = 1 / (1 + weighted_penalty) لتكون بين 0 و1
-        fitness = 1.0 / (1.0 + weighted_penalty)
-        
-        # التخزين المؤقت
-        self.fitness_cache[schedule_hash] = fitness
-        return fitness
+        computed = {}
+        for key, weighted_penalty in zip(pending, weighted_penalties):
+            computed[key] = 1.0 / (1.0 + float(weighted_penalty))
+            self.fitness_cache.put(key, computed[key])
+        return [computed[key] if value is None else value for key, value in zip(keys, values)]
 
-    def _select_parents(self, island: List[List[Schedule]]) -> Tuple[List[Schedule], List[Schedule]]:
+    def _select_parents(self, island: List[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
         """اختيار أبوين من الجزيرة باستخدام بطولة"""
         tournament_size = min(5, len(island))
-        tournament = random.sample(island, tournament_size)
+        tournament = self.rng.sample(island, tournament_size)
         tournament.sort(key=self._fitness, reverse=True)
-        return tournament[0], tournament[1]
+        return tournament[0], tournament[min(1, tournament_size - 1)]
 
-    def _crossover(self, parent1: List[Schedule], parent2: List[Schedule]) -> List[Schedule]:
+    def _crossover(self, parent1: np.ndarray, parent2: np.ndarray) -> np.ndarray:
         """تهجين بين أبوين لإنتاج طفل"""
         # استراتيجيات التهجين المختلفة
-        if random.random() < 0.7:
+        if self.rng.random() < 0.7:
             return self._uniform_crossover(parent1, parent2)
         else:
             return self._multi_point_crossover(parent1, parent2)
 
-    def _uniform_crossover(self, parent1: List[Schedule], parent2: List[Schedule]) -> List[Schedule]:
+    def _uniform_crossover(self, parent1: np.ndarray, parent2: np.ndarray) -> np.ndarray:
         """تهجين موحد: اختيار جلسات عشوائية من الأبوين"""
-        child = []
-        for i in range(len(parent1)):
-            if random.random() < 0.5:
-                child.append(deepcopy(parent1[i]))
-            else:
-                child.append(deepcopy(parent2[i]))
-        return child
+        mask = self.np_rng.random(len(parent1)) < 0.5
+        return np.where(mask[:, None], parent1, parent2)
 
-    def _multi_point_crossover(self, parent1: List[Schedule], parent2: List[Schedule]) -> List[Schedule]:
+    def _multi_point_crossover(self, parent1: np.ndarray, parent2: np.ndarray) -> np.ndarray:
         """تهجين متعدد النقاط"""
-        points = sorted(random.sample(range(1, len(parent1)), random.randint(1, 3)))
-        child = []
-        start = 0
-        use_parent1 = True
-        
-        for point in points:
-            if use_parent1:
-                child.extend(deepcopy(parent1[start:point]))
-            else:
-                child.extend(deepcopy(parent2[start:point]))
-            start = point
-            use_parent1 = not use_parent1
-        
-        # الجزء الأخير
-        if use_parent1:
-            child.extend(deepcopy(parent1[start:]))
-        else:
-            child.extend(deepcopy(parent2[start:]))
-        
+        if len(parent1) < 2:
+            return parent1.copy()
+        points = sorted(self.rng.sample(range(1, len(parent1)), min(self.rng.randint(1, 3), len(parent1) - 1)))
+        child = parent1.copy()
+        bounds = points + [len(parent1)]
+        # المقاطع ذات الترتيب الفردي تؤخذ من الأب الثاني
+        for k in range(0, len(bounds) - 1, 2):
+            child[bounds[k]:bounds[k + 1]] = parent2[bounds[k]:bounds[k + 1]]
         return child
 
-    def _mutate(self, schedule: List[Schedule]) -> List[Schedule]:
+    def _mutate(self, genome: np.ndarray) -> np.ndarray:
         """تطبيق طفرات على الجدول"""
         # اختيار استراتيجية طفرة حسب الأوزان
-        mutation_strategy = random.choices(
+        mutation_strategy = self.rng.choices(
             self.mutation_strategies,
             weights=self.mutation_weights,
             k=1
         )[0]
         
-        return mutation_strategy(schedule)
+        return mutation_strategy(genome)
 
-    def _mutate_time_shift(self, schedule: List[Schedule]) -> List[Schedule]:
-        """طفرة بتغيير وقت جلسة عشوائية مع الالتزام الصارم بالأيام وساعات العمل فقط"""
-        mutated = deepcopy(schedule)
-        idx = random.randint(0, len(mutated) - 1)
-        session = mutated[idx]
-        # استخراج اليوم الحالي
-        allowed_days = [d.value if hasattr(d, 'value') else int(d) for d in self.config.working_days]
-        current_day = session.time_slot.day.value if hasattr(session.time_slot.day, 'value') else int(session.time_slot.day)
-        # إذا اليوم غير مسموح، اختر يوم مسموح عشوائي
-        if current_day not in allowed_days:
-            current_day = random.choice(allowed_days)
-        # حدود اليوم
-        daily_start = self.config.daily_start_time.hour * 60 + self.config.daily_start_time.minute
-        daily_end = self.config.daily_end_time.hour * 60 + self.config.daily_end_time.minute
-        # تغيير الوقت ضمن اليوم فقط
-        max_shift = min(60, daily_end - daily_start - session.time_slot.duration)
-        shift = random.randint(-max_shift, max_shift)
-        old_start = session.time_slot.start_minutes % (24*60)
-        new_start = old_start + shift
-        # ضبط ضمن الحدود
-        if new_start < daily_start:
-            new_start = daily_start
-        if new_start + session.time_slot.duration > daily_end:
-            new_start = daily_end - session.time_slot.duration
-        # إعادة تعيين الوقت
-        abs_start = current_day * 24*60 + new_start
-        abs_end = abs_start + session.time_slot.duration
-        session.time_slot.start_minutes = abs_start
-        session.time_slot.end_minutes = abs_end
-        session.time_slot.start_time = time(new_start // 60, new_start % 60)
-        session.time_slot.end_time = time((new_start + session.time_slot.duration) // 60, (new_start + session.time_slot.duration) % 60)
-        # اليوم يجب أن يكون من نوع DayOfWeek أو من الأيام المسموحة فقط
-        if hasattr(DayOfWeek, '__members__'):
-            session.time_slot.day = DayOfWeek(current_day)
-        else:
-            session.time_slot.day = current_day
+    def _mutation_site(self, genome: np.ndarray) -> int:
+        """
+        اختيار الجلسة المراد تعديلها: باحتمال conflict_bias تُختار بالتناسب مع مساهمتها الموزونة
+        في العقوبة (التعارضات، الفجوات، التفضيلات)، وإلا عشوائيًا بالتساوي.
+        """
+        if self.rng.random() < self.conflict_bias:
+            scores = np.clip(self.evaluator.session_contributions(genome) @ self.weight_vector, 0, None)
+            cumulative = np.cumsum(scores)
+            if cumulative[-1] > 0:
+                return int(np.searchsorted(cumulative, self.rng.random() * cumulative[-1], side='right'))
+        return self.rng.randint(0, len(genome) - 1)
+
+    def _mutate_with(self, genome: np.ndarray, move_fn) -> np.ndarray:
+        """تطبيق حركة جوار مشتركة (من algorithm.moves) على نسخة من الجينوم لجلسة مختارة حسب مساهمتها في العقوبة"""
+        mutated = genome.copy()
+        idx = self._mutation_site(mutated)
+        apply_move(mutated, move_fn(self.codec, mutated, idx, self.rng))
         return mutated
 
-    def _mutate_room_swap(self, schedule: List[Schedule]) -> List[Schedule]:
+    def _mutate_time_shift(self, genome: np.ndarray) -> np.ndarray:
+        """طفرة بتغيير وقت جلسة عشوائية مع الالتزام الصارم بالأيام وساعات العمل فقط"""
+        return self._mutate_with(genome, moves.time_shift)
+
+    def _mutate_room_swap(self, genome: np.ndarray) -> np.ndarray:
         """طفرة بتبديل قاعة جلسة عشوائية"""
-        mutated = deepcopy(schedule)
-        idx = random.randint(0, len(mutated) - 1)
-        session = mutated[idx]
-        
-        # البحث عن قاعة مناسبة
-        suitable_rooms = [
-            room for room in self.config.rooms
-            if room.type == session.assigned_course.course_type
-            and room.capacity >= session.assigned_group.student_count
-            and (session.assigned_course.required_facilities is None or 
-                 all(f in room.facilities for f in session.assigned_course.required_facilities))
-        ]
-        
-        if suitable_rooms:
-            new_room = random.choice(suitable_rooms)
-            session.room_id = new_room.id
-            session.assigned_room = new_room
-        
-        return mutated
+        return self._mutate_with(genome, moves.room_swap)
 
-    def _mutate_instructor_swap(self, schedule: List[Schedule]) -> List[Schedule]:
+    def _mutate_instructor_swap(self, genome: np.ndarray) -> np.ndarray:
         """طفرة بتبديل مدرس جلسة عشوائية"""
-        mutated = deepcopy(schedule)
-        idx = random.randint(0, len(mutated) - 1)
-        session = mutated[idx]
-        
-        # البحث عن مدرسين بديلين مناسبين
-        suitable_instructors = [
-            inst for inst in self.config.instructors
-            if inst.id != session.instructor_id
-            and session.assigned_course.course_type in inst.expertise
-        ]
-        
-        if suitable_instructors:
-            new_instructor = random.choice(suitable_instructors)
-            session.instructor_id = new_instructor.id
-            session.assigned_instructor = new_instructor
-        
-        return mutated
+        return self._mutate_with(genome, moves.instructor_swap)
 
-    def _mutate_day_rotation(self, schedule: List[Schedule]) -> List[Schedule]:
+    def _mutate_day_rotation(self, genome: np.ndarray) -> np.ndarray:
         """طفرة بتغيير يوم جلسة عشوائية مع الالتزام الصارم بالأيام المسموحة وساعات العمل فقط"""
-        mutated = deepcopy(schedule)
-        idx = random.randint(0, len(mutated) - 1)
-        session = mutated[idx]
-        allowed_days = [d.value if hasattr(d, 'value') else int(d) for d in self.config.working_days]
-        current_day = session.time_slot.day.value if hasattr(session.time_slot.day, 'value') else int(session.time_slot.day)
-        possible_days = [d for d in allowed_days if d != current_day]
-        if possible_days:
-            new_day = random.choice(possible_days)
-            # التأكد أن الوقت ضمن ساعات العمل
-            daily_start = self.config.daily_start_time.hour * 60 + self.config.daily_start_time.minute
-            daily_end = self.config.daily_end_time.hour * 60 + self.config.daily_end_time.minute
-            start_in_day = session.time_slot.start_minutes % (24*60)
-            # إذا الوقت خارج النطاق، ضبطه
-            if start_in_day < daily_start:
-                start_in_day = daily_start
-            if start_in_day + session.time_slot.duration > daily_end:
-                start_in_day = daily_end - session.time_slot.duration
-            abs_start = new_day * 24*60 + start_in_day
-            abs_end = abs_start + session.time_slot.duration
-            if hasattr(DayOfWeek, '__members__'):
-                session.time_slot.day = DayOfWeek(new_day)
-            else:
-                session.time_slot.day = new_day
-            session.time_slot.start_minutes = abs_start
-            session.time_slot.end_minutes = abs_end
-            session.time_slot.start_time = time(start_in_day // 60, start_in_day % 60)
-            session.time_slot.end_time = time((start_in_day + session.time_slot.duration) // 60, (start_in_day + session.time_slot.duration) % 60)
-        else:
-            # إذا لم يوجد يوم بديل، ثبّت اليوم الحالي على أول يوم مسموح
-            if allowed_days:
-                new_day = allowed_days[0]
-                daily_start = self.config.daily_start_time.hour * 60 + self.config.daily_start_time.minute
-                abs_start = new_day * 24*60 + daily_start
-                abs_end = abs_start + session.time_slot.duration
-                if hasattr(DayOfWeek, '__members__'):
-                    session.time_slot.day = DayOfWeek(new_day)
-                else:
-                    session.time_slot.day = new_day
-                session.time_slot.start_minutes = abs_start
-                session.time_slot.end_minutes = abs_end
-                session.time_slot.start_time = time(daily_start // 60, daily_start % 60)
-                session.time_slot.end_time = time((daily_start + session.time_slot.duration) // 60, (daily_start + session.time_slot.duration) % 60)
-        return mutated
+        return self._mutate_with(genome, moves.day_rotation)
 
-    def _repair_schedule(self, schedule: List[Schedule]) -> List[Schedule]:
-        """إصلاح الجدول لحل التعارضات الأساسية"""
-        # إصلاح تعارضات القاعات
-        room_assignments = defaultdict(list)
-        for session in schedule:
-            room_assignments[session.room_id].append(session)
-        
-        for room_id, sessions in room_assignments.items():
-            sessions.sort(key=lambda s: s.time_slot.start_minutes)
-            for i in range(1, len(sessions)):
-                prev = sessions[i-1]
-                curr = sessions[i]
-                if prev.time_slot.overlaps(curr.time_slot):
-                    # تأخير الجلسة المتعارضة
-                    new_start = prev.time_slot.end_minutes + self.config.min_break_between_classes
-                    curr.time_slot.start_minutes = new_start
-                    curr.time_slot.end_minutes = new_start + curr.time_slot.duration
-        
-        return schedule
+    def _mutate_kempe_chain(self, genome: np.ndarray) -> np.ndarray:
+        """طفرة بتبادل سلسلة كمبي بين فترة جلسة وفترة أخرى (تنقل الجلسات المتعارضة معًا)"""
+        return self._mutate_with(genome, moves.kempe_chain)
 
-    def _create_next_generation(self, island_idx: int) -> List[List[Schedule]]:
+    def _repair_schedule(self, genome: np.ndarray) -> np.ndarray:
+        """إصلاح الجدول لحل التعارضات الصلبة (القاعات والمدرسين والمجموعات) بنقل الجلسات لأقرب فترة حرة"""
+        return self.repairer.repair(genome)
+
+    def _create_next_generation(self, island_idx: int) -> List[np.ndarray]:
         """إنشاء الجيل التالي لجزيرة محددة"""
         island = self.islands[island_idx]
+        self._evaluate_population(island)
         new_population = []
         
         # النخبة: أفضل الجداول تنتقل مباشرة
@@ -323,147 +242,409 @@ class EnhancedGeneticOptimizer:
         
         return new_population[:len(island)]
 
-    def _migrate_between_islands(self):
-        """الهجرة بين الجزر لنقل الحلول الجيدة"""
-        migrants = []
-        for island in self.islands:
-            num_migrants = max(1, int(self.migration_rate * len(island)))
-            migrants.append(sorted(island, key=self._fitness, reverse=True)[:num_migrants])
-        
-        # تبادل المهاجرين بين الجزر
+    def _emigrants(self, island_idx: int) -> List[np.ndarray]:
+        """أفضل أفراد الجزيرة المرشحون للهجرة"""
+        island = self.islands[island_idx]
+        num_migrants = max(1, int(self.migration_rate * len(island)))
+        return sorted(island, key=self._fitness, reverse=True)[:num_migrants]
+
+    def _migrate_between_islands(self, emigrants: List[List[np.ndarray]]) -> List[List[np.ndarray]]:
+        """الهجرة الحلقية: الجزيرة i تستقبل مهاجري الجزيرة i+1"""
+        return [emigrants[(i + 1) % self.island_count] for i in range(self.island_count)]
+
+    def _receive_migrants(self, island_idx: int, migrants: List[np.ndarray]):
+        """استبدال أسوأ أفراد الجزيرة بالمهاجرين (بدل إضافتهم ثم قصّهم من نهاية القائمة)"""
+        island = self.islands[island_idx]
+        self._evaluate_population(island + migrants)
+        worst = sorted(range(len(island)), key=lambda k: self._fitness(island[k]))[:len(migrants)]
+        for k, migrant in zip(worst, migrants):
+            island[k] = migrant
+
+    def _run_epoch(self, island_idx: int, generations: int, migrants: List[np.ndarray] = None) -> Dict[str, Any]:
+        """تطوير جزيرة واحدة لعدد من الأجيال (في العملية الرئيسية أو في عملية الجزيرة)"""
+        self.rng, self.np_rng = self.island_rngs[island_idx]
+        if migrants:
+            self._receive_migrants(island_idx, migrants)
+        history = []
+        best_genomes = []
+        for _ in range(generations):
+            island = self._create_next_generation(island_idx)
+            self.islands[island_idx] = island
+            fitness_values = self._evaluate_population(island)
+            history.append(fitness_values)
+            best_genomes.append(island[int(np.argmax(fitness_values))])
+        self.rng, self.np_rng = self.main_rngs
+        return {
+            "history": history,
+            "best_genomes": best_genomes,
+            "emigrants": self._emigrants(island_idx)
+        }
+
+    def _run_epochs(self, generations: int, incoming: List[List[np.ndarray]], workers) -> List[Dict[str, Any]]:
+        """تشغيل حقبة على كل الجزر: تسلسليًا أو عبر عمليات الجزر"""
+        if not workers:
+            return [self._run_epoch(i, generations, incoming[i]) for i in range(self.island_count)]
+        for i, (conn, _) in enumerate(workers):
+            conn.send(("epoch", (generations, incoming[i])))
+        return [self._receive_from_worker(conn) for conn, _ in workers]
+
+    @staticmethod
+    def _receive_from_worker(conn) -> Any:
+        status, payload = conn.recv()
+        if status == "error":
+            raise RuntimeError(f"فشل عملية الجزيرة: {payload}")
+        return payload
+
+    def _start_island_workers(self) -> List[Tuple[Any, Any]]:
+        """تشغيل عملية لكل جزيرة متصلة بأنبوب"""
+        ctx = multiprocessing.get_context()
+        workers = []
         for i in range(self.island_count):
-            source_idx = (i + 1) % self.island_count
-            self.islands[i].extend(migrants[source_idx])
-            self.islands[i] = self.islands[i][:len(self.islands[0])]
+            parent_conn, child_conn = ctx.Pipe()
+            process = ctx.Process(target=_island_worker, args=(child_conn, self, i), daemon=True)
+            process.start()
+            child_conn.close()
+            workers.append((parent_conn, process))
+        logger.info(f"🏝️ تشغيل {self.island_count} جزيرة في عمليات منفصلة")
+        return workers
+
+    def _stop_island_workers(self, workers: List[Tuple[Any, Any]]):
+        """إيقاف عمليات الجزر واستعادة حالة كل جزيرة ومولدها العشوائي"""
+        for i, (conn, process) in enumerate(workers):
+            try:
+                conn.send(("stop", None))
+                island, rngs, cache_stats = self._receive_from_worker(conn)
+                self.islands[i] = island
+                self.island_rngs[i] = rngs
+                self.worker_cache_stats.append(cache_stats)
+            except (EOFError, OSError, RuntimeError) as e:
+                logger.error(f"❌ تعذر استعادة حالة الجزيرة {i}: {e}")
+            finally:
+                conn.close()
+                process.join(timeout=5)
 
     def calculate_diversity(self) -> float:
         """حساب تنوع السكان"""
-        fitness_values = [self._fitness(schedule) for island in self.islands for schedule in island]
+        fitness_values = [self._fitness(genome) for island in self.islands for genome in island]
         if len(fitness_values) < 2:
             return 0.0
         return statistics.stdev(fitness_values)
 
-    def evolve(self) -> Tuple[List[Schedule], Dict[str, Any]]:
-        """تشغيل عملية التطور"""
-        best_fitness = 0.0
-        best_schedule = None
+    def evolve(self, resume_from: Optional[str] = None) -> Tuple[List[Schedule], Dict[str, Any]]:
+        """تشغيل عملية التطور حتى النهاية وإرجاع أفضل جدول والإحصائيات"""
+        result = None
+        for result in self.evolve_steps(resume_from=resume_from):
+            pass
+        return result
+
+    def evolve_steps(self, resume_from: Optional[str] = None) -> Iterator[Tuple[List[Schedule], Dict[str, Any]]]:
+        """
+        تشغيل عملية التطور كمولّد: يُرجع (أفضل جدول حتى الآن، الإحصائيات) بعد كل جيل،
+        ثم الجدول النهائي بعد التحسين المحلي (stats["final"] = True).
+        إيقاف المرور على المولّد يلغي التشغيل ويوقف عمليات الجزر.
+        
+        التوقف: عدد الأجيال (0 = بلا حد)، أو الميزانية الزمنية time_limit بالثواني، أو بلوغ اللياقة
+        target_fitness، أو عدم التحسن لمدة stagnation_generations جيل (0 = معطل).
+        الجزر تتطور على حقب حتى موعد الهجرة التالي (كل migration_interval جيل)،
+        في العملية نفسها أو في عملية لكل جزيرة عند تفعيل parallel_islands.
+        
+        عند تحديد checkpoint_path تُحفظ الجزر وحالة المولدات وأفضل جدول وسجل الإحصائيات
+        كل checkpoint_interval جيل في الخلفية، و resume_from يستأنف من نقطة حفظ سابقة.
+        """
+        params = self.config.ga_params
+        time_limit = params.get("time_limit")
+        target_fitness = params.get("target_fitness")
+        stagnation_limit = params.get("stagnation_generations", 10)
+        max_generations = self.generations or float("inf")
+        if max_generations == float("inf") and not (time_limit or target_fitness or stagnation_limit):
+            logger.warning("⚠️ لا يوجد شرط توقف للخوارزمية الجينية، سيتم استخدام 100 جيل")
+            max_generations = 100
+        
+        started = systime.time()
+        best_genome = max(self.population, key=self._fitness)
+        best_fitness = self._fitness(best_genome)
         stagnation_count = 0
         stats = {
             "best_fitness_history": [],
             "diversity_history": [],
-            "generation_times": []
+            "generation_times": [],
+            "generation": 0,
+            "best_fitness": best_fitness,
+            "elapsed": 0.0,
+            "stop_reason": None,
+            "final": False
         }
         
-        for gen in range(self.generations):
-            gen_start = systime.time()
-            
-            # تحديث كل جزيرة
-            for i in range(self.island_count):
-                self.islands[i] = self._create_next_generation(i)
-            
-            # الهجرة بين الجزر كل 5 أجيال
-            if gen % 5 == 0:
-                self._migrate_between_islands()
-            
-            # حساب أفضل لياقة في هذا الجيل
-            current_best_fitness = 0.0
-            for island in self.islands:
-                for schedule in island:
-                    fitness = self._fitness(schedule)
-                    if fitness > current_best_fitness:
-                        current_best_fitness = fitness
-                        if fitness > best_fitness:
-                            best_fitness = fitness
-                            best_schedule = schedule
-            
-            # حساب التنوع
-            diversity = self.calculate_diversity()
-            
-            # تحديث الإحصائيات
-            stats["best_fitness_history"].append(current_best_fitness)
-            stats["diversity_history"].append(diversity)
-            stats["generation_times"].append(systime.time() - gen_start)
-            
-            # التحقق من الركود
-            if current_best_fitness <= best_fitness:
-                stagnation_count += 1
-                if stagnation_count > 10:
-                    logger.info(f"التوقف المبكر بسبب الركود في الجيل {gen}")
+        gen = 0
+        incoming = [None] * self.island_count
+        if resume_from:
+            gen, stagnation_count, best_genome, best_fitness, incoming, elapsed = self._restore_checkpoint(resume_from, stats)
+            started -= elapsed
+            stats["best_fitness"] = best_fitness
+        deadline = started + time_limit if time_limit else None
+        self.best_schedule = self.codec.decode(best_genome)
+        
+        checkpoint_path = params.get("checkpoint_path")
+        checkpoint_interval = max(1, params.get("checkpoint_interval", 10))
+        writer = CheckpointWriter(checkpoint_path) if checkpoint_path else None
+        last_checkpoint = gen
+        
+        self.worker_cache_stats = []
+        workers = self._start_island_workers() if self.parallel_islands and self.island_count > 1 else None
+        try:
+            while stats["stop_reason"] is None:
+                if gen >= max_generations:
+                    stats["stop_reason"] = "generations"
                     break
-            else:
-                stagnation_count = 0
+                # الهجرة بعد الجيل الأول ثم كل migration_interval جيل
+                epoch = int(1 if gen == 0 else min(self.migration_interval, max_generations - gen))
+                # لا تتجاوز الحقبة شروط التوقف: ما تبقى قبل الركود، وما يتسع له الوقت المتبقي حسب متوسط زمن الجيل
+                if stagnation_limit:
+                    epoch = max(1, min(epoch, stagnation_limit - stagnation_count))
+                if deadline is not None and stats["generation_times"]:
+                    generation_time = statistics.mean(stats["generation_times"][-self.migration_interval:])
+                    if generation_time > 0:
+                        epoch = max(1, min(epoch, int((deadline - systime.time()) / generation_time)))
+                epoch_start = systime.time()
+                results = self._run_epochs(epoch, incoming, workers)
+                epoch_time = systime.time() - epoch_start
+                
+                completed = 0
+                for offset in range(epoch):
+                    completed = offset + 1
+                    fitness_values = [f for result in results for f in result["history"][offset]]
+                    # حساب أفضل لياقة في هذا الجيل
+                    island_best = max(range(len(results)), key=lambda k: max(results[k]["history"][offset]))
+                    current_best_fitness = max(fitness_values)
+                    # حساب التنوع
+                    diversity = statistics.stdev(fitness_values) if len(fitness_values) > 1 else 0.0
+                    
+                    # الركود الحقيقي: لا تحسن على أفضل لياقة سابقة
+                    if current_best_fitness > best_fitness:
+                        best_fitness = current_best_fitness
+                        best_genome = results[island_best]["best_genomes"][offset]
+                        self.best_schedule = self.codec.decode(best_genome)
+                        stagnation_count = 0
+                    else:
+                        stagnation_count += 1
+                    
+                    # تحديث الإحصائيات
+                    stats["best_fitness_history"].append(current_best_fitness)
+                    stats["diversity_history"].append(diversity)
+                    stats["generation_times"].append(epoch_time / epoch)
+                    stats["generation"] = gen + offset + 1
+                    stats["best_fitness"] = best_fitness
+                    stats["elapsed"] = systime.time() - started
+                    logger.info(f"الجيل {gen+offset+1}/{self.generations or '∞'}: اللياقة = {current_best_fitness:.4f}, التنوع = {diversity:.4f}")
+                    
+                    if target_fitness is not None and best_fitness >= target_fitness:
+                        stats["stop_reason"] = "target"
+                    elif stagnation_limit and stagnation_count >= stagnation_limit:
+                        stats["stop_reason"] = "stagnation"
+                    elif deadline is not None and systime.time() >= deadline:
+                        stats["stop_reason"] = "time_limit"
+                    
+                    yield self.best_schedule, stats
+                    if stats["stop_reason"]:
+                        logger.info(f"⏹️ توقف التطور في الجيل {gen+offset+1}: {stats['stop_reason']}")
+                        break
+                
+                # عند التوقف المبكر داخل الحقبة لا تُحسب إلا الأجيال المُبلَّغ عنها
+                gen += completed
+                incoming = self._migrate_between_islands([result["emigrants"] for result in results])
+                
+                # نقطة حفظ دورية في الخلفية (تُتخطى إذا كانت الكتابة السابقة جارية)
+                if writer and not writer.busy and gen - last_checkpoint >= checkpoint_interval:
+                    self._save_checkpoint(writer, workers, gen, stagnation_count, best_genome, best_fitness,
+                                          stats, incoming, systime.time() - started)
+                    last_checkpoint = gen
             
-            logger.info(f"الجيل {gen+1}/{self.generations}: اللياقة = {current_best_fitness:.4f}, التنوع = {diversity:.4f}")
+            if writer:
+                # نقطة الحفظ الأخيرة تُعلَّم كمكتملة حتى لا يُستأنف منها تشغيل جديد
+                self._save_checkpoint(writer, workers, gen, stagnation_count, best_genome, best_fitness,
+                                      stats, incoming, systime.time() - started, block=True, completed=True)
+        finally:
+            if workers:
+                self._stop_island_workers(workers)
+            if writer:
+                writer.wait()
         
-        # تحسين نهائي لأفضل جدول
-        optimized_schedule = self._final_optimization(best_schedule)
-        return optimized_schedule, stats
+        # إحصائيات ذاكرة اللياقة (العملية الرئيسية + عمليات الجزر)
+        stats["fitness_cache"] = FitnessCache.merge_stats([self.fitness_cache.stats()] + self.worker_cache_stats)
+        logger.info(f"🗃️ ذاكرة اللياقة: {stats['fitness_cache']['hits']} إصابة، "
+                    f"{stats['fitness_cache']['misses']} إخفاق، {stats['fitness_cache']['evictions']} إزالة")
+        
+        # تحسين نهائي لأفضل جدول ثم فك الترميز إلى كائنات Schedule
+        optimized_genome = self._final_optimization(best_genome.copy())
+        self.best_schedule = self.codec.decode(optimized_genome)
+        stats["elapsed"] = systime.time() - started
+        stats["final"] = True
+        yield self.best_schedule, stats
+
+    def _checkpoint_signature(self) -> str:
+        """
+        بصمة المشكلة للتحقق من توافق نقطة الحفظ: عدد الجزر، الجلسات ومددها، وترتيب القاعات والمدرسين
+        (الجينومات المحفوظة تخزن فهارس القاعات والمدرسين في هذا الترتيب).
+        """
+        codec = self.codec
+        parts = [
+            str(self.island_count),
+            "\x1f".join(s.course_id for s in codec.sessions),
+            ",".join(str(int(d)) for d in codec.durations),
+            "\x1f".join(str(room.id) for room in codec.rooms),
+            "\x1f".join(str(instructor.id) for instructor in codec.instructors)
+        ]
+        return hashlib.blake2b("|".join(parts).encode("utf-8"), digest_size=16).hexdigest()
+
+    def can_resume(self, path: str) -> bool:
+        """هل توجد نقطة حفظ صالحة لتشغيل غير مكتمل ومتوافقة مع المشكلة الحالية في المسار"""
+        try:
+            _, meta = load_checkpoint(path)
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"⚠️ تعذر قراءة نقطة الحفظ {path}: {e}")
+            return False
+        return meta.get("signature") == self._checkpoint_signature() and not meta.get("completed", False)
+
+    def _island_states(self, workers) -> Tuple[List[List[np.ndarray]], List[Tuple[random.Random, np.random.Generator]]]:
+        """الجزر ومولداتها الحالية (من عمليات الجزر في الوضع المتوازي)"""
+        if not workers:
+            return self.islands, self.island_rngs
+        for conn, _ in workers:
+            conn.send(("state", None))
+        states = [self._receive_from_worker(conn) for conn, _ in workers]
+        return [island for island, _ in states], [rngs for _, rngs in states]
+
+    def _save_checkpoint(self, writer: CheckpointWriter, workers, gen: int, stagnation_count: int,
+                         best_genome: np.ndarray, best_fitness: float, stats: Dict[str, Any],
+                         incoming: List[List[np.ndarray]], elapsed: float, block: bool = False,
+                         completed: bool = False):
+        """تجهيز لقطة الحالة في الحلقة الرئيسية ثم كتابتها في الخلفية"""
+        islands, island_rngs = self._island_states(workers)
+        empty = np.zeros((0, self.codec.n_sessions, 3), dtype=np.int32)
+        arrays = {f"island_{i}": np.stack(island) if island else empty for i, island in enumerate(islands)}
+        for i, migrants in enumerate(incoming):
+            if migrants:
+                arrays[f"incoming_{i}"] = np.stack(migrants)
+        arrays["best_genome"] = np.array(best_genome)
+        meta = {
+            "version": 1,
+            "signature": self._checkpoint_signature(),
+            "completed": completed,
+            "generation": gen,
+            "stagnation_count": stagnation_count,
+            "best_fitness": best_fitness,
+            "elapsed": elapsed,
+            "main_rng": rng_state(self.main_rngs),
+            "island_rngs": [rng_state(rngs) for rngs in island_rngs],
+            "stats": {key: list(stats[key]) for key in ("best_fitness_history", "diversity_history", "generation_times")}
+        }
+        writer.save(arrays, meta, block=block)
+
+    def _restore_checkpoint(self, path: str, stats: Dict[str, Any]):
+        """استعادة الجزر والمولدات وأفضل جينوم وسجل الإحصائيات من نقطة حفظ"""
+        arrays, meta = load_checkpoint(path)
+        if meta.get("signature") != self._checkpoint_signature():
+            raise ValueError(f"نقطة الحفظ {path} لا تطابق الجلسات أو القاعات أو المدرسين أو عدد الجزر الحالي")
+        if meta.get("completed", False):
+            raise ValueError(f"نقطة الحفظ {path} لتشغيل مكتمل ولا يمكن الاستئناف منها")
+        self.islands = [list(arrays[f"island_{i}"]) for i in range(self.island_count)]
+        self.island_rngs = [restore_rngs(state) for state in meta["island_rngs"]]
+        self.main_rngs = restore_rngs(meta["main_rng"])
+        self.rng, self.np_rng = self.main_rngs
+        incoming = [list(arrays[f"incoming_{i}"]) if f"incoming_{i}" in arrays else None
+                    for i in range(self.island_count)]
+        for key, history in meta["stats"].items():
+            stats[key] = list(history)
+        stats["generation"] = meta["generation"]
+        logger.info(f"♻️ استئناف التطور من الجيل {meta['generation']}: {path}")
+        return (meta["generation"], meta["stagnation_count"], arrays["best_genome"],
+                meta["best_fitness"], incoming, meta["elapsed"])
 
-    def _final_optimization(self, schedule: List[Schedule]) -> List[Schedule]:
+    def _final_optimization(self, genome: np.ndarray) -> np.ndarray:
         """تحسين نهائي محلي لأفضل جدول"""
         # تحسين الفجوات الزمنية
-        optimized = self._optimize_time_gaps(schedule)
+        optimized = self._optimize_time_gaps(genome)
         # تحسين استخدام القاعات
         optimized = self._optimize_room_usage(optimized)
+        # بحث محلي بحركات الطفرة نفسها مع تقييم تزايدي
+        optimized = self._local_search(optimized)
         return optimized
 
-    def _optimize_time_gaps(self, schedule: List[Schedule]) -> List[Schedule]:
-        """تقليل الفجوات الزمنية بين محاضرات المجموعات"""
-        group_sessions = defaultdict(list)
-        for session in schedule:
-            group_sessions[session.group_id].append(session)
-        
-        for group_id, sessions in group_sessions.items():
-            sessions.sort(key=lambda s: s.time_slot.start_minutes)
-            for i in range(1, len(sessions)):
-                prev = sessions[i-1]
-                curr = sessions[i]
-                
-                if prev.time_slot.day != curr.time_slot.day:
-                    continue
-                
-                gap = curr.time_slot.start_minutes - prev.time_slot.end_minutes
-                if gap > 30:  # دقائق
-                    # تقليل الفجوة إذا كان الوقت متاحًا
-                    new_start = prev.time_slot.end_minutes + self.config.min_break_between_classes
-                    if self._is_time_slot_available(curr, new_start, schedule):
-                        curr.time_slot.start_minutes = new_start
-                        curr.time_slot.end_minutes = new_start + curr.time_slot.duration
-        
-        return schedule
+    def _local_search(self, genome: np.ndarray) -> np.ndarray:
+        """تسلق تلال بحركات الطفرة نفسها، كل حركة تُقيَّم تزايديًا وتُقبل إن لم تزد العقوبة"""
+        iterations = self.config.ga_params.get("local_search_iterations", 1000)
+        if iterations <= 0 or len(genome) == 0:
+            return genome
+        engine = DeltaEvaluator(self.evaluator, genome, self.weights)
+        move_fns = [moves.time_shift, moves.room_swap, moves.instructor_swap, moves.day_rotation, moves.kempe_chain]
+        start_cost = current_cost = engine.cost()
+        for _ in range(iterations):
+            move_fn = self.rng.choices(move_fns, weights=self.mutation_weights, k=1)[0]
+            idx = self.rng.randint(0, len(genome) - 1)
+            move = move_fn(self.codec, engine.genome, idx, self.rng)
+            if not move:
+                continue
+            undo = engine.apply(move)
+            new_cost = engine.cost()
+            if new_cost <= current_cost:
+                current_cost = new_cost
+            else:
+                engine.apply(undo)
+        logger.debug(f"🔧 البحث المحلي: العقوبة {start_cost:.2f} ← {current_cost:.2f}")
+        return engine.genome
 
-    def _optimize_room_usage(self, schedule: List[Schedule]) -> List[Schedule]:
+    def _optimize_time_gaps(self, genome: np.ndarray) -> np.ndarray:
+        """تقليل الفجوات الزمنية بين محاضرات المجموعات (فهرس إشغال واحد يُحدَّث مع كل نقل)"""
+        index = self.repairer.build_index(genome)
+        for group_idx in np.unique(self.codec.group_idx):
+            group_resources = (("group", int(group_idx)), ("sub", int(group_idx)))
+            for day in self.codec.allowed_days:
+                day_start = day * MINUTES_PER_DAY
+                prev_end = None
+                # محاضرات المجموعة (بما فيها الفروع) في هذا اليوم مرتبة حسب البداية
+                for start, end, curr in index.entries(group_resources, day_start, day_start + MINUTES_PER_DAY):
+                    if prev_end is not None and start - prev_end > 30:  # دقائق
+                        # تقليل الفجوة إذا كان الوقت متاحًا: أول بداية على شبكة الزمن بعد الاستراحة
+                        earliest = prev_end + self.config.min_break_between_classes
+                        new_start = self.repairer.snap(earliest, earliest, start - 1)
+                        if new_start is not None and self._is_time_slot_available(curr, new_start, genome, index):
+                            self.repairer.move(index, genome, curr, new_start)
+                            start, end = new_start, new_start + (end - start)
+                    prev_end = end if prev_end is None else max(prev_end, end)
+        return genome
+
+    def _optimize_room_usage(self, genome: np.ndarray) -> np.ndarray:
         """تحسين استخدام القاعات لتقليل التغيير بين المحاضرات"""
         # ... (تنفيذ متقدم لتحسين استخدام القاعات)
-        return schedule
-
-    def _is_time_slot_available(self, session: Schedule, new_start: int, full_schedule: List[Schedule]) -> bool:
-        """التحقق من توفر الوقت الجديد مع الالتزام بالأيام المسموحة فقط"""
-        new_end = new_start + session.time_slot.duration
-        day = new_start // (24 * 60)
-        allowed_days = [d.value if hasattr(d, 'value') else int(d) for d in self.config.working_days]
-        if day not in allowed_days:
-            return False
-        for s in full_schedule:
-            if s == session:
+        return genome
+
+    def _is_time_slot_available(self, idx: int, new_start: int, genome: np.ndarray,
+                                index: Optional[OccupancyIndex] = None) -> bool:
+        """التحقق من توفر الوقت الجديد (القاعة والمدرس والمجموعة) ضمن أيام العمل وساعاته"""
+        if index is None:
+            index = self.repairer.build_index(genome)
+        return self.repairer.is_free(index, genome, idx, new_start)
+
+
+def _island_worker(conn, optimizer: EnhancedGeneticOptimizer, island_idx: int):
+    """عملية جزيرة: تنفذ الحقب المطلوبة عبر الأنبوب وتعيد النتائج والمهاجرين"""
+    try:
+        while True:
+            command, payload = conn.recv()
+            if command == "stop":
+                conn.send(("ok", (optimizer.islands[island_idx], optimizer.island_rngs[island_idx],
+                                  optimizer.fitness_cache.stats())))
+                break
+            if command == "state":
+                conn.send(("ok", (optimizer.islands[island_idx], optimizer.island_rngs[island_idx])))
                 continue
-            # نفس المدرس
-            s_day = s.time_slot.day.value if hasattr(s.time_slot.day, 'value') else int(s.time_slot.day)
-            if s.instructor_id == session.instructor_id:
-                if s_day == day:
-                    if s.time_slot.overlaps(TimeSlot(
-                        day=day,
-                        start_time=time(new_start % (24*60) // 60, new_start % 60),
-                        end_time=time(new_end % (24*60) // 60, new_end % 60)
-                    )):
-                        return False
-            # نفس المجموعة
-            if s.group_id == session.group_id:
-                if s_day == day:
-                    if s.time_slot.overlaps(TimeSlot(
-                        day=day,
-                        start_time=time(new_start % (24*60) // 60, new_start % 60),
-                        end_time=time(new_end % (24*60) // 60, new_end % 60)
-                    )):
-                        return False
-        return True
\ No newline at end of file
+            try:
+                generations, migrants = payload
+                conn.send(("ok", optimizer._run_epoch(island_idx, generations, migrants)))
+            except Exception as e:
+                logger.error(f"❌ خطأ في عملية الجزيرة {island_idx}: {e}", exc_info=True)
+                conn.send(("error", str(e)))
+    except EOFError:
+        pass
+    finally:
+        conn.close()
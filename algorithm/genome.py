@@ -0,0 +1,345 @@
+import logging
+from collections import defaultdict
+from typing import List, Dict
+from datetime import time
+
+import numpy as np
+
+from model import Schedule, TimeSlot, Config, Room, Instructor, DayOfWeek
+
+logger = logging.getLogger(__name__)
+
+MINUTES_PER_DAY = 24 * 60
+
+# أعمدة الجينوم: بداية الجلسة بدقائق الأسبوع، فهرس القاعة، فهرس المدرس
+START, ROOM, INSTRUCTOR = 0, 1, 2
+
+# ترتيب مفاتيح تفصيل العقوبات كما يعيدها SoftConstraintsValidator.penalty
+PENALTY_KEYS = [
+    "room_conflict", "instructor_conflict", "group_conflict",
+    "facility_mismatch", "time_preference", "minimize_gaps",
+    "balance_room_usage", "instructor_preference", "merge_bonus"
+]
+
+
+def day_value(day) -> int:
+    """قيمة اليوم كعدد صحيح سواء كان DayOfWeek أو int"""
+    return day.value if hasattr(day, 'value') else int(day)
+
+
+class GenomeCodec:
+    """
+    ترميز الجدول كمصفوفة أعداد صحيحة بحجم (عدد الجلسات × 3) بدل قائمة كائنات Schedule.
+    ترتيب الجلسات ثابت ومأخوذ من الجدول المرجعي، وكل البيانات الثابتة (المادة، المجموعة، المدة،
+    القاعات والمدرسون المناسبون) تُحسب مرة واحدة هنا وتتشاركها كل الأفراد.
+    """
+
+    def __init__(self, template: List[Schedule], config: Config):
+        self.config = config
+        self.sessions = list(template)
+        self.courses = [s.assigned_course for s in self.sessions]
+        self.groups = [s.assigned_group for s in self.sessions]
+        self.index_of = {s.course_id: i for i, s in enumerate(self.sessions)}
+        self.n_sessions = len(self.sessions)
+
+        # فهارس القاعات والمدرسين (من الإعدادات، مع أي مورد يظهر في الجدول فقط)
+        self.rooms: List[Room] = list(config.rooms)
+        self.instructors: List[Instructor] = list(config.instructors)
+        self.room_index = {r.id: i for i, r in enumerate(self.rooms)}
+        self.instructor_index = {inst.id: i for i, inst in enumerate(self.instructors)}
+        for s in self.sessions:
+            if s.room_id not in self.room_index:
+                self.room_index[s.room_id] = len(self.rooms)
+                self.rooms.append(s.assigned_room)
+            if s.instructor_id not in self.instructor_index:
+                self.instructor_index[s.instructor_id] = len(self.instructors)
+                self.instructors.append(s.assigned_instructor)
+
+        # خصائص ثابتة لكل جلسة
+        self.durations = np.array([s.time_slot.duration for s in self.sessions], dtype=np.int32)
+        group_ids = sorted({s.group_id for s in self.sessions})
+        group_pos = {gid: i for i, gid in enumerate(group_ids)}
+        self.group_ids = group_ids
+        self.group_idx = np.array([group_pos[s.group_id] for s in self.sessions], dtype=np.int32)
+        self.is_sub = np.array(["_sub" in s.course_id for s in self.sessions], dtype=bool)
+
+        # حدود الأيام وساعات العمل
+        self.allowed_days = [day_value(d) for d in config.working_days]
+        self.daily_start = config.daily_start_time.hour * 60 + config.daily_start_time.minute
+        self.daily_end = config.daily_end_time.hour * 60 + config.daily_end_time.minute
+        # دقة شبكة بدايات المحاضرات (كما في CP-SAT)، أو دقيقة واحدة دون شبكة
+        self.time_grid = max(1, int(config.time_grid_minutes)) if getattr(config, "use_time_grid", False) else 1
+
+        # القاعات والمدرسون المناسبون لكل جلسة (بدل إعادة التصفية في كل طفرة)
+        self.suitable_rooms = [self._suitable_rooms(s) for s in self.sessions]
+        self.suitable_instructors = [self._suitable_instructors(s) for s in self.sessions]
+
+        self.template_genome = np.array(
+            [self._encode_session(s) for s in self.sessions], dtype=np.int32
+        ).reshape(-1, 3)
+
+    def clamp_start(self, idx: int, start_in_day: int) -> int:
+        """ضبط بداية الجلسة (بدقائق اليوم) على أقرب نقطة من شبكة الزمن ضمن ساعات العمل"""
+        grid = self.time_grid
+        latest = self.daily_start + (self.daily_end - int(self.durations[idx]) - self.daily_start) // grid * grid
+        nearest = self.daily_start + round((start_in_day - self.daily_start) / grid) * grid
+        return min(max(nearest, self.daily_start), latest)
+
+    def _suitable_rooms(self, session: Schedule) -> np.ndarray:
+        """فهارس القاعات المطابقة لنوع المادة وسعة المجموعة والمرافق المطلوبة"""
+        course = session.assigned_course
+        return np.array([
+            i for i, room in enumerate(self.rooms)
+            if room.type == course.course_type
+            and room.capacity >= session.assigned_group.student_count
+            and (course.required_facilities is None or
+                 all(f in room.facilities for f in course.required_facilities))
+        ], dtype=np.int32)
+
+    def _suitable_instructors(self, session: Schedule) -> np.ndarray:
+        """فهارس المدرسين ذوي الخبرة في نوع المادة"""
+        course_type = session.assigned_course.course_type
+        return np.array([
+            i for i, inst in enumerate(self.instructors)
+            if course_type in inst.expertise
+        ], dtype=np.int32)
+
+    def encode(self, schedule: List[Schedule]) -> np.ndarray:
+        """تحويل قائمة Schedule إلى جينوم؛ الجلسات المفقودة تأخذ قيم الجدول المرجعي"""
+        genome = self.template_genome.copy()
+        missing = self.n_sessions
+        for s in schedule:
+            i = self.index_of.get(s.course_id)
+            if i is None:
+                logger.warning(f"⚠️ جلسة غير معروفة للترميز: {s.course_id}")
+                continue
+            genome[i] = self._encode_session(s)
+            missing -= 1
+        if missing > 0:
+            logger.warning(f"⚠️ {missing} جلسة غير موجودة في الجدول، تم استخدام قيم الجدول المرجعي")
+        return genome
+
+    def _encode_session(self, s: Schedule):
+        start = day_value(s.time_slot.day) * MINUTES_PER_DAY + s.time_slot.start_minutes
+        return start, self.room_index[s.room_id], self.instructor_index[s.instructor_id]
+
+    def decode(self, genome: np.ndarray) -> List[Schedule]:
+        """بناء كائنات Schedule من الجينوم (للنتيجة النهائية فقط)"""
+        result = []
+        for i, session in enumerate(self.sessions):
+            start, room_idx, instr_idx = (int(v) for v in genome[i])
+            day, minute = divmod(start, MINUTES_PER_DAY)
+            end = minute + int(self.durations[i])
+            room = self.rooms[room_idx]
+            instructor = self.instructors[instr_idx]
+            result.append(Schedule(
+                course_id=session.course_id,
+                room_id=room.id,
+                instructor_id=instructor.id,
+                time_slot=TimeSlot(
+                    day=DayOfWeek.from_int(day),
+                    start_time=time(minute // 60, minute % 60),
+                    end_time=time(end // 60, end % 60)
+                ),
+                group_id=session.group_id,
+                assigned_course=session.assigned_course,
+                assigned_room=room,
+                assigned_instructor=instructor,
+                assigned_group=session.assigned_group,
+                status=session.status
+            ))
+        return result
+
+
+class GenomeEvaluator:
+    """
+    حساب تفصيل العقوبات لجينوم (أو لسكان كاملين مكدسين) مباشرة بنفس مفاتيح وقيم
+    SoftConstraintsValidator.penalty دون بناء كائنات Schedule.
+    """
+
+    def __init__(self, codec: GenomeCodec):
+        self.codec = codec
+        n_rooms = len(codec.rooms)
+        n_instructors = len(codec.instructors)
+
+        # عدد المرافق الناقصة لكل (نمط متطلبات، قاعة)
+        patterns: Dict[tuple, int] = {}
+        pattern_idx = []
+        for course in codec.courses:
+            key = tuple(course.required_facilities or ())
+            pattern_idx.append(patterns.setdefault(key, len(patterns)))
+        self.pattern_idx = np.array(pattern_idx, dtype=np.int32)
+        self.missing_facilities = np.zeros((len(patterns), n_rooms), dtype=np.int32)
+        for key, p in patterns.items():
+            for r, room in enumerate(codec.rooms):
+                self.missing_facilities[p, r] = sum(1 for f in key if f not in room.facilities)
+
+        # تفضيلات المدرسين: الأيام المفضلة والفترات المفضلة
+        self.has_pref_days = np.zeros(n_instructors, dtype=bool)
+        self.pref_day_mask = np.zeros((n_instructors, 7), dtype=bool)
+        self.has_pref_slots = np.zeros(n_instructors, dtype=bool)
+        self.pref_slot_mask = None
+        for i, inst in enumerate(codec.instructors):
+            if inst.preferred_days:
+                self.has_pref_days[i] = True
+                for d in inst.preferred_days:
+                    self.pref_day_mask[i, day_value(d)] = True
+            if inst.preferred_slots:
+                if self.pref_slot_mask is None:
+                    self.pref_slot_mask = np.zeros((n_instructors, 7 * MINUTES_PER_DAY), dtype=bool)
+                self.has_pref_slots[i] = True
+                for slot in inst.preferred_slots:
+                    base = day_value(slot.day) * MINUTES_PER_DAY
+                    self.pref_slot_mask[i, base + slot.start_minutes: base + slot.end_minutes + 1] = True
+
+        # الجلسات القابلة للدمج (نادرة، تُعالج بحلقة بسيطة)
+        self.merge_sessions = [i for i, c in enumerate(codec.courses) if c.can_merge]
+
+    def penalty(self, genome: np.ndarray) -> Dict[str, float]:
+        """تفصيل العقوبات لجينوم واحد"""
+        return self.batch_penalty(genome[None])[0]
+
+    def batch_penalty(self, genomes: np.ndarray) -> List[Dict[str, float]]:
+        """تفصيل العقوبات لكل فرد في مصفوفة أجيال مكدسة بحجم (الأفراد × الجلسات × 3)"""
+        matrix = self.penalty_matrix(genomes)
+        return [dict(zip(PENALTY_KEYS, (float(v) for v in row))) for row in matrix]
+
+    def penalty_matrix(self, genomes: np.ndarray) -> np.ndarray:
+        """
+        مصفوفة العقوبات (الأفراد × PENALTY_KEYS) لسكان كاملين في استدعاء واحد:
+        ترتيب وفروق NumPy لكل مورد بدل المرور على كل جدول بحلقات Python.
+        """
+        codec = self.codec
+        genomes = np.asarray(genomes)
+        n_individuals = genomes.shape[0]
+        starts = genomes[:, :, START].astype(np.int64)
+        rooms = genomes[:, :, ROOM].astype(np.int64)
+        instructors = genomes[:, :, INSTRUCTOR].astype(np.int64)
+        ends = starts + codec.durations
+        groups = np.broadcast_to(codec.group_idx, starts.shape)
+
+        matrix = np.zeros((n_individuals, len(PENALTY_KEYS)))
+        if starts.shape[1] == 0:
+            return matrix
+        matrix[:, 0] = self._adjacent_overlaps(rooms, starts, ends) * 100.0
+        matrix[:, 1] = self._adjacent_overlaps(instructors, starts, ends) * 200.0
+
+        # المجموعات: التداخل مسموح فقط بين فرعين، والفجوات تُحسب على نفس الترتيب
+        order = self._resource_order(groups, starts)
+        grp = np.take_along_axis(groups, order, axis=1)
+        st = np.take_along_axis(starts, order, axis=1)
+        en = np.take_along_axis(ends, order, axis=1)
+        sub = codec.is_sub[order]
+        same_group = grp[:, 1:] == grp[:, :-1]
+        overlap = same_group & (st[:, 1:] < en[:, :-1]) & ~(sub[:, 1:] & sub[:, :-1])
+        matrix[:, 2] = np.count_nonzero(overlap, axis=1) * 150.0
+
+        matrix[:, 3] = self.missing_facilities[self.pattern_idx, rooms].sum(axis=1)
+
+        minutes = starts % MINUTES_PER_DAY
+        matrix[:, 4] = np.count_nonzero((minutes <= 8 * 60) | (minutes >= 16 * 60), axis=1)
+
+        same_day = same_group & (st[:, 1:] // MINUTES_PER_DAY == st[:, :-1] // MINUTES_PER_DAY)
+        gap = st[:, 1:] - en[:, :-1]
+        matrix[:, 5] = np.where(same_day & (gap > 60), (gap - 60) / 30, 0.0).sum(axis=1)
+
+        matrix[:, 6] = self._room_imbalance(rooms)
+        matrix[:, 7] = self._instructor_preference(starts, instructors)
+        matrix[:, 8] = -self._merge_bonus(starts)
+        return matrix
+
+    def session_contributions(self, genome: np.ndarray) -> np.ndarray:
+        """
+        مساهمة كل جلسة في العقوبات (الجلسات × PENALTY_KEYS): عقوبة كل زوج متداخل أو فجوة تُقسم
+        مناصفة بين جلستيه، فمجموع كل عمود يساوي قيمته في penalty_matrix.
+        عمودا توازن القاعات ومكافأة الدمج يبقيان صفرًا لأنهما خاصيتان للجدول كله.
+        """
+        codec = self.codec
+        starts = genome[:, START].astype(np.int64)
+        rooms = genome[:, ROOM].astype(np.int64)
+        instructors = genome[:, INSTRUCTOR].astype(np.int64)
+        ends = starts + codec.durations
+        n_sessions = len(genome)
+        contributions = np.zeros((n_sessions, len(PENALTY_KEYS)))
+        if n_sessions == 0:
+            return contributions
+
+        def share(column, order, pair_values):
+            half = pair_values / 2
+            contributions[:, column] = (np.bincount(order[1:], weights=half, minlength=n_sessions)
+                                        + np.bincount(order[:-1], weights=half, minlength=n_sessions))
+
+        for column, resource, weight in ((0, rooms, 100.0), (1, instructors, 200.0)):
+            order = np.argsort((resource << 20) | starts, kind='stable')
+            overlap = (resource[order][1:] == resource[order][:-1]) & (starts[order][1:] < ends[order][:-1])
+            share(column, order, overlap * weight)
+
+        order = np.argsort((codec.group_idx.astype(np.int64) << 20) | starts, kind='stable')
+        grp, st, en, sub = codec.group_idx[order], starts[order], ends[order], codec.is_sub[order]
+        same_group = grp[1:] == grp[:-1]
+        share(2, order, (same_group & (st[1:] < en[:-1]) & ~(sub[1:] & sub[:-1])) * 150.0)
+        gap = st[1:] - en[:-1]
+        long_gap = same_group & (st[1:] // MINUTES_PER_DAY == st[:-1] // MINUTES_PER_DAY) & (gap > 60)
+        share(5, order, np.where(long_gap, (gap - 60) / 30, 0.0))
+
+        contributions[:, 3] = self.missing_facilities[self.pattern_idx, rooms]
+        minutes = starts % MINUTES_PER_DAY
+        contributions[:, 4] = (minutes <= 8 * 60) | (minutes >= 16 * 60)
+        days = np.clip(starts // MINUTES_PER_DAY, 0, 6)
+        contributions[:, 7] = self.has_pref_days[instructors] & ~self.pref_day_mask[instructors, days]
+        if self.pref_slot_mask is not None:
+            slots = np.clip(starts, 0, self.pref_slot_mask.shape[1] - 1)
+            contributions[:, 7] += self.has_pref_slots[instructors] & ~self.pref_slot_mask[instructors, slots]
+        return contributions
+
+    @staticmethod
+    def _resource_order(resource: np.ndarray, starts: np.ndarray) -> np.ndarray:
+        """ترتيب كل صف حسب (المورد، بداية الأسبوع) مع الحفاظ على ترتيب الجلسات عند التساوي"""
+        key = (resource << 20) | starts
+        return np.argsort(key, axis=1, kind='stable')
+
+    def _adjacent_overlaps(self, resource: np.ndarray, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+        """عدد الأزواج المتجاورة المتداخلة لكل مورد بعد الترتيب حسب بداية الأسبوع"""
+        order = self._resource_order(resource, starts)
+        res = np.take_along_axis(resource, order, axis=1)
+        st = np.take_along_axis(starts, order, axis=1)
+        en = np.take_along_axis(ends, order, axis=1)
+        overlap = (res[:, 1:] == res[:, :-1]) & (st[:, 1:] < en[:, :-1])
+        return np.count_nonzero(overlap, axis=1)
+
+    def _room_imbalance(self, rooms: np.ndarray) -> np.ndarray:
+        """انحراف استخدام القاعات المستعملة عن المتوسط / 100"""
+        n_individuals, n_sessions = rooms.shape
+        n_rooms = len(self.codec.rooms)
+        flat = (rooms + np.arange(n_individuals)[:, None] * n_rooms).ravel()
+        usage = np.bincount(flat, weights=np.tile(self.codec.durations, n_individuals),
+                            minlength=n_individuals * n_rooms).reshape(n_individuals, n_rooms)
+        used = np.bincount(flat, minlength=n_individuals * n_rooms).reshape(n_individuals, n_rooms) > 0
+        avg = usage.sum(axis=1) / np.maximum(used.sum(axis=1), 1)
+        return np.where(used, np.abs(usage - avg[:, None]), 0.0).sum(axis=1) / 100
+
+    def _instructor_preference(self, starts: np.ndarray, instructors: np.ndarray) -> np.ndarray:
+        """مخالفات الأيام والفترات المفضلة للمدرسين"""
+        days = np.clip(starts // MINUTES_PER_DAY, 0, 6)
+        penalty = np.count_nonzero(self.has_pref_days[instructors] & ~self.pref_day_mask[instructors, days], axis=1)
+        if self.pref_slot_mask is not None:
+            slots = np.clip(starts, 0, self.pref_slot_mask.shape[1] - 1)
+            penalty += np.count_nonzero(self.has_pref_slots[instructors] & ~self.pref_slot_mask[instructors, slots], axis=1)
+        return penalty
+
+    def _merge_bonus(self, starts: np.ndarray) -> np.ndarray:
+        """مكافأة الجلسات القابلة للدمج في نفس المادة ونفس الفترة"""
+        bonus = np.zeros(starts.shape[0])
+        if not self.merge_sessions:
+            return bonus
+        for p in range(starts.shape[0]):
+            merged = defaultdict(list)
+            for i in self.merge_sessions:
+                key = (self.codec.courses[i].id, int(starts[p, i]), int(self.codec.durations[i]))
+                merged[key].append(i)
+            for sessions in merged.values():
+                if len(sessions) > 1:
+                    bonus[p] += len(sessions)
+                    if len({self.codec.groups[i].major for i in sessions}) > 1:
+                        bonus[p] += 2
+        return bonus
@@ -0,0 +1,137 @@
+"""
+حركات الجوار المشتركة بين الخوارزمية الجينية والتلدين المحاكى والبحث المحظور.
+
+الحركة قائمة تغييرات [(فهرس الجلسة، البداية، القاعة، المدرس)] تُطبَّق على جينوم،
+وتطبيقها يعيد حركة التراجع المقابلة.
+"""
+from typing import List, Tuple
+
+import numpy as np
+
+from algorithm.genome import GenomeCodec, MINUTES_PER_DAY, START, ROOM, INSTRUCTOR
+
+Move = List[Tuple[int, int, int, int]]
+
+
+def apply_move(genome: np.ndarray, move: Move) -> Move:
+    """تطبيق الحركة على الجينوم في مكانه وإرجاع حركة التراجع"""
+    undo = [(idx, int(genome[idx, START]), int(genome[idx, ROOM]), int(genome[idx, INSTRUCTOR]))
+            for idx, _, _, _ in move]
+    for idx, start, room, instructor in move:
+        genome[idx] = (start, room, instructor)
+    return undo[::-1]
+
+
+def _change(genome: np.ndarray, idx: int, start: int = None, room: int = None, instructor: int = None) -> Move:
+    """حركة تغيّر جلسة واحدة (القيم غير المحددة تبقى كما هي)"""
+    return [(
+        idx,
+        int(genome[idx, START]) if start is None else int(start),
+        int(genome[idx, ROOM]) if room is None else int(room),
+        int(genome[idx, INSTRUCTOR]) if instructor is None else int(instructor)
+    )]
+
+
+def time_shift(codec: GenomeCodec, genome: np.ndarray, idx: int, rnd) -> Move:
+    """تغيير وقت الجلسة ضمن يومها (حتى ساعة) مع الالتزام بالأيام وساعات العمل"""
+    current_day, old_start = divmod(int(genome[idx, START]), MINUTES_PER_DAY)
+    # إذا اليوم غير مسموح، اختر يوم مسموح عشوائي
+    if current_day not in codec.allowed_days:
+        current_day = rnd.choice(codec.allowed_days)
+    duration = int(codec.durations[idx])
+    max_shift = max(0, min(60, codec.daily_end - codec.daily_start - duration))
+    # الإزاحة بخطوات شبكة الزمن حتى لا تُقرَّب إلى البداية نفسها
+    shift = rnd.randint(-(max_shift // codec.time_grid), max_shift // codec.time_grid) * codec.time_grid
+    new_start = codec.clamp_start(idx, old_start + shift)
+    return _change(genome, idx, start=current_day * MINUTES_PER_DAY + new_start)
+
+
+def room_swap(codec: GenomeCodec, genome: np.ndarray, idx: int, rnd) -> Move:
+    """نقل الجلسة إلى قاعة مناسبة أخرى"""
+    suitable_rooms = codec.suitable_rooms[idx]
+    if not len(suitable_rooms):
+        return []
+    return _change(genome, idx, room=rnd.choice(suitable_rooms))
+
+
+def instructor_swap(codec: GenomeCodec, genome: np.ndarray, idx: int, rnd) -> Move:
+    """إسناد الجلسة إلى مدرس آخر ذي خبرة في نوع المادة"""
+    candidates = codec.suitable_instructors[idx]
+    candidates = candidates[candidates != genome[idx, INSTRUCTOR]]
+    if not len(candidates):
+        return []
+    return _change(genome, idx, instructor=rnd.choice(candidates))
+
+
+def day_rotation(codec: GenomeCodec, genome: np.ndarray, idx: int, rnd) -> Move:
+    """نقل الجلسة إلى يوم عمل آخر مع الحفاظ على وقتها ضمن ساعات العمل"""
+    allowed_days = codec.allowed_days
+    current_day, start_in_day = divmod(int(genome[idx, START]), MINUTES_PER_DAY)
+    possible_days = [d for d in allowed_days if d != current_day]
+    if possible_days:
+        new_day = rnd.choice(possible_days)
+        return _change(genome, idx, start=new_day * MINUTES_PER_DAY + codec.clamp_start(idx, start_in_day))
+    if allowed_days:
+        # إذا لم يوجد يوم بديل، ثبّت اليوم الحالي على أول يوم مسموح
+        return _change(genome, idx, start=allowed_days[0] * MINUTES_PER_DAY + codec.daily_start)
+    return []
+
+
+def swap_times(codec: GenomeCodec, genome: np.ndarray, a: int, b: int) -> Move:
+    """تبادل وقتي جلستين (كل جلسة تحتفظ بمدتها وتُضبط ضمن ساعات العمل)"""
+    day_a, start_a = divmod(int(genome[a, START]), MINUTES_PER_DAY)
+    day_b, start_b = divmod(int(genome[b, START]), MINUTES_PER_DAY)
+    return (_change(genome, a, start=day_b * MINUTES_PER_DAY + codec.clamp_start(a, start_b))
+            + _change(genome, b, start=day_a * MINUTES_PER_DAY + codec.clamp_start(b, start_a)))
+
+
+def kempe_swap(codec: GenomeCodec, genome: np.ndarray, idx: int, target_start: int) -> Move:
+    """
+    تبادل سلسلة كمبي بين فترتين زمنيتين: فترة الجلسة idx والفترة التي تبدأ في target_start (بطول الجلسة).
+    تبدأ السلسلة بالجلسة وتضم كل جلسة في الفترة المقابلة تشاركها قاعة أو مدرسًا أو مجموعة، وهكذا؛
+    جلسات الفترة الأولى تنتقل إلى الثانية وجلسات الثانية إلى الأولى بالإزاحة نفسها.
+    """
+    starts = genome[:, START].astype(np.int64)
+    ends = starts + codec.durations
+    source = int(starts[idx])
+    width = int(codec.durations[idx])
+    delta = int(target_start) - source
+    if abs(delta) < width:
+        return []
+    in_source = (starts < source + width) & (ends > source)
+    in_target = (starts < target_start + width) & (ends > target_start) & ~in_source
+    members = np.flatnonzero(in_source | in_target)
+    resources = np.stack([genome[:, ROOM], genome[:, INSTRUCTOR], codec.group_idx], axis=1)
+
+    chain = {idx}
+    frontier = [idx]
+    while frontier:
+        i = frontier.pop()
+        opposite = members[(in_target if in_source[i] else in_source)[members]]
+        for j in opposite[(resources[opposite] == resources[i]).any(axis=1)]:
+            if int(j) not in chain:
+                chain.add(int(j))
+                frontier.append(int(j))
+
+    move = []
+    for j in sorted(chain):
+        day, minute = divmod(int(starts[j]) + (delta if in_source[j] else -delta), MINUTES_PER_DAY)
+        if day not in codec.allowed_days:
+            return []
+        move += _change(genome, j, start=day * MINUTES_PER_DAY + codec.clamp_start(j, minute))
+    return move
+
+
+def kempe_chain(codec: GenomeCodec, genome: np.ndarray, idx: int, rnd) -> Move:
+    """سلسلة كمبي بين فترة الجلسة وفترة جلسة أخرى عشوائية لا تتداخل معها"""
+    starts = genome[:, START]
+    candidates = np.flatnonzero(np.abs(starts - starts[idx]) >= codec.durations[idx])
+    if not len(candidates):
+        return []
+    return kempe_swap(codec, genome, idx, int(starts[rnd.choice(candidates)]))
+
+
+def swap_rooms(codec: GenomeCodec, genome: np.ndarray, a: int, b: int) -> Move:
+    """تبادل قاعتي جلستين"""
+    return (_change(genome, a, room=genome[b, ROOM])
+            + _change(genome, b, room=genome[a, ROOM]))
@@ -0,0 +1,95 @@
+from bisect import bisect_left, insort
+from collections import defaultdict
+from typing import Dict, Hashable, Iterable, List, Optional, Tuple
+
+
+class OccupancyIndex:
+    """
+    فهرس إشغال الموارد (قاعات، مدرسون، مجموعات): لكل مورد قائمة فترات [البداية، النهاية)
+    مرتبة حسب البداية بدقائق الأسبوع، مع بحث ثنائي عن الفترات المتداخلة مع نطاق معين.
+    """
+
+    def __init__(self):
+        self._entries: Dict[Hashable, List[Tuple[int, int, int]]] = defaultdict(list)
+        self._placed: Dict[int, Tuple[int, int, Tuple[Hashable, ...]]] = {}
+        # أطول فترة مُدرجة: تحدد أبعد بداية يمكن أن تتداخل مع نطاق البحث
+        self.max_duration = 0
+
+    def __contains__(self, session: int) -> bool:
+        return session in self._placed
+
+    def __len__(self) -> int:
+        return len(self._placed)
+
+    def insert(self, session: int, start: int, end: int, resources: Iterable[Hashable]):
+        """إشغال الموارد بالجلسة في الفترة [start, end)"""
+        resources = tuple(resources)
+        self._placed[session] = (start, end, resources)
+        self.max_duration = max(self.max_duration, end - start)
+        for resource in resources:
+            insort(self._entries[resource], (start, end, session))
+
+    def remove(self, session: int):
+        """تحرير موارد الجلسة"""
+        start, end, resources = self._placed.pop(session)
+        for resource in resources:
+            entries = self._entries[resource]
+            del entries[bisect_left(entries, (start, end, session))]
+
+    def move(self, session: int, start: int, end: int):
+        """نقل الجلسة إلى فترة جديدة مع الاحتفاظ بمواردها"""
+        resources = self._placed[session][2]
+        self.remove(session)
+        self.insert(session, start, end, resources)
+
+    def overlapping(self, resource: Hashable, start: int, end: int) -> List[Tuple[int, int, int]]:
+        """الفترات (البداية، النهاية، الجلسة) المشغولة للمورد والمتداخلة مع [start, end)"""
+        entries = self._entries.get(resource)
+        if not entries:
+            return []
+        i = bisect_left(entries, (start - self.max_duration,))
+        result = []
+        while i < len(entries) and entries[i][0] < end:
+            if entries[i][1] > start:
+                result.append(entries[i])
+            i += 1
+        return result
+
+    def entries(self, resources: Iterable[Hashable], start: int, end: int) -> List[Tuple[int, int, int]]:
+        """الفترات المتداخلة مع [start, end) لعدة موارد مرتبة حسب البداية (كل جلسة مرة واحدة)"""
+        return sorted({entry for resource in resources for entry in self.overlapping(resource, start, end)})
+
+    def is_free(self, resources: Iterable[Hashable], start: int, end: int, ignore: Optional[int] = None) -> bool:
+        """هل كل الموارد متاحة في [start, end) (مع تجاهل الجلسة ignore إن وُجدت)"""
+        for resource in resources:
+            for _, _, session in self.overlapping(resource, start, end):
+                if session != ignore:
+                    return False
+        return True
+
+    def busy(self, resources: Iterable[Hashable], start: int, end: int, ignore: Optional[int] = None) -> List[Tuple[int, int]]:
+        """الفترات المشغولة المدمجة لمجموعة موارد داخل [start, end)"""
+        intervals = sorted(
+            (s, e) for resource in resources
+            for s, e, session in self.overlapping(resource, start, end)
+            if session != ignore
+        )
+        merged: List[Tuple[int, int]] = []
+        for s, e in intervals:
+            if merged and s <= merged[-1][1]:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], e))
+            else:
+                merged.append((s, e))
+        return merged
+
+    def free_gaps(self, resources: Iterable[Hashable], start: int, end: int, ignore: Optional[int] = None) -> List[Tuple[int, int]]:
+        """الفجوات الحرة المشتركة لمجموعة موارد داخل [start, end)"""
+        gaps = []
+        cursor = start
+        for s, e in self.busy(resources, start, end, ignore):
+            if s > cursor:
+                gaps.append((cursor, s))
+            cursor = max(cursor, e)
+        if cursor < end:
+            gaps.append((cursor, end))
+        return gaps
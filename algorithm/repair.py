@@ -0,0 +1,156 @@
+import logging
+from typing import Hashable, Optional, Tuple
+
+import numpy as np
+
+from algorithm.genome import GenomeCodec, MINUTES_PER_DAY, START, ROOM, INSTRUCTOR
+from algorithm.occupancy import OccupancyIndex
+
+logger = logging.getLogger(__name__)
+
+
+class RepairEngine:
+    """
+    إصلاح التعارضات الصلبة في جينوم (القاعة، المدرس، المجموعة) والمواضع غير المسموحة:
+    الجلسات تُدرج في فهرس إشغال واحدة تلو الأخرى، وكل جلسة متعارضة تُنقل إلى أقرب
+    فترة حرة مسموحة (أيام العمل وساعاته، على شبكة الزمن) في قاعتها ثم في القاعات المناسبة الأخرى.
+    """
+
+    def __init__(self, codec: GenomeCodec):
+        self.codec = codec
+        self.durations = [int(d) for d in codec.durations]
+
+    def session_resources(self, idx: int, room: int, instructor: int) -> Tuple[Tuple[Hashable, ...], Tuple[Hashable, ...]]:
+        """(الموارد التي تشغلها الجلسة، الموارد التي يجب أن تكون حرة لها)"""
+        group = int(self.codec.group_idx[idx])
+        room_key = ("room", room)
+        instructor_key = ("instructor", instructor)
+        if self.codec.is_sub[idx]:
+            # الفروع يمكن أن تتداخل فيما بينها فقط، لا مع محاضرات المجموعة الكاملة
+            return (room_key, instructor_key, ("sub", group)), (room_key, instructor_key, ("group", group))
+        return ((room_key, instructor_key, ("group", group)),
+                (room_key, instructor_key, ("group", group), ("sub", group)))
+
+    def is_legal(self, idx: int, start: int) -> bool:
+        """هل البداية ضمن أيام العمل وساعاته"""
+        day, minute = divmod(start, MINUTES_PER_DAY)
+        return (day in self.codec.allowed_days
+                and minute >= self.codec.daily_start
+                and minute + self.durations[idx] <= self.codec.daily_end)
+
+    def build_index(self, genome: np.ndarray) -> OccupancyIndex:
+        """فهرس إشغال لكل جلسات الجينوم"""
+        index = OccupancyIndex()
+        for idx in range(len(genome)):
+            self.insert(index, genome, idx)
+        return index
+
+    def insert(self, index: OccupancyIndex, genome: np.ndarray, idx: int):
+        """إدراج الجلسة في الفهرس حسب موضعها الحالي في الجينوم"""
+        start = int(genome[idx, START])
+        occupy, _ = self.session_resources(idx, int(genome[idx, ROOM]), int(genome[idx, INSTRUCTOR]))
+        index.insert(idx, start, start + self.durations[idx], occupy)
+
+    def is_free(self, index: OccupancyIndex, genome: np.ndarray, idx: int, start: int,
+                room: Optional[int] = None) -> bool:
+        """هل يمكن وضع الجلسة في start (وفي القاعة room إن حُددت) دون تعارض وضمن أوقات العمل"""
+        if not self.is_legal(idx, start):
+            return False
+        room = int(genome[idx, ROOM]) if room is None else room
+        _, check = self.session_resources(idx, room, int(genome[idx, INSTRUCTOR]))
+        return index.is_free(check, start, start + self.durations[idx], ignore=idx)
+
+    def move(self, index: OccupancyIndex, genome: np.ndarray, idx: int, start: int, room: Optional[int] = None):
+        """نقل الجلسة في الجينوم وتحديث الفهرس"""
+        genome[idx, START] = start
+        if room is not None and room != genome[idx, ROOM]:
+            genome[idx, ROOM] = room
+            index.remove(idx)
+            self.insert(index, genome, idx)
+        else:
+            index.move(idx, start, start + self.durations[idx])
+
+    def conflict_flags(self, genome: np.ndarray) -> np.ndarray:
+        """تعليم الجلسات في أزواج متجاورة متداخلة لأي مورد أو في مواضع غير مسموحة (عملية متجهة)"""
+        codec = self.codec
+        starts = genome[:, START].astype(np.int64)
+        ends = starts + codec.durations
+        flags = np.zeros(len(genome), dtype=bool)
+        for resource, excused in ((genome[:, ROOM], None), (genome[:, INSTRUCTOR], None),
+                                  (codec.group_idx, codec.is_sub)):
+            order = np.lexsort((starts, resource))
+            res = resource[order]
+            overlap = (res[1:] == res[:-1]) & (starts[order][1:] < ends[order][:-1])
+            if excused is not None:
+                ex = excused[order]
+                overlap &= ~(ex[1:] & ex[:-1])
+            flags[order[1:][overlap]] = True
+            flags[order[:-1][overlap]] = True
+        days, minutes = np.divmod(starts, MINUTES_PER_DAY)
+        flags |= ~np.isin(days, codec.allowed_days)
+        flags |= (minutes < codec.daily_start) | (minutes + codec.durations > codec.daily_end)
+        return flags
+
+    def repair(self, genome: np.ndarray) -> np.ndarray:
+        """إصلاح الجينوم في مكانه وإرجاعه"""
+        flags = self.conflict_flags(genome)
+        if not flags.any():
+            return genome
+        index = OccupancyIndex()
+        # الجلسات السليمة أولاً حتى تحتفظ بمواضعها، ثم المتعارضة حسب بدايتها
+        order = sorted(range(len(genome)), key=lambda i: (bool(flags[i]), int(genome[i, START])))
+        unresolved = 0
+        for idx in order:
+            if not self.is_free(index, genome, idx, int(genome[idx, START])):
+                slot = self.nearest_free_slot(index, genome, idx)
+                if slot is None:
+                    unresolved += 1
+                else:
+                    genome[idx, START], genome[idx, ROOM] = slot
+            self.insert(index, genome, idx)
+        if unresolved:
+            logger.debug(f"⚠️ تعذر إيجاد فترة حرة لـ {unresolved} جلسة أثناء الإصلاح")
+        return genome
+
+    def nearest_free_slot(self, index: OccupancyIndex, genome: np.ndarray, idx: int,
+                          rooms=None) -> Optional[Tuple[int, int]]:
+        """
+        أقرب (بداية، قاعة) حرة ومسموحة للجلسة بالمسافة بدقائق الأسبوع عن موضعها الحالي:
+        القاعة الحالية أولاً، ثم بقية القاعات المناسبة إذا لم يوجد موضع حر فيها.
+        """
+        codec = self.codec
+        duration = self.durations[idx]
+        original = int(genome[idx, START])
+        current_room = int(genome[idx, ROOM])
+        instructor = int(genome[idx, INSTRUCTOR])
+        if rooms is None:
+            rooms = [current_room] + [int(r) for r in codec.suitable_rooms[idx] if r != current_room]
+        for room in rooms:
+            _, check = self.session_resources(idx, room, instructor)
+            best = None
+            for day in codec.allowed_days:
+                base = day * MINUTES_PER_DAY
+                for gap_start, gap_end in index.free_gaps(check, base + codec.daily_start, base + codec.daily_end, ignore=idx):
+                    start = self._snap(original, gap_start, gap_end - duration, base)
+                    if start is not None and (best is None or abs(start - original) < abs(best - original)):
+                        best = start
+            if best is not None:
+                return best, room
+        return None
+
+    def snap(self, target: int, lo: int, hi: int) -> Optional[int]:
+        """أقرب بداية على شبكة الزمن إلى target داخل [lo, hi] في يوم lo (None إن لم توجد)"""
+        return self._snap(target, lo, hi, lo - lo % MINUTES_PER_DAY)
+
+    def _snap(self, target: int, lo: int, hi: int, day_base: int) -> Optional[int]:
+        """أقرب نقطة على شبكة الزمن (من بداية يوم العمل) إلى target داخل [lo, hi]"""
+        if hi < lo:
+            return None
+        grid = self.codec.time_grid
+        origin = day_base + self.codec.daily_start
+        first = origin - ((origin - lo) // grid) * grid
+        last = origin + ((hi - origin) // grid) * grid
+        if first > last:
+            return None
+        nearest = origin + round((min(max(target, lo), hi) - origin) / grid) * grid
+        return min(max(nearest, first), last)
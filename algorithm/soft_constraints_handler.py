@@ -1,11 +1,18 @@
 import logging
 import random
 import math
-from copy import deepcopy
+import multiprocessing
+import os
 import time as systime
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
 
 from model import Schedule, TimeSlot
-from algorithm.soft_constraints_validator import SoftConstraintsValidator
+from algorithm.genome import GenomeCodec, GenomeEvaluator
+from algorithm.delta_evaluator import DeltaEvaluator
+from algorithm import moves
+from algorithm.moves import Move
 
 # إعدادات تسجيل الدخول
 logger = logging.getLogger(__name__)
@@ -16,86 +23,455 @@ handler.setFormatter(formatter)
 logger.addHandler(handler)
 
 
+class AnnealingChain:
+    """
+    سلسلة تلدين واحدة: جينوم حالي داخل مقيِّم تزايدي، مولد عشوائي خاص، درجة حرارة، وأفضل حل وُجد.
+    الحركات تُطبَّق في مكانها ويُتراجع عن المرفوضة، ولا يُنسخ إلا الجينوم الأفضل.
+    """
+
+    # حركات الجوار: تبادل بين جلستين أو تعديل جلسة واحدة، مع أوزانها النسبية بنفس الترتيب
+    PAIR_MOVES = [moves.swap_times, moves.swap_rooms]
+    SINGLE_MOVES = [moves.time_shift, moves.room_swap]
+    MOVE_WEIGHTS = [0.3, 0.2, 0.3, 0.2]
+
+    def __init__(self, codec: GenomeCodec, evaluator: GenomeEvaluator, genome: np.ndarray,
+                 weights: Dict[str, float], rng: random.Random, temperature: float):
+        self.codec = codec
+        self.engine = DeltaEvaluator(evaluator, genome, weights)
+        self.rng = rng
+        self.temperature = temperature
+        self.current_cost = self.engine.cost()
+        self.best_cost = self.current_cost
+        self.best_genome = self.engine.genome.copy()
+        self.iterations = 0
+        self.accepted = 0
+        self.improved = 0
+
+    def neighbor(self) -> Move:
+        """حركة مجاورة: تبديل قاعتي أو وقتي جلستين، أو إزاحة وقت جلسة أو نقلها لقاعة مناسبة أخرى"""
+        choice = self.rng.choices(range(4), weights=self.MOVE_WEIGHTS, k=1)[0]
+        if choice < 2:
+            a, b = self.rng.sample(range(self.codec.n_sessions), 2)
+            return self.PAIR_MOVES[choice](self.codec, self.engine.genome, a, b)
+        idx = self.rng.randrange(self.codec.n_sessions)
+        return self.SINGLE_MOVES[choice - 2](self.codec, self.engine.genome, idx, self.rng)
+
+    def run(self, iterations: int):
+        """تنفيذ iterations تكرار بدرجة الحرارة الحالية"""
+        for _ in range(iterations):
+            self.iterations += 1
+            move = self.neighbor()
+            if not move:
+                continue
+            undo = self.engine.apply(move)
+            cand_cost = self.engine.cost()
+            delta = cand_cost - self.current_cost
+
+            # قبول الحل أو التراجع عن الحركة
+            if delta <= 0 or self.rng.random() < math.exp(-delta / self.temperature):
+                self.current_cost = cand_cost
+                self.accepted += 1
+                if cand_cost < self.best_cost:
+                    self.best_genome = self.engine.genome.copy()
+                    self.best_cost = cand_cost
+                    self.improved += 1
+            else:
+                self.engine.apply(undo)
+
+    def summary(self) -> Dict[str, Any]:
+        """أفضل حل وعدادات السلسلة (ما تعيده عملية النسخة عند إيقافها)"""
+        return {
+            "best_genome": self.best_genome,
+            "best_cost": self.best_cost,
+            "current_cost": self.current_cost,
+            "temperature": self.temperature,
+            "iterations": self.iterations,
+            "accepted": self.accepted,
+            "improved": self.improved
+        }
+
 
 class SoftConstraintsOptimizer:
     """
     محرك تحسين الجدول عبر التعامل مع القيود المرنة.
-    يستخدم simulated annealing لتحسين الجدول الناتج من CP‑SAT.
+    يستخدم simulated annealing لتحسين الجدول الناتج من CP‑SAT، بسلسلة واحدة مبرَّدة
+    (جدول تبريد هندسي أو Lundy–Mees أو تكيفي حسب نسبة القبول، مع إعادة تسخين عند الركود)
+    أو بالتلدين المتوازي (parallel tempering): عدة نسخ على سلّم حرارة هندسي تتبادل درجاتها دوريًا.
     """
 
+    SCHEDULES = ("geometric", "lundy_mees", "adaptive")
+    # عدد التكرارات بين تحديثين لدرجة الحرارة وفحصين للوقت
+    BLOCK_SIZE = 100
+
     def __init__(self, schedules: list[Schedule], config):
         """
         schedules: قائمة الجداول المبدئية (Schedule objects).
-        config: يحتوي على أوزان العقوبات للقيود المرنة وخيارات SA.
+        config: يحتوي على أوزان العقوبات للقيود المرنة وخيارات SA (config.sa_params).
         """
-        self.best = deepcopy(schedules)
-        self.current = deepcopy(schedules)
         self.config = config
-        self.temperature = config.sa_start_temp
-        self.cooling_rate = config.sa_cooling_rate
-    # في أعلى genetic_optimizer.py
+        self.params = getattr(config, "sa_params", {})
+        self.codec = GenomeCodec(schedules, config)
+        self.evaluator = GenomeEvaluator(self.codec)
+        self.weights = config.ga_params.get("penalty_weights", {})
+        self.best = list(schedules)
+        self.rng = random.Random(self.params.get("random_seed"))
+        self.temperature = self.params.get("start_temp") or 100.0
+        self.min_temp = self.params.get("min_temp", 1e-3)
+        self.time_limit = self.params.get("time_limit")
+        self.schedule = self.params.get("schedule", "geometric")
+        if self.schedule not in self.SCHEDULES:
+            logger.warning(f"⚠️ جدول تبريد غير معروف '{self.schedule}'، سيُستخدم الهندسي")
+            self.schedule = "geometric"
+        self.stats: Dict[str, Any] = {}
+        # الجدول الحالي جينوم داخل المقيِّم التزايدي للسلسلة الرئيسية
+        self.chain = AnnealingChain(self.codec, self.evaluator, self.codec.template_genome,
+                                    self.weights, self.rng, self.temperature)
+        self.engine = self.chain.engine
+        self.replicas: List[AnnealingChain] = []
 
-    def _compute_cost(self, schedules: list[Schedule]) -> float:
+    def _compute_cost(self) -> float:
         """
-        يجمع تكلفة جميع القيود المرنة حسب Validator وأوزانها.
+        يجمع تكلفة جميع القيود المرنة للجدول الحالي حسب أوزانها (من المقيِّم التزايدي).
         """
+        return self.engine.cost()
+
+    def _neighbor(self) -> Move:
         """
-        يحسب التكلفة (penalty) للجدول بالكامل (قائمة الجداول) دفعة واحدة.
+        يولّد حركة مجاورة للجدول الحالي.
         """
-        return SoftConstraintsValidator.penalty(
-            schedules,
-            self.config
-        )
-        # حساب التكلفة الإجمالية للجدول
-        # total_penalty = 0.0
-        # for sched in schedules:
-        #     total_penalty += SoftConstraintsValidator.penalty(sched, self.config)
-        # return total_penalty
+        return self.chain.neighbor()
 
-    def _neighbor(self, schedules: list[Schedule]) -> list[Schedule]:
+    def _initial_temperature(self) -> float:
         """
-        يولّد جدولاً مجاورًا عبر تبديل قاعتين أو يومين/وقتَين لمادتين.
+        درجة الحرارة الابتدائية: start_temp إن حُددت، وإلا معايرتها من فروق عينة من الحركات
+        بحيث يُقبل متوسط الحركة الصاعدة باحتمال initial_acceptance (دون الحركات التي تضيف تعارضًا صلبًا).
         """
-        neighbor = deepcopy(schedules)
-        a, b = random.sample(range(len(neighbor)), 2)
-        # نبدل موقعي الحصتين (time_slot) أو القاعات
-        if random.random() < 0.5:
-            neighbor[a].time_slot, neighbor[b].time_slot = neighbor[b].time_slot, neighbor[a].time_slot
-        else:
-            neighbor[a].assigned_room, neighbor[b].assigned_room = neighbor[b].assigned_room, neighbor[a].assigned_room
-        return neighbor
-
-    def optimize(self, max_iters: int = 10000):
+        if self.params.get("start_temp"):
+            return self.params["start_temp"]
+        hard_weights = [self.weights[k] for k in ("room_conflict", "instructor_conflict", "group_conflict")
+                        if k in self.weights]
+        hard_threshold = min(hard_weights) if hard_weights else math.inf
+        uphill = []
+        for _ in range(self.params.get("calibration_samples", 200)):
+            move = self.chain.neighbor()
+            if move:
+                delta = self.engine.delta(move)
+                if 0 < delta < hard_threshold:
+                    uphill.append(delta)
+        if not uphill:
+            return self.temperature
+        acceptance = min(max(self.params.get("initial_acceptance", 0.8), 1e-3), 0.999)
+        temperature = -(sum(uphill) / len(uphill)) / math.log(acceptance)
+        logger.debug(f"🌡️ معايرة درجة الحرارة الابتدائية من {len(uphill)} حركة: {temperature:.2f}")
+        return temperature
+
+    def _progress(self, iterations: int, elapsed: float, max_iters: int) -> float:
+        """نسبة التقدم [0، 1] حسب ميزانية التكرارات أو الوقت (أيهما أقرب للنفاد)"""
+        progress = 0.0
+        if max_iters:
+            progress = iterations / max_iters
+        if self.time_limit:
+            progress = max(progress, elapsed / self.time_limit)
+        return progress
+
+    def _next_temperature(self, temperature: float, origin_temp: float, origin_progress: float,
+                          progress: float, acceptance: float) -> float:
         """
-        يشغّل simulated annealing لتحسين الجدول.
+        درجة الحرارة التالية حسب جدول التبريد. الجدولان الهندسي و Lundy–Mees يصلان إلى min_temp
+        عند نهاية الميزانية (بدءًا من origin_temp عند origin_progress، أي منذ آخر إعادة تسخين)؛
+        والتكيفي يرفع الحرارة أو يخفضها لتتبع نسبة قبول مستهدفة تتناقص من initial_acceptance إلى final_acceptance.
         """
-        try:
-            current_cost = self._compute_cost(self.current)
-            best_cost = current_cost
-            logger.info(f"💡 بدء التحسين: التكلفة الحالية = {current_cost:.2f}")
-
-            for it in range(max_iters):
-                candidate = self._neighbor(self.current)
-                cand_cost = self._compute_cost(candidate)
-                delta = cand_cost - current_cost
-
-                # قبول الحل
-                if delta < 0 or random.random() < math.exp(-delta / self.temperature):
-                    self.current = candidate
-                    current_cost = cand_cost
-                    if cand_cost < best_cost:
-                        self.best = deepcopy(candidate)
-                        best_cost = cand_cost
-                        logger.debug(f"🆕 حل أفضل بإجمالي تكلفة {best_cost:.2f} عند التكرار {it}")
-
-                # تبريد
-                self.temperature *= self.cooling_rate
-                if self.temperature < 1e-3:
-                    break
+        final_temp = min(self.min_temp, origin_temp)
+        span = min(max((progress - origin_progress) / max(1.0 - origin_progress, 1e-9), 0.0), 1.0)
+        if self.schedule == "geometric":
+            return origin_temp * (final_temp / origin_temp) ** span
+        if self.schedule == "lundy_mees":
+            # T_k = T0 / (1 + k·β·T0) مع β بحيث تبلغ الحرارة min_temp عند نهاية الميزانية
+            return origin_temp / (1 + (origin_temp / final_temp - 1) * span)
+        start_rate = self.params.get("initial_acceptance", 0.8)
+        end_rate = self.params.get("final_acceptance", 0.01)
+        target = start_rate * (end_rate / start_rate) ** progress
+        step = self.params.get("adaptive_step", 0.05)
+        temperature *= (1 + step) if acceptance < target else (1 - step)
+        return max(temperature, final_temp)
 
-            logger.info(f"🏁 انتهاء التحسين: أفضل تكلفة = {best_cost:.2f}")
-            return self.best
+    def optimize(self, max_iters: Optional[int] = None) -> Tuple[List[Schedule], Dict[str, Any]]:
+        """
+        يشغّل simulated annealing لتحسين الجدول (أو التلدين المتوازي إذا فُعّل parallel_tempering)
+        حتى نفاد ميزانية التكرارات (iterations، 0 = بلا حد) أو الوقت (time_limit بالثواني).
+        يُرجع (أفضل جدول، الإحصائيات).
+        """
+        if max_iters is None:
+            max_iters = self.params.get("iterations", 50000)
+        if not max_iters and not self.time_limit:
+            logger.warning("⚠️ لا ميزانية تكرارات ولا ميزانية زمنية للتلدين، سيُستخدم 50000 تكرار")
+            max_iters = 50000
+        try:
+            if self.codec.n_sessions < 2:
+                return self.best, self.stats
+            if self.params.get("parallel_tempering", False):
+                return self._parallel_tempering(max_iters)
+            return self._anneal(max_iters)
         except Exception as e:
             logger.error(f"❌ خطأ أثناء تحسين الجدول (SA): {e}", exc_info=True)
-            return self.best
+            return self.best, self.stats
+
+    def _anneal(self, max_iters: int) -> Tuple[List[Schedule], Dict[str, Any]]:
+        """سلسلة واحدة بجدول التبريد المختار، مع إعادة تسخين عند الركود"""
+        started = systime.perf_counter()
+        chain = self.chain
+        initial_cost = chain.current_cost
+        initial_temp = origin_temp = chain.temperature = self._initial_temperature()
+        origin_progress = 0.0
+        reheat_after = self.params.get("reheat_after", 5000)
+        max_reheats = self.params.get("max_reheats", 3)
+        history_interval = max(self.BLOCK_SIZE, self.params.get("history_interval", 1000))
+        stats = {
+            "schedule": self.schedule,
+            "best_cost_history": [],
+            "temperature_history": [],
+            "acceptance_history": [],
+            "time_history": [],
+            "reheats": 0,
+            "initial_temperature": initial_temp,
+            "initial_cost": initial_cost,
+            "stop_reason": None
+        }
+        logger.info(
+            f"💡 بدء التحسين ({self.schedule}، T0 = {initial_temp:.2f}): التكلفة الحالية = {initial_cost:.2f}"
+        )
+
+        done = 0
+        last_improvement = 0
+        best_seen = chain.best_cost
+        window_accepted = 0
+        while True:
+            block = self.BLOCK_SIZE if not max_iters else min(self.BLOCK_SIZE, max_iters - done)
+            accepted_before = chain.accepted
+            chain.run(block)
+            done += block
+            acceptance = (chain.accepted - accepted_before) / block
+            window_accepted += chain.accepted - accepted_before
+            elapsed = systime.perf_counter() - started
+
+            if done % history_interval < self.BLOCK_SIZE:
+                stats["best_cost_history"].append(chain.best_cost)
+                stats["temperature_history"].append(chain.temperature)
+                stats["acceptance_history"].append(window_accepted / history_interval)
+                stats["time_history"].append(elapsed)
+                window_accepted = 0
+
+            progress = self._progress(done, elapsed, max_iters)
+            if progress >= 1.0:
+                stats["stop_reason"] = "iterations" if max_iters and done >= max_iters else "time_limit"
+                break
+
+            if chain.best_cost < best_seen:
+                best_seen = chain.best_cost
+                last_improvement = done
+            elif reheat_after and done - last_improvement >= reheat_after and stats["reheats"] < max_reheats:
+                # إعادة تسخين: يبدأ جدول التبريد من جديد للميزانية المتبقية
+                stats["reheats"] += 1
+                origin_temp = chain.temperature = max(self.params.get("reheat_ratio", 0.3) * initial_temp,
+                                                      chain.temperature)
+                origin_progress = progress
+                last_improvement = done
+                logger.debug(f"♨️ إعادة تسخين إلى {origin_temp:.2f} بعد {reheat_after} تكرار دون تحسن")
+                continue
+            chain.temperature = self._next_temperature(chain.temperature, origin_temp, origin_progress,
+                                                       progress, acceptance)
+
+        elapsed = systime.perf_counter() - started
+        self.temperature = chain.temperature
+        stats.update({
+            "iterations": chain.iterations,
+            "accepted": chain.accepted,
+            "acceptance_rate": chain.accepted / chain.iterations if chain.iterations else 0.0,
+            "improved": chain.improved,
+            "best_cost": chain.best_cost,
+            "final_temperature": chain.temperature,
+            "elapsed": elapsed,
+            "iterations_per_minute": chain.iterations / elapsed * 60 if elapsed > 0 else 0.0
+        })
+        self.stats = stats
+        self.best = self.codec.decode(chain.best_genome)
+        logger.info(
+            f"🏁 انتهاء التحسين: أفضل تكلفة = {chain.best_cost:.2f} بعد {chain.iterations} تكرار "
+            f"({stats['iterations_per_minute']:.0f} تكرار/دقيقة، {stats['reheats']} إعادة تسخين)"
+        )
+        return self.best, self.stats
+
+    # ------------------------------------------------------------------
+    # التلدين المتوازي (parallel tempering)
+    # ------------------------------------------------------------------
+    def _ladder(self, count: int, high: float) -> List[float]:
+        """سلّم حرارة هندسي من ladder_min_temp إلى high (درجة الحرارة الابتدائية)"""
+        low = self.params.get("ladder_min_temp", 0.5)
+        high = max(high, low)
+        if count == 1:
+            return [low]
+        return [low * (high / low) ** (k / (count - 1)) for k in range(count)]
+
+    def _create_replicas(self) -> List[AnnealingChain]:
+        """نسخة لكل درجة في السلّم، لكل منها مولد مستقل من بذرة random_seed"""
+        count = self.params.get("replicas", 0) or os.cpu_count() or 1
+        seeds = np.random.SeedSequence(self.params.get("random_seed")).spawn(count)
+        return [
+            AnnealingChain(self.codec, self.evaluator, self.codec.template_genome, self.weights,
+                           random.Random(int(seed.generate_state(1)[0])), temperature)
+            for seed, temperature in zip(seeds, self._ladder(count, self._initial_temperature()))
+        ]
+
+    def _run_replica(self, k: int, iterations: int, temperature: float) -> Tuple[float, float]:
+        """تشغيل النسخة k بدرجة حرارة ثابتة وإرجاع (تكلفتها الحالية، أفضل تكلفة لها)"""
+        replica = self.replicas[k]
+        replica.temperature = temperature
+        replica.run(iterations)
+        return replica.current_cost, replica.best_cost
+
+    def _run_round(self, iterations: int, temperatures: List[float], workers) -> List[Tuple[float, float]]:
+        """جولة بين تبادلين على كل النسخ: تسلسليًا أو عبر عمليات النسخ"""
+        if not workers:
+            return [self._run_replica(k, iterations, t) for k, t in enumerate(temperatures)]
+        for (conn, _), temperature in zip(workers, temperatures):
+            conn.send(("run", (iterations, temperature)))
+        return [self._receive_from_worker(conn) for conn, _ in workers]
+
+    @staticmethod
+    def _receive_from_worker(conn) -> Any:
+        status, payload = conn.recv()
+        if status == "error":
+            raise RuntimeError(f"فشل عملية نسخة التلدين: {payload}")
+        return payload
+
+    def _start_replica_workers(self) -> List[Tuple[Any, Any]]:
+        """تشغيل عملية لكل نسخة متصلة بأنبوب"""
+        ctx = multiprocessing.get_context()
+        workers = []
+        for k in range(len(self.replicas)):
+            parent_conn, child_conn = ctx.Pipe()
+            process = ctx.Process(target=_replica_worker, args=(child_conn, self, k), daemon=True)
+            process.start()
+            child_conn.close()
+            workers.append((parent_conn, process))
+        logger.info(f"🔥 تشغيل {len(self.replicas)} نسخة تلدين في عمليات منفصلة")
+        return workers
+
+    def _stop_replica_workers(self, workers: List[Tuple[Any, Any]]):
+        """إيقاف عمليات النسخ واستعادة حالة كل نسخة"""
+        for k, (conn, process) in enumerate(workers):
+            try:
+                conn.send(("stop", None))
+                for key, value in self._receive_from_worker(conn).items():
+                    setattr(self.replicas[k], key, value)
+            except (EOFError, OSError, RuntimeError) as e:
+                logger.error(f"❌ تعذر استعادة حالة نسخة التلدين {k}: {e}")
+            finally:
+                conn.close()
+                process.join(timeout=5)
+
+    def _exchange(self, temperatures: List[float], costs: List[float], phase: int) -> Tuple[int, int]:
+        """
+        تبادل درجات الحرارة بين النسخ المتجاورة في السلّم (الأزواج الزوجية أو الفردية بالتناوب)
+        بقبول Metropolis: min(1, exp((1/Ti - 1/Tj)(Ei - Ej))). تُرجع (المحاولات، المقبولة).
+        """
+        ladder = sorted(range(len(temperatures)), key=temperatures.__getitem__)
+        attempts = swaps = 0
+        for pos in range(phase, len(ladder) - 1, 2):
+            a, b = ladder[pos], ladder[pos + 1]
+            exponent = (1 / temperatures[a] - 1 / temperatures[b]) * (costs[a] - costs[b])
+            attempts += 1
+            if exponent >= 0 or self.rng.random() < math.exp(exponent):
+                temperatures[a], temperatures[b] = temperatures[b], temperatures[a]
+                swaps += 1
+        return attempts, swaps
+
+    def _parallel_tempering(self, max_iters: int) -> Tuple[List[Schedule], Dict[str, Any]]:
+        """K نسخة بدرجات حرارة ثابتة على سلّم هندسي، تبادل دوري للدرجات، وإرجاع أفضل حل عام"""
+        started = systime.perf_counter()
+        self.replicas = self._create_replicas()
+        temperatures = [replica.temperature for replica in self.replicas]
+        interval = max(1, self.params.get("exchange_interval", 500))
+        initial_cost = self.replicas[0].current_cost
+        logger.info(
+            f"💡 بدء التلدين المتوازي بـ {len(self.replicas)} نسخة "
+            f"({temperatures[0]:.2f} ← {temperatures[-1]:.2f}): التكلفة الحالية = {initial_cost:.2f}"
+        )
+
+        workers = []
+        if self.params.get("parallel_replicas", True) and len(self.replicas) > 1:
+            try:
+                workers = self._start_replica_workers()
+            except Exception as e:
+                logger.warning(f"⚠️ تعذر تشغيل عمليات النسخ، التنفيذ تسلسليًا: {e}")
+                workers = []
+        attempts = swaps = 0
+        stats = {"best_cost_history": [], "time_history": [], "stop_reason": None}
+        try:
+            done = 0
+            phase = 0
+            while True:
+                iterations = interval if not max_iters else min(interval, max_iters - done)
+                results = self._run_round(iterations, temperatures, workers)
+                done += iterations
+                round_attempts, round_swaps = self._exchange(temperatures, [cost for cost, _ in results], phase)
+                attempts += round_attempts
+                swaps += round_swaps
+                phase ^= 1
+                elapsed = systime.perf_counter() - started
+                stats["best_cost_history"].append(min(best_cost for _, best_cost in results))
+                stats["time_history"].append(elapsed)
+                if self._progress(done, elapsed, max_iters) >= 1.0:
+                    stats["stop_reason"] = "iterations" if max_iters and done >= max_iters else "time_limit"
+                    break
+        finally:
+            if workers:
+                self._stop_replica_workers(workers)
+
+        best = min(self.replicas, key=lambda replica: replica.best_cost)
+        elapsed = systime.perf_counter() - started
+        total_iterations = sum(replica.iterations for replica in self.replicas)
+        accepted = sum(replica.accepted for replica in self.replicas)
+        stats.update({
+            "iterations": total_iterations,
+            "replicas": len(self.replicas),
+            "temperatures": sorted(temperatures),
+            "accepted": accepted,
+            "acceptance_rate": accepted / total_iterations if total_iterations else 0.0,
+            "improved": sum(replica.improved for replica in self.replicas),
+            "swap_attempts": attempts,
+            "swaps": swaps,
+            "swap_rate": swaps / attempts if attempts else 0.0,
+            "initial_cost": initial_cost,
+            "best_cost": best.best_cost,
+            "replica_best_costs": [replica.best_cost for replica in self.replicas],
+            "elapsed": elapsed,
+            "iterations_per_minute": total_iterations / elapsed * 60 if elapsed > 0 else 0.0
+        })
+        self.stats = stats
+        self.best = self.codec.decode(best.best_genome)
+        logger.info(
+            f"🏁 انتهاء التلدين المتوازي: أفضل تكلفة = {best.best_cost:.2f}، "
+            f"نسبة قبول التبادل {self.stats['swap_rate']:.0%}"
+        )
+        return self.best, self.stats
+
 
+def _replica_worker(conn, optimizer: SoftConstraintsOptimizer, k: int):
+    """عملية نسخة تلدين: تنفذ الجولات المطلوبة عبر الأنبوب وتعيد تكلفتها"""
+    try:
+        while True:
+            command, payload = conn.recv()
+            if command == "stop":
+                conn.send(("ok", optimizer.replicas[k].summary()))
+                break
+            try:
+                iterations, temperature = payload
+                conn.send(("ok", optimizer._run_replica(k, iterations, temperature)))
+            except Exception as e:
+                logger.error(f"❌ خطأ في عملية نسخة التلدين {k}: {e}", exc_info=True)
+                conn.send(("error", str(e)))
+    except EOFError:
+        pass
+    finally:
+        conn.close()
@@ -6,8 +6,19 @@ from datetime import time
 
 logger = logging.getLogger(__name__)
 
+
+def _day_value(day) -> int:
+    """قيمة اليوم كعدد صحيح سواء كان DayOfWeek أو int"""
+    return day.value if hasattr(day, 'value') else int(day)
+
+
 class SoftConstraintsValidator:
-    """محقق القيود المرنة مع دعم الأوزان المخصصة"""
+    """
+    محقق القيود المرنة مع دعم الأوزان المخصصة.
+    كل العقوبات تُحسب في مرور واحد: الجلسات توزَّع مرة واحدة في سلال (المورد، اليوم) بمفاتيح صحيحة
+    (دقيقة البداية، ترتيب الإدخال)، وتُرتب كل سلة مرة واحدة، ثم تُفحص الأزواج المتجاورة فيها.
+    هذا يطابق الترتيب حسب بداية الأسبوع لكل مورد، لأن الجلسات في أيام مختلفة لا تتداخل ولا تُحسب بينها فجوة.
+    """
     
     def __init__(self, config: Config):
         self.config = config
@@ -15,149 +26,159 @@ class SoftConstraintsValidator:
     def penalty(self, schedules: List[Schedule]) -> Dict[str, float]:
         """حساب العقوبات المرجحة لجميع القيود المرنة"""
         penalties = defaultdict(float)
-        
-        # القيود الأساسية
-        penalties["room_conflict"] = self.room_conflict_penalty(schedules)
-        penalties["instructor_conflict"] = self.instructor_conflict_penalty(schedules)
-        penalties["group_conflict"] = self.group_conflict_penalty(schedules)
-        
-        # القيود المرنة
-        penalties["facility_mismatch"] = self.facility_mismatch_penalty(schedules)
-        penalties["time_preference"] = self.time_preference_penalty(schedules)
-        penalties["minimize_gaps"] = self.minimize_gaps_penalty(schedules)
-        penalties["balance_room_usage"] = self.balance_room_usage_penalty(schedules)
-        penalties["instructor_preference"] = self.instructor_preference_penalty(schedules)
-        penalties["merge_bonus"] = -self.merge_bonus(schedules)  # مكافأة
-        
+        penalties.update(self._sweep(schedules))
         return penalties
 
+    def _sweep(self, schedules: List[Schedule]) -> Dict[str, float]:
+        """حساب كل العقوبات في مرور واحد على الجلسات ثم على سلال (المورد، اليوم)"""
+        room_buckets = defaultdict(list)
+        instructor_buckets = defaultdict(list)
+        group_buckets = defaultdict(list)
+        room_usage = defaultdict(int)
+        merged_courses = defaultdict(list)
+        preferred_days = {}
+        day_values = {}
+        facility = 0
+        time_preference = 0
+        instructor_preference = 0
+        unfavorable_start = time(8, 0)  # أول الصباح
+        unfavorable_end = time(16, 0)   # نهاية اليوم
+
+        for i, s in enumerate(schedules):
+            slot = s.time_slot
+            start_time = slot.start_time
+            end_time = slot.end_time
+            start = start_time.hour * 60 + start_time.minute
+            end = end_time.hour * 60 + end_time.minute
+            day = day_values.get(slot.day)
+            if day is None:
+                day = day_values[slot.day] = _day_value(slot.day)
+            # (البداية، ترتيب الإدخال) أولاً حتى يطابق الترتيب الفرز المستقر حسب بداية الأسبوع
+            entry = (start, i, end, slot.day, "_sub" in s.course_id)
+            room_buckets[(s.room_id, day)].append(entry)
+            instructor_buckets[(s.instructor_id, day)].append(entry)
+            group_buckets[(s.group_id, day)].append(entry)
+            room_usage[s.room_id] += end - start
+
+            course = s.assigned_course
+            if course.required_facilities:
+                for required in course.required_facilities:
+                    if required not in s.assigned_room.facilities:
+                        facility += 1
+
+            if start_time <= unfavorable_start or start_time >= unfavorable_end:
+                time_preference += 1
+
+            instructor = s.assigned_instructor
+            if instructor.preferred_days:
+                days = preferred_days.get(id(instructor))
+                if days is None:
+                    days = preferred_days[id(instructor)] = {_day_value(d) for d in instructor.preferred_days}
+                if day not in days:
+                    instructor_preference += 1
+            if instructor.preferred_slots:
+                slot_matched = any(
+                    _day_value(pref.day) == day and pref.start_time <= start_time <= pref.end_time
+                    for pref in instructor.preferred_slots
+                )
+                if not slot_matched:
+                    instructor_preference += 1
+
+            if course.can_merge:
+                merged_courses[(course.id, slot)].append(s)
+
+        room_conflicts = self._adjacent_overlaps(room_buckets)
+        instructor_conflicts = self._adjacent_overlaps(instructor_buckets)
+        group_conflicts = 0
+        gaps = 0
+        for sessions in group_buckets.values():
+            if len(sessions) < 2:
+                continue
+            sessions.sort()
+            prev_start, _, prev_end, prev_day, prev_sub = sessions[0]
+            for start, _, end, day, sub in sessions[1:]:
+                if prev_day == day:
+                    # السماح للفروع فقط بالتداخل
+                    if not (prev_end <= start or end <= prev_start) and not (prev_sub and sub):
+                        group_conflicts += 1
+                    gap = start - prev_end
+                    if gap > 60:  # أكثر من ساعة
+                        gaps += (gap - 60) / 30  # 0.5 لكل 30 دقيقة إضافية
+                prev_start, prev_end, prev_day, prev_sub = start, end, day, sub
+
+        imbalance = 0
+        if room_usage:
+            avg_usage = sum(room_usage.values()) / len(room_usage)
+            imbalance = sum(abs(usage - avg_usage) for usage in room_usage.values()) / 100  # تطبيع القيمة
+
+        bonus = 0
+        for sessions in merged_courses.values():
+            if len(sessions) > 1:
+                bonus += len(sessions)
+                # مكافأة إضافية لدمج تخصصات مختلفة
+                if len({s.assigned_group.major for s in sessions}) > 1:
+                    bonus += 2
+
+        return {
+            "room_conflict": room_conflicts * 100,  # وزن ثقيل
+            "instructor_conflict": instructor_conflicts * 200,
+            "group_conflict": group_conflicts * 150,
+            "facility_mismatch": facility,
+            "time_preference": time_preference,
+            "minimize_gaps": gaps,
+            "balance_room_usage": imbalance,
+            "instructor_preference": instructor_preference,
+            "merge_bonus": -bonus  # مكافأة
+        }
+
+    @staticmethod
+    def _adjacent_overlaps(buckets: Dict) -> int:
+        """عدد الأزواج المتجاورة المتداخلة في كل سلة (مورد، يوم) بعد ترتيبها"""
+        count = 0
+        for sessions in buckets.values():
+            if len(sessions) < 2:
+                continue
+            sessions.sort()
+            prev_start, _, prev_end, prev_day, _ = sessions[0]
+            for start, _, end, day, _ in sessions[1:]:
+                if prev_day == day and not (prev_end <= start or end <= prev_start):
+                    count += 1
+                prev_start, prev_end, prev_day = start, end, day
+        return count
+
+    # عروض مفردة لكل قيد للتشخيص فقط: كل استدعاء يعيد المرور الكامل، فالتقييم يكون عبر penalty() وحدها
     def room_conflict_penalty(self, schedules: List[Schedule]) -> float:
         """عقوبة تعارض استخدام القاعة"""
-        room_sessions = defaultdict(list)
-        for s in schedules:
-            room_sessions[s.room_id].append(s)
-        
-        penalty = 0
-        for room_id, sessions in room_sessions.items():
-            sessions.sort(key=lambda s: s.time_slot.start_minutes)
-            for i in range(1, len(sessions)):
-                if sessions[i-1].time_slot.overlaps(sessions[i].time_slot):
-                    penalty += 1
-        return penalty * 100  # وزن ثقيل
+        return self._sweep(schedules)["room_conflict"]
 
     def instructor_conflict_penalty(self, schedules: List[Schedule]) -> float:
         """عقوبة تعارض المدرسين"""
-        instructor_sessions = defaultdict(list)
-        for s in schedules:
-            instructor_sessions[s.instructor_id].append(s)
-        
-        penalty = 0
-        for instructor_id, sessions in instructor_sessions.items():
-            sessions.sort(key=lambda s: s.time_slot.start_minutes)
-            for i in range(1, len(sessions)):
-                if sessions[i-1].time_slot.overlaps(sessions[i].time_slot):
-                    penalty += 1
-        return penalty * 200  # وزن ثقيل
+        return self._sweep(schedules)["instructor_conflict"]
 
     def group_conflict_penalty(self, schedules: List[Schedule]) -> float:
         """عقوبة تعارض المجموعات (عدا الفروع)"""
-        group_sessions = defaultdict(list)
-        for s in schedules:
-            group_sessions[s.group_id].append(s)
-        
-        penalty = 0
-        for group_id, sessions in group_sessions.items():
-            sessions.sort(key=lambda s: s.time_slot.start_minutes)
-            for i in range(1, len(sessions)):
-                if sessions[i-1].time_slot.overlaps(sessions[i].time_slot):
-                    # السماح للفروع فقط بالتداخل
-                    if "_sub" not in sessions[i-1].course_id or "_sub" not in sessions[i].course_id:
-                        penalty += 1
-        return penalty * 150  # وزن ثقيل
+        return self._sweep(schedules)["group_conflict"]
 
     def facility_mismatch_penalty(self, schedules: List[Schedule]) -> float:
         """عقوبة عدم توافق مرافق القاعة مع متطلبات المادة"""
-        penalty = 0
-        for s in schedules:
-            if s.assigned_course.required_facilities:
-                for facility in s.assigned_course.required_facilities:
-                    if facility not in s.assigned_room.facilities:
-                        penalty += 1
-        return penalty
+        return self._sweep(schedules)["facility_mismatch"]
 
     def time_preference_penalty(self, schedules: List[Schedule]) -> float:
         """عقوبة الجدولة في أوقات غير مفضلة"""
-        penalty = 0
-        unfavorable_start = time(8, 0)  # أول الصباح
-        unfavorable_end = time(16, 0)   # نهاية اليوم
-        
-        for s in schedules:
-            start = s.time_slot.start_time
-            if start <= unfavorable_start or start >= unfavorable_end:
-                penalty += 1
-        return penalty
+        return self._sweep(schedules)["time_preference"]
 
     def minimize_gaps_penalty(self, schedules: List[Schedule]) -> float:
         """عقوبة وجود فجوات كبيرة بين محاضرات المجموعة"""
-        group_sessions = defaultdict(list)
-        for s in schedules:
-            group_sessions[s.group_id].append(s)
-        
-        penalty = 0
-        for group_id, sessions in group_sessions.items():
-            sessions.sort(key=lambda s: s.time_slot.start_minutes)
-            for i in range(1, len(sessions)):
-                if sessions[i-1].time_slot.day == sessions[i].time_slot.day:
-                    gap = sessions[i].time_slot.start_minutes - sessions[i-1].time_slot.end_minutes
-                    if gap > 60:  # أكثر من ساعة
-                        penalty += (gap - 60) / 30  # 0.5 لكل 30 دقيقة إضافية
-        return penalty
+        return self._sweep(schedules)["minimize_gaps"]
 
     def balance_room_usage_penalty(self, schedules: List[Schedule]) -> float:
         """عقوبة عدم توازن استخدام القاعات"""
-        room_usage = defaultdict(int)
-        for s in schedules:
-            room_usage[s.room_id] += s.time_slot.duration
-        
-        if not room_usage:
-            return 0
-        
-        avg_usage = sum(room_usage.values()) / len(room_usage)
-        imbalance = sum(abs(usage - avg_usage) for usage in room_usage.values())
-        return imbalance / 100  # تطبيع القيمة
+        return self._sweep(schedules)["balance_room_usage"]
 
     def instructor_preference_penalty(self, schedules: List[Schedule]) -> float:
         """عقوبة مخالفة تفضيلات المدرسين"""
-        penalty = 0
-        for s in schedules:
-            instructor = s.assigned_instructor
-            if instructor.preferred_days and s.time_slot.day not in instructor.preferred_days:
-                penalty += 1
-            if instructor.preferred_slots:
-                slot_matched = any(
-                    slot.day == s.time_slot.day and
-                    slot.start_time <= s.time_slot.start_time <= slot.end_time
-                    for slot in instructor.preferred_slots
-                )
-                if not slot_matched:
-                    penalty += 1
-        return penalty
+        return self._sweep(schedules)["instructor_preference"]
 
     def merge_bonus(self, schedules: List[Schedule]) -> float:
         """مكافأة دمج المجموعات في قاعات كبيرة"""
-        merged_courses = defaultdict(list)
-        bonus = 0
-        
-        for s in schedules:
-            if s.assigned_course.can_merge:
-                key = (s.assigned_course.id, s.time_slot)
-                merged_courses[key].append(s)
-        
-        for (course_id, slot), sessions in merged_courses.items():
-            if len(sessions) > 1:
-                bonus += len(sessions)
-                # مكافأة إضافية لدمج تخصصات مختلفة
-                groups = {s.assigned_group.major for s in sessions}
-                if len(groups) > 1:
-                    bonus += 2
-        return bonus
\ No newline at end of file
+        return -self._sweep(schedules)["merge_bonus"]
@@ -0,0 +1,171 @@
+import logging
+import random
+import time as systime
+from typing import Any, Dict, List, Optional, Tuple
+
+from model import Schedule
+from algorithm.genome import GenomeCodec, GenomeEvaluator, START, ROOM, INSTRUCTOR
+from algorithm.delta_evaluator import DeltaEvaluator
+from algorithm import moves
+from algorithm.moves import Move
+
+logger = logging.getLogger(__name__)
+
+# خصائص الجلسة التي يمكن أن تغيّرها الحركة (مفتاح قائمة المحظورات مع فهرس الجلسة)
+ATTRIBUTES = ((START, "time"), (ROOM, "room"), (INSTRUCTOR, "instructor"))
+
+
+class TabuSearchOptimizer:
+    """
+    البحث المحظور (tabu search) على نفس حركات الجوار والتقييم التزايدي المستخدمين في SA والخوارزمية الجينية:
+    في كل تكرار تُقيَّم عينة من الحركات المرشحة ويُطبَّق أفضلها غير المحظور (حتى لو زادت التكلفة)،
+    والخاصية التي غيّرتها الحركة (الجلسة، الوقت/القاعة) تُحظر لعدد من التكرارات، إلا إذا حققت الحركة
+    أفضل تكلفة حتى الآن (معيار الطموح).
+    """
+
+    # حركات الجوار: تعديل جلسة واحدة أو تبادل وقتي جلستين، مع أوزانها النسبية بنفس الترتيب
+    SINGLE_MOVES = [moves.time_shift, moves.room_swap, moves.day_rotation]
+    MOVE_WEIGHTS = [0.3, 0.25, 0.2, 0.25]
+
+    def __init__(self, schedules: List[Schedule], config):
+        """
+        schedules: الجدول المبدئي (Schedule objects).
+        config: يحتوي على أوزان العقوبات (ga_params["penalty_weights"]) وخيارات البحث (config.tabu_params).
+        """
+        self.config = config
+        self.params = getattr(config, "tabu_params", {})
+        self.codec = GenomeCodec(schedules, config)
+        self.evaluator = GenomeEvaluator(self.codec)
+        self.engine = DeltaEvaluator(self.evaluator, self.codec.template_genome,
+                                     config.ga_params.get("penalty_weights", {}))
+        self.rng = random.Random(self.params.get("random_seed"))
+        self.best = list(schedules)
+        self.stats: Dict[str, Any] = {}
+        self.tenure = self.params.get("tenure", 10)
+        self.tenure_jitter = self.params.get("tenure_jitter", 5)
+        self.candidates = max(1, self.params.get("candidates", 50))
+        self.time_limit = self.params.get("time_limit")
+        # (الجلسة، الخاصية) ← آخر تكرار تبقى فيه محظورة
+        self.tabu_until: Dict[Tuple[int, str], int] = {}
+
+    def _candidate(self) -> Move:
+        """حركة مرشحة عشوائية"""
+        genome = self.engine.genome
+        choice = self.rng.choices(range(4), weights=self.MOVE_WEIGHTS, k=1)[0]
+        if choice == 3:
+            a, b = self.rng.sample(range(self.codec.n_sessions), 2)
+            return moves.swap_times(self.codec, genome, a, b)
+        idx = self.rng.randrange(self.codec.n_sessions)
+        return self.SINGLE_MOVES[choice](self.codec, genome, idx, self.rng)
+
+    def _attributes(self, move: Move) -> List[Tuple[int, str]]:
+        """مفاتيح (الجلسة، الخاصية) التي تغيّرها الحركة فعليًا"""
+        genome = self.engine.genome
+        return [(idx, name) for idx, *values in move
+                for column, name in ATTRIBUTES if values[column] != genome[idx, column]]
+
+    def _is_tabu(self, attributes: List[Tuple[int, str]], iteration: int) -> bool:
+        return any(self.tabu_until.get(key, -1) >= iteration for key in attributes)
+
+    def optimize(self, max_iters: Optional[int] = None) -> Tuple[List[Schedule], Dict[str, Any]]:
+        """
+        تشغيل البحث حتى نفاد التكرارات (iterations، 0 = بلا حد) أو الوقت (time_limit بالثواني)
+        أو مرور stagnation_iterations تكرار دون تحسن. يُرجع (أفضل جدول، الإحصائيات).
+        """
+        if max_iters is None:
+            max_iters = self.params.get("iterations", 5000)
+        if not max_iters and not self.time_limit:
+            logger.warning("⚠️ لا ميزانية تكرارات ولا ميزانية زمنية للبحث المحظور، سيُستخدم 5000 تكرار")
+            max_iters = 5000
+        try:
+            if self.codec.n_sessions < 2:
+                return self.best, self.stats
+            return self._search(max_iters)
+        except Exception as e:
+            logger.error(f"❌ خطأ أثناء البحث المحظور: {e}", exc_info=True)
+            return self.best, self.stats
+
+    def _search(self, max_iters: int) -> Tuple[List[Schedule], Dict[str, Any]]:
+        started = systime.perf_counter()
+        engine = self.engine
+        current_cost = initial_cost = engine.cost()
+        best_cost = current_cost
+        best_genome = engine.genome.copy()
+        stagnation_limit = self.params.get("stagnation_iterations", 0)
+        history_interval = max(1, self.params.get("history_interval", 100))
+        stats = {
+            "best_cost_history": [],
+            "current_cost_history": [],
+            "time_history": [],
+            "evaluations": 0,
+            "aspirations": 0,
+            "tabu_rejections": 0,
+            "improved": 0,
+            "initial_cost": initial_cost,
+            "stop_reason": None
+        }
+        logger.info(f"💡 بدء البحث المحظور: التكلفة الحالية = {current_cost:.2f}")
+
+        iteration = 0
+        last_improvement = 0
+        while True:
+            iteration += 1
+            chosen, chosen_delta, chosen_attributes = None, None, None
+            for _ in range(self.candidates):
+                move = self._candidate()
+                if not move:
+                    continue
+                attributes = self._attributes(move)
+                if not attributes:
+                    continue
+                delta = engine.delta(move)
+                stats["evaluations"] += 1
+                if chosen_delta is not None and delta >= chosen_delta:
+                    continue
+                if self._is_tabu(attributes, iteration):
+                    # معيار الطموح: الحركة المحظورة مقبولة إذا أعطت أفضل تكلفة حتى الآن
+                    if current_cost + delta >= best_cost:
+                        stats["tabu_rejections"] += 1
+                        continue
+                    stats["aspirations"] += 1
+                chosen, chosen_delta, chosen_attributes = move, delta, attributes
+
+            if chosen is not None:
+                engine.apply(chosen)
+                current_cost = engine.cost()
+                for key in chosen_attributes:
+                    self.tabu_until[key] = iteration + self.tenure + self.rng.randint(0, self.tenure_jitter)
+                if current_cost < best_cost:
+                    best_cost = current_cost
+                    best_genome = engine.genome.copy()
+                    last_improvement = iteration
+                    stats["improved"] += 1
+
+            elapsed = systime.perf_counter() - started
+            if iteration % history_interval == 0:
+                stats["best_cost_history"].append(best_cost)
+                stats["current_cost_history"].append(current_cost)
+                stats["time_history"].append(elapsed)
+            if max_iters and iteration >= max_iters:
+                stats["stop_reason"] = "iterations"
+            elif self.time_limit and elapsed >= self.time_limit:
+                stats["stop_reason"] = "time_limit"
+            elif stagnation_limit and iteration - last_improvement >= stagnation_limit:
+                stats["stop_reason"] = "stagnation"
+            if stats["stop_reason"]:
+                break
+
+        elapsed = systime.perf_counter() - started
+        stats.update({
+            "iterations": iteration,
+            "best_cost": best_cost,
+            "elapsed": elapsed,
+            "iterations_per_minute": iteration / elapsed * 60 if elapsed > 0 else 0.0
+        })
+        self.stats = stats
+        self.best = self.codec.decode(best_genome)
+        logger.info(
+            f"🏁 انتهاء البحث المحظور: أفضل تكلفة = {best_cost:.2f} بعد {iteration} تكرار "
+            f"({stats['evaluations']} تقييم، {stats['aspirations']} طموح)"
+        )
+        return self.best, self.stats
@@ -0,0 +1,74 @@
+"""
+قياس زمن المعالجة المسبقة وذروة الذاكرة في CPSatScheduler.
+
+التشغيل من جذر المشروع:
+    python -m benchmarks.cp_preprocessing --courses 5000
+"""
+import argparse
+import logging
+import time as systime
+import tracemalloc
+
+from model import Config, Course, Room, Group, Instructor
+from algorithm.cp_algorithm import CPSatScheduler
+
+
+def make_dataset(n_courses: int, courses_per_group: int = 6):
+    """بيانات اصطناعية: مجموعات أكبر من سعة المعامل حتى تُقسَّم المواد العملية إلى أقسام"""
+    n_groups = max(1, n_courses // courses_per_group)
+    rooms = [Room(id=f"H{i}", name=f"H{i}", type="نظرية", capacity=60, facilities=["بروجكتر"])
+             for i in range(max(4, n_groups // 4))]
+    rooms += [Room(id=f"L{i}", name=f"L{i}", type="عملي", capacity=20, facilities=["حواسيب"])
+              for i in range(max(2, n_groups // 6))]
+    instructors = [Instructor(id=f"I{i}", name=f"I{i}", expertise=["نظرية", "عملي"])
+                   for i in range(max(2, n_groups))]
+    groups = [Group(id=f"G{i}", major="m", level=1, student_count=45) for i in range(n_groups)]
+    courses = []
+    for g_idx, g in enumerate(groups):
+        for k in range(courses_per_group):
+            course_type = "عملي" if k == courses_per_group - 1 else "نظرية"
+            courses.append(Course(
+                id=f"C{g_idx}_{k}", name=f"C{g_idx}_{k}", course_type=course_type, duration=90,
+                instructor_id=f"I{(g_idx + k) % len(instructors)}", group_id=g.id,
+                required_facilities=["حواسيب"] if course_type == "عملي" else []
+            ))
+    return courses, rooms, groups, instructors
+
+
+def measure(label: str, func):
+    """تنفيذ func مع قياس الزمن وذروة الذاكرة المخصصة أثناءه"""
+    tracemalloc.start()
+    started = systime.perf_counter()
+    result = func()
+    elapsed = systime.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<16} {elapsed:8.3f} s   peak {peak / 1024 / 1024:8.1f} MiB")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--courses", type=int, default=5000)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    courses, rooms, groups, instructors = make_dataset(args.courses)
+    print(f"{len(courses)} مادة، {len(groups)} مجموعة، {len(rooms)} قاعة، {len(instructors)} مدرس")
+
+    scheduler = CPSatScheduler(Config())
+
+    def preprocess():
+        scheduler._reset_model()
+        scheduler.rooms = list(rooms)
+        scheduler.groups = {g.id: g for g in groups}
+        scheduler.instructors = list(instructors)
+        return scheduler._preprocess_courses(courses)
+
+    processed = measure("preprocessing", preprocess)
+    print(f"{len(processed)} مادة بعد التقسيم")
+    measure("model build", lambda: scheduler._build_model(courses, rooms, groups, instructors))
+
+
+if __name__ == "__main__":
+    main()
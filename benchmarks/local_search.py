@@ -0,0 +1,56 @@
+"""
+مقارنة محركي البحث المحلي (التلدين المحاكى والبحث المحظور) بنفس الميزانية الزمنية ونفس الجدول الأولي.
+
+التشغيل من جذر المشروع:
+    python -m benchmarks.local_search --courses 60 --time-limit 10 --seeds 3
+"""
+import argparse
+import logging
+
+from model import Config
+from algorithm.cp_algorithm import CPSatScheduler
+from algorithm.soft_constraints_handler import SoftConstraintsOptimizer
+from algorithm.tabu_search import TabuSearchOptimizer
+from benchmarks.cp_preprocessing import make_dataset
+
+ENGINES = {
+    "sa": (SoftConstraintsOptimizer, "sa_params"),
+    "tabu": (TabuSearchOptimizer, "tabu_params"),
+}
+
+
+def run_engine(name: str, initial, config: Config, seed: int, time_limit: float):
+    """تشغيل محرك واحد حتى نفاد الميزانية الزمنية وإرجاع إحصائياته"""
+    optimizer_cls, params_attr = ENGINES[name]
+    getattr(config, params_attr).update(iterations=0, time_limit=time_limit, random_seed=seed)
+    _, stats = optimizer_cls(initial, config).optimize()
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--courses", type=int, default=60, help="عدد المقررات (60 يُحل ضمن مهلة CP-SAT الافتراضية)")
+    parser.add_argument("--time-limit", type=float, default=10.0, help="الميزانية الزمنية لكل تشغيل (ثوانٍ)")
+    parser.add_argument("--seeds", type=int, default=3)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    courses, rooms, groups, instructors = make_dataset(args.courses)
+    config = Config(rooms=rooms, instructors=instructors, groups=groups, courses=courses)
+    config.cp_params["log_search_progress"] = False
+    initial = CPSatScheduler(config).generate_schedule(courses, rooms, groups, instructors)
+    if not initial:
+        print("تعذر إيجاد جدول أولي بـ CP-SAT")
+        return
+    print(f"{len(initial)} جلسة، ميزانية {args.time_limit:.1f} ث لكل تشغيل")
+
+    print(f"{'engine':<6} {'seed':>4} {'initial':>12} {'best':>12} {'iterations':>11} {'it/min':>11}")
+    for seed in range(args.seeds):
+        for name in ENGINES:
+            stats = run_engine(name, initial, config, seed, args.time_limit)
+            print(f"{name:<6} {seed:>4} {stats['initial_cost']:>12.2f} {stats['best_cost']:>12.2f} "
+                  f"{stats['iterations']:>11} {stats['iterations_per_minute']:>11.0f}")
+
+
+if __name__ == "__main__":
+    main()
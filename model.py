@@ -86,6 +86,9 @@ class Config:
     daily_start_time: time = time(8, 0)
     daily_end_time: time = time(16, 0)
     min_break_between_classes: int = 15
+    # شبكة الزمن: بناء نطاقات بدء المحاضرات مباشرة على فترات العمل بدقة ثابتة (بالدقائق)
+    use_time_grid: bool = True
+    time_grid_minutes: int = 15
     penalty_weights: Dict[str, float] = field(default_factory=lambda: {
         "facility": 50, "pref_day": 20, "pref_day_violation": 10,
         "pref_group": 30, "merge_bonus": 50, "merge_violation": 30,
@@ -103,6 +106,21 @@ class Config:
         "crossover_rate": 0.85,
         "mutation_rate": 0.15,
         "elitism_count": 5,
+        # نموذج الجزر: الهجرة كل migration_interval جيل، وكل جزيرة في عملية مستقلة عند تفعيل parallel_islands
+        "island_count": 4,
+        "migration_rate": 0.1,
+        "migration_interval": 5,
+        "parallel_islands": False,
+        "random_seed": None,  # None = بذرة عشوائية
+        "fitness_cache_size": 50000,  # أقصى عدد لقيم اللياقة المخزنة (LRU)
+        "conflict_bias": 0.8,  # احتمال اختيار جلسة الطفرة حسب مساهمتها في العقوبة بدل الاختيار العشوائي
+        # شروط التوقف: الميزانية الزمنية (ثوانٍ)، اللياقة المستهدفة، عدد الأجيال دون تحسن (0 = معطل)
+        "time_limit": None,
+        "target_fitness": None,
+        "stagnation_generations": 10,
+        # نقاط الحفظ للتشغيلات الطويلة (None = معطل)
+        "checkpoint_path": None,
+        "checkpoint_interval": 10,
         "penalty_weights": {
             "room_conflict": 10000,
             "instructor_conflict": 20000,
@@ -111,6 +129,66 @@ class Config:
             "time_preference": 30
         }
     })
+    sa_params: Dict[str, Any] = field(default_factory=lambda: {
+        # التلدين المحاكى: جدول التبريد (geometric / lundy_mees / adaptive) يصل إلى min_temp عند نفاد
+        # ميزانية التكرارات (iterations، 0 = بلا حد) أو الوقت (time_limit بالثواني، None = بلا حد)
+        "schedule": "geometric",
+        "iterations": 50000,
+        "time_limit": None,
+        "min_temp": 1e-3,
+        # درجة الحرارة الابتدائية (None = معايرة من عينة حركات بحيث يُقبل متوسط الحركة الصاعدة باحتمال initial_acceptance)
+        "start_temp": None,
+        "initial_acceptance": 0.8,
+        "calibration_samples": 200,
+        # الجدول التكيفي: نسبة القبول المستهدفة تتناقص من initial_acceptance إلى final_acceptance
+        "final_acceptance": 0.01,
+        "adaptive_step": 0.05,
+        # إعادة التسخين إلى reheat_ratio × درجة الحرارة الابتدائية بعد reheat_after تكرار دون تحسن (0 = معطل)
+        "reheat_after": 5000,
+        "reheat_ratio": 0.3,
+        "max_reheats": 3,
+        "history_interval": 1000,
+        "random_seed": None,  # None = بذرة عشوائية
+        # التلدين المتوازي: نسخ بدرجات ثابتة على سلّم هندسي من ladder_min_temp إلى start_temp،
+        # تتبادل درجاتها كل exchange_interval تكرار (replicas = 0 يعني عدد الأنوية المتاحة)
+        "parallel_tempering": False,
+        "replicas": 0,
+        "ladder_min_temp": 0.5,
+        "exchange_interval": 500,
+        "parallel_replicas": True  # كل نسخة في عملية مستقلة
+    })
+    tabu_params: Dict[str, Any] = field(default_factory=lambda: {
+        # البحث المحظور: ميزانية التكرارات (0 = بلا حد) أو الوقت (ثوانٍ) أو تكرارات دون تحسن (0 = معطل)
+        "iterations": 5000,
+        "time_limit": None,
+        "stagnation_iterations": 0,
+        # عدد الحركات المرشحة المقيَّمة في كل تكرار، ومدة الحظر (tenure + عدد عشوائي حتى tenure_jitter)
+        "candidates": 50,
+        "tenure": 10,
+        "tenure_jitter": 5,
+        "history_interval": 100,
+        "random_seed": None  # None = بذرة عشوائية
+    })
+    cp_params: Dict[str, Any] = field(default_factory=lambda: {
+        # feasibility: أول جدول صالح | optimize: تحسين القيود المرنة ضمن الحد الزمني (بديل للخوارزمية الجينية)
+        "mode": "feasibility",
+        # ملف إعدادات المحلّل (في وضع التحسين يعيد المحلّل أفضل حل عند انتهاء الوقت)
+        "time_limit": 60.0,
+        "num_workers": 8,  # 0 = كل الأنوية المتاحة
+        "relative_gap": 0.0,
+        "random_seed": 0,
+        "stop_after_first_solution": False,
+        "log_search_progress": True,
+        # تقسيم النموذج إلى مكونات مستقلة (أقسام لا تتشارك مجموعات أو مدرسين أو قاعات)
+        "decompose_components": True,
+        "max_parallel_components": 0,  # 0 = عدد الأنوية المتاحة
+        # توليد سكان أوليين متنوعين للخوارزمية الجينية
+        "population_time_limit": 30.0,
+        "population_min_diversity": 0.05,
+        # استخراج نواة عدم الإمكانية (الحد الأدنى من القيود المتعارضة)
+        "diagnosis_time_limit": 20.0,
+        "diagnosis_minimize": True
+    })
 
     def __post_init__(self):
         # تعيين الأوزان الافتراضية إذا لم يتم توفيرها
@@ -339,6 +417,46 @@ class ScheduledClass:
             "penalty": self.penalty_score
         }
 
+@dataclass
+class InfeasibilityConflict:
+    """
+    One constraint (guarded by an assumption literal) taking part in an infeasibility core.
+    """
+    family: str  # room | instructor | group | time | rotation | precedence
+    description: str
+    course_ids: List[str] = field(default_factory=list)
+    room_ids: List[str] = field(default_factory=list)
+    instructor_ids: List[str] = field(default_factory=list)
+    group_ids: List[str] = field(default_factory=list)
+
+    def to_dict(self) -> dict:
+        return {
+            "family": self.family,
+            "description": self.description,
+            "courses": ", ".join(self.course_ids),
+            "rooms": ", ".join(self.room_ids),
+            "instructors": ", ".join(self.instructor_ids),
+            "groups": ", ".join(self.group_ids)
+        }
+
+@dataclass
+class InfeasibilityReport:
+    """
+    Conflicting constraint subset returned by CP-SAT when the model is infeasible.
+    """
+    status: str
+    conflicts: List[InfeasibilityConflict] = field(default_factory=list)
+    minimal: bool = False
+    solve_time: float = 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "status": self.status,
+            "minimal": self.minimal,
+            "solve_time": round(self.solve_time, 2),
+            "conflicts": [c.to_dict() for c in self.conflicts]
+        }
+
 @dataclass
 class GAConfig:
     population_size: int = 100
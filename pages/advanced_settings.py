@@ -1,5 +1,6 @@
 import streamlit as st
 import json
+import os
 from utils.util import save_config
 from model import Config
 from utils.config_manager import ConfigManager
@@ -102,6 +103,95 @@ def main():
                 set_unsaved()
             config.ga_params["mutation_rate"] = val
 
+            val = st.slider(
+                "توجيه الطفرة نحو الجلسات المتعارضة", 0.0, 1.0, float(config.ga_params.get("conflict_bias", 0.8)), 0.05,
+                on_change=set_unsaved
+            )
+            if val != config.ga_params.get("conflict_bias", 0.8):
+                set_unsaved()
+            config.ga_params["conflict_bias"] = val
+
+            val = st.checkbox(
+                "تشغيل كل جزيرة في عملية مستقلة", bool(config.ga_params.get("parallel_islands", False)),
+                on_change=set_unsaved
+            )
+            if val != config.ga_params.get("parallel_islands", False):
+                set_unsaved()
+            config.ga_params["parallel_islands"] = val
+
+            val = st.number_input(
+                "الميزانية الزمنية (ثوانٍ، 0 = بلا حد)", 0.0, 86400.0,
+                float(config.ga_params.get("time_limit") or 0.0), 10.0,
+                on_change=set_unsaved
+            )
+            if val != float(config.ga_params.get("time_limit") or 0.0):
+                set_unsaved()
+            config.ga_params["time_limit"] = val or None
+
+            val = st.number_input(
+                "أجيال دون تحسن قبل التوقف (0 = معطل)", 0, 1000,
+                int(config.ga_params.get("stagnation_generations", 10)), 1,
+                on_change=set_unsaved
+            )
+            if val != config.ga_params.get("stagnation_generations", 10):
+                set_unsaved()
+            config.ga_params["stagnation_generations"] = val
+
+    with st.expander("معلمات محلّل CP-SAT"):
+        modes = {"feasibility": "إيجاد جدول صالح ثم التحسين الجيني", "optimize": "تحسين القيود المرنة داخل CP-SAT"}
+        current_mode = config.cp_params.get("mode", "feasibility")
+        val = st.radio(
+            "وضع الحل", list(modes), index=list(modes).index(current_mode) if current_mode in modes else 0,
+            format_func=modes.get, on_change=set_unsaved
+        )
+        if val != current_mode:
+            set_unsaved()
+        config.cp_params["mode"] = val
+
+        col1, col2 = st.columns(2)
+        with col1:
+            val = st.number_input(
+                "الحد الأقصى لزمن الحل (ثوانٍ)", 1.0, 3600.0, float(config.cp_params.get("time_limit", 60.0)), 5.0,
+                on_change=set_unsaved
+            )
+            if val != config.cp_params.get("time_limit", 60.0):
+                set_unsaved()
+            config.cp_params["time_limit"] = val
+
+            val = st.slider(
+                "عدد عمال البحث (0 = كل الأنوية)", 0, max(os.cpu_count() or 1, 8),
+                int(config.cp_params.get("num_workers", 8)), 1,
+                on_change=set_unsaved
+            )
+            if val != config.cp_params.get("num_workers", 8):
+                set_unsaved()
+            config.cp_params["num_workers"] = val
+
+            val = st.number_input(
+                "البذرة العشوائية", 0, 1_000_000, int(config.cp_params.get("random_seed", 0)), 1,
+                on_change=set_unsaved
+            )
+            if val != config.cp_params.get("random_seed", 0):
+                set_unsaved()
+            config.cp_params["random_seed"] = val
+
+        with col2:
+            val = st.slider(
+                "الفجوة النسبية المقبولة", 0.0, 0.5, float(config.cp_params.get("relative_gap", 0.0)), 0.01,
+                on_change=set_unsaved
+            )
+            if val != config.cp_params.get("relative_gap", 0.0):
+                set_unsaved()
+            config.cp_params["relative_gap"] = val
+
+            val = st.checkbox(
+                "التوقف عند أول حل صالح", bool(config.cp_params.get("stop_after_first_solution", False)),
+                on_change=set_unsaved
+            )
+            if val != config.cp_params.get("stop_after_first_solution", False):
+                set_unsaved()
+            config.cp_params["stop_after_first_solution"] = val
+
     with st.expander("إعدادات الوقت"):
         col1, col2 = st.columns(2)
         with col1:
@@ -11,7 +11,10 @@ from pages.timetable_viewer import main as timetable_viewer_main
 from algorithm.cp_algorithm import CPSatScheduler
 from algorithm.genetic_optimizer import EnhancedGeneticOptimizer
 import pandas as pd
+import os
+import threading
 from copy import deepcopy
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 
 # تهيئة حالة الجلسة
 if "current_step" not in st.session_state:
@@ -842,6 +845,16 @@ def step_scheduling():
             st.rerun()
         return
     
+    # البدء الدافئ: إعادة استخدام آخر جدول CP-SAT بعد تعديلات صغيرة على البيانات
+    previous_schedule = st.session_state.get("cp_schedule_objects")
+    fix_unchanged = False
+    if previous_schedule:
+        fix_unchanged = st.checkbox(
+            "🔒 تثبيت التعيينات التي لم تتغير (إعادة جدولة سريعة)",
+            value=True,
+            help="يُستخدم الجدول السابق كنقطة بداية، وتُثبّت المواد التي لم تتغير بياناتها"
+        )
+
     if st.button("🚀 بدء عملية الجدولة", type="primary", use_container_width=True):
         with st.spinner("جاري إنشاء الجدول الزمني الأمثل. قد يستغرق هذا بضع دقائق..."):
 
@@ -882,12 +895,80 @@ def step_scheduling():
                     config.working_days = [arabic_days.get(d, d) for d in config.working_days]
                 
                 cp_scheduler = CPSatScheduler(config)
-                initial_schedule = cp_scheduler.generate_schedule(courses, rooms, groups, instructors)
+                # عرض تقدم المحلّل مباشرة: CP-SAT يستدعي الدالة من خيط البحث،
+                # لذا يُربط سياق Streamlit بذلك الخيط قبل تحديث العنصر
+                progress_box = st.empty()
+                script_ctx = get_script_run_ctx()
+                time_limit = float(config.cp_params.get("time_limit", 60.0))
+
+                def show_progress(info):
+                    add_script_run_ctx(threading.current_thread(), script_ctx)
+                    fraction = min(1.0, info["wall_time"] / time_limit) if time_limit > 0 else 0.0
+                    if info.get("components"):
+                        text = f"🧩 اكتمل {info['solutions']} من {info['components']} مكونات"
+                    else:
+                        text = f"🔎 الحل رقم {info['solutions']}"
+                        if info["objective"] is not None:
+                            text += f" | الهدف: {info['objective']:.0f} | الحد: {info['bound']:.0f}"
+                    progress_box.progress(fraction, text=f"{text} | ⏱ {info['wall_time']:.1f} ث")
+
+                initial_schedule = cp_scheduler.generate_schedule(
+                    courses, rooms, groups, instructors,
+                    previous_schedule=previous_schedule,
+                    fix_unchanged=fix_unchanged,
+                    progress_callback=show_progress
+                )
+                progress_box.empty()
                 if not initial_schedule:
                     st.error("تعذر إنشاء الجدول الزمني. يرجى مراجعة البيانات أو القيود.")
+                    report = cp_scheduler.last_infeasibility
+                    if report and report.conflicts:
+                        title = "الحد الأدنى من القيود المتعارضة" if report.minimal else "قيود متعارضة"
+                        st.warning(f"🔍 {title} ({len(report.conflicts)}):")
+                        st.dataframe(pd.DataFrame([c.to_dict() for c in report.conflicts]))
                     return
-                optimizer = EnhancedGeneticOptimizer([initial_schedule], config)
-                optimized_schedule, _ = optimizer.evolve()
+                st.session_state.cp_schedule_objects = initial_schedule
+                cp_stats = cp_scheduler.stats
+                st.caption(
+                    f"🏗️ بناء النموذج: {cp_stats.get('build_time', 0):.2f} ث | "
+                    f"⚙️ الحل: {cp_stats.get('solve_time', 0):.2f} ث | "
+                    f"{cp_stats.get('num_variables', 0)} متغير، {cp_stats.get('num_constraints', 0)} قيد"
+                )
+                if config.cp_params.get("mode", "feasibility") == "optimize":
+                    # CP-SAT حسّن القيود المرنة مباشرة، فلا حاجة لتمريرة الخوارزمية الجينية؛
+                    # هدفه يقرّب توازن القاعات فقط، فتُعرض عقوبات المحقق الفعلية على الجدول
+                    optimized_schedule = initial_schedule
+                    soft_penalties = cp_stats.get("soft_penalties", {})
+                    if soft_penalties:
+                        st.caption("📏 عقوبات القيود المرنة: " + " | ".join(
+                            f"{k}: {v:g}" for k, v in soft_penalties.items() if v
+                        ))
+                else:
+                    # سكان أوليون متنوعون من CP-SAT بدلاً من جدول واحد
+                    population = [initial_schedule] + cp_scheduler.generate_population(
+                        courses, rooms, groups, instructors,
+                        size=max(0, config.ga_params.get("population_size", 100) - 1)
+                    )
+                    optimizer = EnhancedGeneticOptimizer(population, config)
+                    # عرض تقدم الخوارزمية الجينية بعد كل جيل (أفضل لياقة حتى الآن)
+                    ga_time_limit = config.ga_params.get("time_limit")
+                    max_generations = config.ga_params.get("generations", 100)
+                    # استئناف تشغيل سابق إذا أعيد تحميل الجلسة ووُجدت نقطة حفظ متوافقة
+                    checkpoint_path = config.ga_params.get("checkpoint_path")
+                    resume_from = None
+                    if checkpoint_path and os.path.exists(checkpoint_path) and optimizer.can_resume(checkpoint_path):
+                        resume_from = checkpoint_path
+                        st.info("♻️ استئناف التحسين من آخر نقطة حفظ")
+                    for optimized_schedule, ga_stats in optimizer.evolve_steps(resume_from=resume_from):
+                        if ga_time_limit:
+                            fraction = min(1.0, ga_stats["elapsed"] / ga_time_limit)
+                        else:
+                            fraction = min(1.0, ga_stats["generation"] / max(1, max_generations))
+                        progress_box.progress(
+                            1.0 if ga_stats["final"] else fraction,
+                            text=f"🧬 الجيل {ga_stats['generation']} | اللياقة: {ga_stats['best_fitness']:.4f} | ⏱ {ga_stats['elapsed']:.1f} ث"
+                        )
+                    progress_box.empty()
                 # حفظ كلا الجدولين في الجلسة
                 st.session_state.schedule_initial = [
                     {
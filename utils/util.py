@@ -13,7 +13,8 @@ from typing import List, Dict, Any
 from model import Room, Schedule, Instructor, Group, Course, Config as ModelConfig
 from algorithm.cp_algorithm import CPSatScheduler
 from algorithm.soft_constraints_handler import SoftConstraintsOptimizer
-from algorithm.genetic_optimizer import EnhancedGeneticOptimizer, perturb
+from algorithm.tabu_search import TabuSearchOptimizer
+from algorithm.genetic_optimizer import EnhancedGeneticOptimizer
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
@@ -514,13 +515,16 @@ def validate_course_data(course):
     return True, "بيانات المادة صالحة"
 
 
-def schedule_with_all_algorithms(data, config=None):
+def schedule_with_all_algorithms(data, config=None, local_search="sa"):
     """
-    تنفيذ الجدولة الكاملة (CP-SAT -> SA -> GA) على بيانات المستخدم وإرجاع النتائج لكل مرحلة.
+    تنفيذ الجدولة الكاملة (CP-SAT -> SA/البحث المحظور -> GA) على بيانات المستخدم وإرجاع النتائج لكل مرحلة.
     :param data: dict يحتوي على القاعات والمدرسين والمجموعات والمواد
     :param config: كائن Config أو None (يستخدم الافتراضي إذا لم يُعط)
-    :return: dict فيه الجداول الثلاثة: initial, after_sa, after_ga
+    :param local_search: محرك البحث المحلي بعد CP-SAT: "sa" أو "tabu" أو "both" (للمقارنة جنبًا إلى جنب)
+    :return: dict فيه الجداول: initial, after_sa و/أو after_tabu, after_ga مع إحصائيات كل محرك
     """
+    if local_search not in ("sa", "tabu", "both"):
+        raise ValueError(f"محرك بحث محلي غير معروف: {local_search}")
 
     logger = logging.getLogger("schedule_with_all_algorithms")
     logger.setLevel(logging.INFO)
@@ -534,13 +538,21 @@ def schedule_with_all_algorithms(data, config=None):
     # 1) الجدولة الأولية
     cp_scheduler = CPSatScheduler(config)
     initial = cp_scheduler.generate_schedule(courses, rooms, groups, instructors)
-    # 2) تحسين SA
-    sa_optimizer = SoftConstraintsOptimizer(schedules=initial, config=config)
-    optimized_sa = sa_optimizer.optimize(max_iters=getattr(config, 'sa_iterations', 100))
-    # 3) تحسين GA
-    initial_population = [perturb(cp_scheduler) for _ in range(getattr(config, 'population_size', 30))]
+    # 2) البحث المحلي: تحسين SA و/أو البحث المحظور انطلاقًا من نفس الجدول الأولي
+    local_results = {}
+    if local_search in ("sa", "both"):
+        sa_optimizer = SoftConstraintsOptimizer(schedules=initial, config=config)
+        local_results["sa"] = sa_optimizer.optimize()
+    if local_search in ("tabu", "both"):
+        tabu_optimizer = TabuSearchOptimizer(schedules=initial, config=config)
+        local_results["tabu"] = tabu_optimizer.optimize()
+    # 3) تحسين GA: سكان أوليون صالحون ومتنوعون من CP-SAT
+    population_size = config.ga_params.get("population_size", 30)
+    initial_population = [initial] + cp_scheduler.generate_population(
+        courses, rooms, groups, instructors, size=max(0, population_size - 1)
+    )
     ga = EnhancedGeneticOptimizer(initial_population, config)
-    final = ga.evolve()
+    final, _ = ga.evolve()
     # تحويل النتائج إلى DataFrame (اختياري)
     def to_df(schedules):
         rows = []
@@ -557,12 +569,15 @@ def schedule_with_all_algorithms(data, config=None):
                 "penalty_score": getattr(s, 'penalty_score', 0)
             })
         return pd.DataFrame(rows)
-    return {
+    results = {
         "initial": initial,
-        "after_sa": optimized_sa,
         "after_ga": final,
         "initial_df": to_df(initial),
-        "after_sa_df": to_df(optimized_sa),
         "after_ga_df": to_df(final)
     }
+    for name, (optimized, stats) in local_results.items():
+        results[f"after_{name}"] = optimized
+        results[f"after_{name}_df"] = to_df(optimized)
+        results[f"{name}_stats"] = stats
+    return results
 